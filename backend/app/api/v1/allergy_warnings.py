@@ -0,0 +1,173 @@
+"""Allergy warnings shared by the scan and product endpoints"""
+
+import asyncio
+from typing import Any, Awaitable, Dict, Iterable, List, Optional, Tuple, TypeVar
+from fastapi.security import HTTPAuthorizationCredentials
+from app.core.auth import get_current_user
+from app.entities.product.models import Product
+from app.features.allergen.service import get_allergen_matcher
+from app.features.search.models import ProductSearchResult
+from app.features.user.service import UserService
+
+T = TypeVar("T")
+
+
+async def get_optional_user(authorization: Optional[str]) -> Optional[Dict[str, Any]]:
+    """
+    Get the authenticated user from an optional Authorization header
+    
+    Returns None for anonymous requests and invalid tokens. Verified tokens
+    are cached, so calling this next to get_user_allergies() is cheap.
+    """
+    if not authorization or not authorization.startswith("Bearer "):
+        return None
+    
+    try:
+        # Extract token from "Bearer <token>"
+        token = authorization.split(" ")[1]
+        credentials = HTTPAuthorizationCredentials(
+            scheme="Bearer",
+            credentials=token
+        )
+        return await get_current_user(credentials)
+    except Exception as e:
+        print(f"Error authenticating optional user: {e}")
+        return None
+
+
+async def get_user_with_allergies(
+    authorization: Optional[str]
+) -> Tuple[Optional[Dict[str, Any]], Optional[List[str]]]:
+    """
+    Get the authenticated user and their allergies
+    
+    Returns (None, None) for anonymous requests or when auth fails, and the
+    user with None allergies when the profile cannot be read, so callers can
+    still serve products without warnings. Users without allergies get an
+    empty list.
+    """
+    current_user = await get_optional_user(authorization)
+    if current_user is None:
+        return None, None
+    
+    try:
+        # Fetch user profile to get allergies
+        user_service = UserService()
+        user_profile = await user_service.get_user_profile(
+            user_id=current_user["id"],
+            email=current_user.get("email"),
+            user_metadata=current_user.get("user_metadata", {})
+        )
+        
+        if not user_profile:
+            return current_user, None
+        return current_user, user_profile.allergies or []
+    except Exception as e:
+        # If auth fails, just continue without warnings
+        # This allows unauthenticated users to still view products
+        print(f"Error checking user allergies: {e}")
+        return current_user, None
+
+
+async def get_user_allergies(authorization: Optional[str]) -> Optional[List[str]]:
+    """
+    Get the allergies of the authenticated user
+    
+    Returns an empty list for users without allergies, and None for
+    anonymous requests or when auth fails.
+    """
+    _, allergies = await get_user_with_allergies(authorization)
+    return allergies
+
+
+async def apply_allergy_warnings(products: Iterable[Optional[Product]], allergies: List[str]) -> None:
+    """
+    Set warnings on each product to the user allergies it contains
+    
+    Allergen tags, parsed ingredients and the raw ingredient text are all
+    checked, including aliases such as "casein" for milk.
+    """
+    matcher = await get_allergen_matcher()
+    for product in products:
+        if not product:
+            continue
+        warnings = matcher.find_warnings(product, allergies)
+        if warnings:
+            product.warnings = warnings
+
+
+async def apply_search_warnings(results: Iterable[ProductSearchResult], allergies: List[str]) -> None:
+    """
+    Set warnings on search results from their allergen and ingredient columns
+    
+    Matches like apply_allergy_warnings(), so allergies without a canonical
+    category (and thus no allergen_mask bit) are caught too.
+    """
+    matcher = await get_allergen_matcher()
+    for result in results:
+        product = Product(
+            barcode=result.barcode,
+            name=result.name,
+            allergens=result.allergens,
+            ingredients_parsed=result.ingredients_parsed,
+            ingredients_raw=result.ingredients_raw
+        )
+        warnings = matcher.find_warnings(product, allergies)
+        if warnings:
+            result.warnings = warnings
+
+
+async def get_allergy_mask(allergies: List[str]) -> int:
+    """Compile allergies to the bitmask matched against products.allergen_mask"""
+    matcher = await get_allergen_matcher()
+    return matcher.allergy_mask(allergies)
+
+
+async def with_user_allergies(
+    lookup: Awaitable[T],
+    authorization: Optional[str]
+) -> Tuple[T, Optional[List[str]]]:
+    """
+    Run a product lookup and the user's allergy lookup concurrently
+    
+    The allergy lookup never raises; auth failures yield None. If the lookup
+    raises or finds nothing, the allergy lookup is cancelled.
+    """
+    result, _, allergies = await with_user(lookup, authorization)
+    return result, allergies
+
+
+async def _cancel(task: "asyncio.Task[Any]") -> None:
+    """Cancel a task and wait for it, so it is never left pending or unretrieved"""
+    task.cancel()
+    try:
+        await task
+    except asyncio.CancelledError:
+        pass
+
+
+async def with_user(
+    lookup: Awaitable[T],
+    authorization: Optional[str]
+) -> Tuple[T, Optional[Dict[str, Any]], Optional[List[str]]]:
+    """
+    Like with_user_allergies(), but also return the authenticated user
+    
+    For endpoints that record the request for the user (e.g. scan history)
+    without verifying the token a second time.
+    """
+    if not authorization:
+        return await lookup, None, None
+    
+    user_task = asyncio.create_task(get_user_with_allergies(authorization))
+    try:
+        result = await lookup
+    except BaseException:
+        await _cancel(user_task)
+        raise
+    
+    if result is None:
+        await _cancel(user_task)
+        return result, None, None
+    current_user, allergies = await user_task
+    return result, current_user, allergies
@@ -1,12 +1,14 @@
 """Favorites endpoints"""
 
 from fastapi import APIRouter, HTTPException, Depends, status, Query
-from typing import Dict, Any
+from typing import Dict, Any, Optional
 from app.features.favorites.models import (
     FavoriteItem,
     FavoritesListData,
     AddFavoriteRequest,
     FavoriteStatusData,
+    FavoriteStatusRequest,
+    FavoriteStatusesData,
 )
 from app.features.favorites.service import FavoritesService
 from app.core.auth import get_current_user
@@ -17,37 +19,53 @@ router = APIRouter()
 
 @router.get("", response_model=APIResponse[FavoritesListData])
 async def get_favorites(
-    page: int = Query(1, ge=1, description="Page number"),
+    page: int = Query(1, ge=1, description="Page number (prefer cursor)"),
     limit: int = Query(20, ge=1, le=100, description="Items per page"),
+    cursor: Optional[str] = Query(None, description="next_cursor from the previous page"),
+    include_total: Optional[bool] = Query(None, description="Include an approximate total count (default: only without a cursor)"),
     current_user: Dict[str, Any] = Depends(get_current_user)
 ):
     """
     Get paginated list of user's favorite products
     
     Returns favorites with product details, ordered by most recently added.
+    Pass the previous page's **next_cursor** to continue.
     """
     user_id = current_user["id"]
     service = FavoritesService()
     
     try:
-        favorites, total_count = await service.get_user_favorites(
+        favorites, next_cursor = await service.get_user_favorites(
             user_id=user_id,
             page=page,
-            limit=limit
+            limit=limit,
+            cursor=cursor
         )
         
-        total_pages = max(1, (total_count + limit - 1) // limit)
+        total_count = None
+        total_pages = None
+        # Page-based clients read total_pages, so they get it unless they opt out
+        if include_total or (include_total is None and not cursor):
+            total_count = await service.count_favorites(user_id)
+            total_pages = max(1, (total_count + limit - 1) // limit)
         
         return APIResponse(
             success=True,
             data=FavoritesListData(
                 favorites=favorites,
+                next_cursor=next_cursor,
+                has_more=next_cursor is not None,
                 page=page,
                 total_pages=total_pages,
                 total_count=total_count
             ),
             message="Favorites retrieved successfully"
         )
+    except ValueError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(e)
+        )
     except Exception as e:
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
@@ -69,40 +87,17 @@ async def add_favorite(
     service = FavoritesService()
     
     try:
-        favorite_id = await service.add_favorite(
+        favorite = await service.add_favorite(
             user_id=user_id,
             product_id=request.product_id
         )
         
-        if not favorite_id:
+        if not favorite:
             raise HTTPException(
                 status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
                 detail="Failed to add favorite"
             )
         
-        # Get the favorite with product details
-        favorites, _ = await service.get_user_favorites(
-            user_id=user_id,
-            page=1,
-            limit=1
-        )
-        
-        # Find the newly added favorite
-        favorite = None
-        for f in favorites:
-            if f.id == favorite_id:
-                favorite = f
-                break
-        
-        if not favorite:
-            # Fallback - return minimal data
-            favorite = FavoriteItem(
-                id=favorite_id,
-                product_id=request.product_id,
-                product=None,
-                created_at=""
-            )
-        
         return APIResponse(
             success=True,
             data=favorite,
@@ -117,6 +112,46 @@ async def add_favorite(
         )
 
 
+@router.post("/status", response_model=APIResponse[FavoriteStatusesData])
+async def check_favorite_statuses(
+    request: FavoriteStatusRequest,
+    current_user: Dict[str, Any] = Depends(get_current_user)
+):
+    """
+    Check the favorite status of up to 200 products at once
+    
+    Meant for list screens: one call replaces a /check call per product and
+    is usually answered from cache without a database query.
+    """
+    user_id = current_user["id"]
+    service = FavoritesService()
+    
+    try:
+        favorite_ids = await service.get_favorite_statuses(
+            user_id=user_id,
+            product_ids=request.product_ids
+        )
+        
+        return APIResponse(
+            success=True,
+            data=FavoriteStatusesData(
+                statuses={
+                    product_id: FavoriteStatusData(
+                        is_favorite=favorite_id is not None,
+                        favorite_id=favorite_id
+                    )
+                    for product_id, favorite_id in favorite_ids.items()
+                }
+            ),
+            message="Favorite statuses checked"
+        )
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Error checking favorite statuses: {str(e)}"
+        )
+
+
 @router.delete("/{product_id}", response_model=APIResponse[Dict[str, bool]])
 async def remove_favorite(
     product_id: str,
@@ -124,20 +159,22 @@ async def remove_favorite(
 ):
     """
     Remove a product from user's favorites
+    
+    **removed** is false when the product was not a favorite.
     """
     user_id = current_user["id"]
     service = FavoritesService()
     
     try:
-        await service.remove_favorite(
+        removed = await service.remove_favorite(
             user_id=user_id,
             product_id=product_id
         )
         
         return APIResponse(
             success=True,
-            data={"removed": True},
-            message="Product removed from favorites"
+            data={"removed": removed},
+            message="Product removed from favorites" if removed else "Product was not in favorites"
         )
     except Exception as e:
         raise HTTPException(
@@ -1,15 +1,73 @@
 """Product endpoints"""
 
-from fastapi import APIRouter, HTTPException, Header
+from fastapi import APIRouter, HTTPException, Header, Query, status
 from typing import Optional
+from app.api.v1.allergy_warnings import (
+    apply_allergy_warnings,
+    get_allergy_mask,
+    get_user_allergies,
+    with_user_allergies,
+)
+from app.features.product.alternatives import nutrition_index_sync
+from app.features.product.models import ProductAlternativesData, ProductListData
 from app.features.product.service import ProductService
-from app.features.user.service import UserService
-from app.core.auth import get_current_user
-from fastapi.security import HTTPAuthorizationCredentials
+from app.shared.models.response import APIResponse
 
 router = APIRouter()
 
 
+@router.get("", response_model=APIResponse[ProductListData])
+async def list_products(
+    category: Optional[str] = Query(None, description="Exact category to list"),
+    safe_for_me: bool = Query(False, description="Exclude products containing the user's allergens"),
+    limit: int = Query(20, ge=1, le=100, description="Items per page"),
+    offset: int = Query(0, ge=0, description="Items to skip"),
+    authorization: Optional[str] = Header(None)
+):
+    """
+    List products, optionally only those safe for the authenticated user
+    
+    With **safe_for_me**, products whose allergen bitmask overlaps the user's
+    allergies are excluded in the database. Allergies outside the canonical
+    categories cannot be filtered there and show up as warnings instead.
+    """
+    user_allergies = await get_user_allergies(authorization)
+    if safe_for_me and user_allergies is None:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Authentication required for safe_for_me"
+        )
+    
+    try:
+        exclude_mask = await get_allergy_mask(user_allergies) if safe_for_me and user_allergies else 0
+        product_service = ProductService()
+        products, has_more = await product_service.list_products(
+            category=category,
+            exclude_allergen_mask=exclude_mask,
+            limit=limit,
+            offset=offset
+        )
+        
+        if user_allergies:
+            await apply_allergy_warnings(products, user_allergies)
+        
+        return APIResponse(
+            success=True,
+            data=ProductListData(
+                products=products,
+                limit=limit,
+                offset=offset,
+                has_more=has_more
+            ),
+            message="Products retrieved successfully"
+        )
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Error listing products: {str(e)}"
+        )
+
+
 @router.get("/{product_id}")
 async def get_product(
     product_id: str,
@@ -20,12 +78,17 @@ async def get_product(
     
     - **product_id**: UUID of the product
     
-    If user is authenticated (via Authorization header), compares product allergens 
-    with user allergies and populates warnings field with matching allergens.
+    If user is authenticated (via Authorization header), checks the product's
+    allergens and ingredients against user allergies and populates the
+    warnings field with the allergies it contains.
     """
     try:
         product_service = ProductService()
-        product = await product_service.get_product_by_id(product_id)
+        # Resolve the product and the user's allergies at the same time
+        product, user_allergies = await with_user_allergies(
+            product_service.get_product_by_id(product_id),
+            authorization
+        )
         
         if not product:
             raise HTTPException(
@@ -33,43 +96,8 @@ async def get_product(
                 detail="Product not found"
             )
         
-        # Try to get user allergies if authenticated
-        if authorization and authorization.startswith("Bearer "):
-            try:
-                # Extract token from "Bearer <token>"
-                token = authorization.split(" ")[1]
-                credentials = HTTPAuthorizationCredentials(
-                    scheme="Bearer",
-                    credentials=token
-                )
-                
-                # Get current user
-                current_user = await get_current_user(credentials)
-                
-                # Fetch user profile to get allergies
-                user_service = UserService()
-                user_profile = await user_service.get_user_profile(
-                    user_id=current_user["id"],
-                    email=current_user.get("email"),
-                    user_metadata=current_user.get("user_metadata", {})
-                )
-                
-                # Compare allergens with user allergies
-                if user_profile and user_profile.allergies and product.allergens:
-                    # Find matching allergens (case-insensitive comparison)
-                    user_allergies_lower = [a.lower() for a in user_profile.allergies]
-                    matching_allergens = [
-                        allergen for allergen in product.allergens
-                        if allergen.lower() in user_allergies_lower
-                    ]
-                    
-                    if matching_allergens:
-                        product.warnings = matching_allergens
-            except Exception as e:
-                # If auth fails, just continue without warnings
-                # This allows unauthenticated users to still view products
-                print(f"Error checking user allergies: {e}")
-                pass
+        if user_allergies:
+            await apply_allergy_warnings([product], user_allergies)
         
         return product
     except HTTPException:
@@ -81,4 +109,57 @@ async def get_product(
         )
 
 
-
+@router.get("/{product_id}/alternatives", response_model=APIResponse[ProductAlternativesData])
+async def get_product_alternatives(
+    product_id: str,
+    limit: int = Query(5, ge=1, le=20, description="Number of alternatives"),
+    authorization: Optional[str] = Header(None)
+):
+    """
+    Get healthier alternatives to a product
+    
+    Returns products from the same category with the most similar nutrition
+    per 100g and a better Nutri-Score. For authenticated users, products
+    containing any of their allergies are left out.
+    """
+    try:
+        product_service = ProductService()
+        product, user_allergies = await with_user_allergies(
+            product_service.get_product_by_id(product_id),
+            authorization
+        )
+        
+        if not product:
+            raise HTTPException(
+                status_code=404,
+                detail="Product not found"
+            )
+        
+        exclude_mask = await get_allergy_mask(user_allergies) if user_allergies else 0
+        # Allergies without an allergen bit are only caught by the warnings
+        # check below, so fetch spares to replace products it drops
+        alternatives = await product_service.find_alternatives(
+            product,
+            exclude_allergen_mask=exclude_mask,
+            limit=limit * 2 if user_allergies else limit
+        )
+        if user_allergies:
+            await apply_allergy_warnings(alternatives, user_allergies)
+            alternatives = [alternative for alternative in alternatives if not alternative.warnings]
+        
+        return APIResponse(
+            success=True,
+            data=ProductAlternativesData(
+                product_id=product_id,
+                alternatives=alternatives[:limit],
+                index_ready=nutrition_index_sync.ready
+            ),
+            message="Alternatives retrieved successfully"
+        )
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(
+            status_code=500,
+            detail=f"Error finding alternatives: {str(e)}"
+        )
@@ -2,13 +2,11 @@
 
 from fastapi import APIRouter, HTTPException, Header
 from typing import Optional
-from app.features.scan.models import ScanRequest
+from app.api.v1.allergy_warnings import apply_allergy_warnings, with_user
+from app.features.scan.models import ScanRequest, BatchScanRequest, BatchScanData
 from app.features.scan.service import ScanService
 from app.shared.models.response import APIResponse
 from app.entities.product.models import Product
-from app.features.user.service import UserService
-from app.core.auth import get_current_user
-from fastapi.security import HTTPAuthorizationCredentials
 
 router = APIRouter()
 
@@ -27,10 +25,14 @@ async def scan_product(
     """
     try:
         scan_service = ScanService()
-        product = await scan_service.scan_product(
-            code=request.code,
-            code_type=request.type,
-            country=request.country
+        # Resolve the product and the user's allergies at the same time
+        product, current_user, user_allergies = await with_user(
+            scan_service.scan_product(
+                code=request.code,
+                code_type=request.type,
+                country=request.country
+            ),
+            authorization
         )
         
         if not product:
@@ -38,50 +40,13 @@ async def scan_product(
                 status_code=404,
                 detail="Product not found"
             )
-
-        # Try to get user allergies if authenticated
-        if authorization and authorization.startswith("Bearer "):
-            try:
-                # Extract token from "Bearer <token>"
-                token = authorization.split(" ")[1]
-                credentials = HTTPAuthorizationCredentials(
-                    scheme="Bearer",
-                    credentials=token
-                )
-                
-                # Get current user
-                current_user = await get_current_user(credentials)
-                
-                # Fetch user profile to get allergies
-                user_service = UserService()
-                user_profile = await user_service.get_user_profile(
-                    user_id=current_user["id"],
-                    email=current_user.get("email"),
-                    user_metadata=current_user.get("user_metadata", {})
-                )
-                
-                # Compare allergens with user allergies
-                if user_profile and user_profile.allergies and product.allergens:
-                    # Find matching allergens (case-insensitive comparison)
-                    user_allergies_lower = {a.lower() for a in user_profile.allergies}
-                    matching_allergens = []
-                    
-                    for allergen in product.allergens:
-                        # Handle prefixes like "en:peanuts" -> "peanuts"
-                        clean_allergen = allergen
-                        if ":" in allergen:
-                            clean_allergen = allergen.split(":")[-1]
-                        
-                        if clean_allergen.strip().lower() in user_allergies_lower:
-                            matching_allergens.append(clean_allergen.strip())
-                    
-                    if matching_allergens:
-                        product.warnings = matching_allergens
-            except Exception as e:
-                # If auth fails, just continue without warnings
-                # This allows unauthenticated users to still view products
-                print(f"Error checking user allergies: {e}")
-                pass
+        
+        # Authenticated scans go to the history without waiting on the insert
+        if current_user:
+            await scan_service.record_scan(current_user["id"], request.code, product)
+        
+        if user_allergies:
+            await apply_allergy_warnings([product], user_allergies)
         
         return APIResponse(
             success=True,
@@ -96,3 +61,46 @@ async def scan_product(
             detail=f"Error scanning product: {str(e)}"
         )
 
+
+@router.post("/batch", response_model=APIResponse[BatchScanData])
+async def scan_products_batch(
+    request: BatchScanRequest,
+    authorization: Optional[str] = Header(None)
+):
+    """
+    Scan up to 200 barcodes in one request
+    
+    - **codes**: Barcode values; duplicates are resolved once
+    - **country**: Optional country code for region-specific lookups
+    
+    Returns one result per distinct barcode with a status of found,
+    not_found or error. Allergen warnings are computed once per user.
+    """
+    try:
+        scan_service = ScanService()
+        results, current_user, user_allergies = await with_user(
+            scan_service.scan_products(request.codes),
+            authorization
+        )
+        
+        if current_user:
+            await scan_service.record_batch_scan(current_user["id"], results)
+        
+        if user_allergies:
+            await apply_allergy_warnings([item.product for item in results], user_allergies)
+        
+        return APIResponse(
+            success=True,
+            data=BatchScanData(
+                results=results,
+                found_count=sum(1 for item in results if item.status == "found"),
+                not_found_count=sum(1 for item in results if item.status == "not_found"),
+                error_count=sum(1 for item in results if item.status == "error")
+            ),
+            message="Products scanned successfully"
+        )
+    except Exception as e:
+        raise HTTPException(
+            status_code=500,
+            detail=f"Error scanning products: {str(e)}"
+        )
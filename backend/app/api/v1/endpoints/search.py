@@ -0,0 +1,96 @@
+"""Search endpoints"""
+
+from fastapi import APIRouter, HTTPException, Header, Query, status
+from typing import Optional
+from app.api.v1.allergy_warnings import (
+    apply_search_warnings,
+    get_allergy_mask,
+    get_user_allergies,
+    with_user_allergies,
+)
+from app.features.search.models import ProductSearchData
+from app.features.search.service import SearchService
+from app.shared.models.response import APIResponse
+
+router = APIRouter()
+
+
+@router.get("", response_model=APIResponse[ProductSearchData])
+async def search_products(
+    q: str = Query(..., min_length=1, max_length=200, description="Search text"),
+    brand: Optional[str] = Query(None, description="Exact brand to filter on"),
+    category: Optional[str] = Query(None, description="Exact category to filter on"),
+    safe_for_me: bool = Query(False, description="Exclude products containing the user's allergens"),
+    limit: int = Query(20, ge=1, le=50, description="Results per page"),
+    cursor: Optional[str] = Query(None, description="next_cursor from the previous page"),
+    authorization: Optional[str] = Header(None)
+):
+    """
+    Search products by name, best matches first
+    
+    - **q**: Words to match; supports "quoted phrases", OR and -excluded words
+    - **cursor**: Pass the previous page's **next_cursor** to continue
+    
+    Authenticated users get warnings for allergens found in each result;
+    with **safe_for_me** those products are excluded instead, so a page can
+    hold fewer than **limit** results while **has_more** is still true.
+    """
+    search_service = SearchService()
+    try:
+        if safe_for_me:
+            user_allergies = await get_user_allergies(authorization)
+            if user_allergies is None:
+                raise HTTPException(
+                    status_code=status.HTTP_401_UNAUTHORIZED,
+                    detail="Authentication required for safe_for_me"
+                )
+            results, next_cursor = await search_service.search_products(
+                query=q,
+                brand=brand,
+                category=category,
+                exclude_allergen_mask=await get_allergy_mask(user_allergies),
+                limit=limit,
+                cursor=cursor
+            )
+        else:
+            # Resolve the results and the user's allergies at the same time
+            (results, next_cursor), user_allergies = await with_user_allergies(
+                search_service.search_products(
+                    query=q,
+                    brand=brand,
+                    category=category,
+                    limit=limit,
+                    cursor=cursor
+                ),
+                authorization
+            )
+        
+        if user_allergies:
+            await apply_search_warnings(results, user_allergies)
+            # The database only filters allergies with a canonical category;
+            # drop results that match the others by ingredient text. The
+            # cursor still follows the last row the database returned.
+            if safe_for_me:
+                results = [result for result in results if not result.warnings]
+        
+        return APIResponse(
+            success=True,
+            data=ProductSearchData(
+                results=results,
+                next_cursor=next_cursor,
+                has_more=next_cursor is not None
+            ),
+            message="Search completed successfully"
+        )
+    except HTTPException:
+        raise
+    except ValueError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(e)
+        )
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Error searching products: {str(e)}"
+        )
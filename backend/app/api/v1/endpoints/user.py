@@ -6,8 +6,10 @@ from pydantic import BaseModel
 from datetime import datetime
 from app.features.user.models import UserPreferencesRequest, UserProfile
 from app.features.user.service import UserService
+from app.features.scan.history import ScanHistoryService
+from app.features.scan.snapshots import reference_snapshots
 from app.core.auth import get_current_user
-from app.core.database import get_supabase_client
+from app.core.database import get_supabase_client, execute_query
 from app.shared.models.response import APIResponse
 
 router = APIRouter()
@@ -25,9 +27,11 @@ class ScanHistoryItem(BaseModel):
 
 class ScanHistoryData(BaseModel):
     scans: List[ScanHistoryItem]
+    next_cursor: Optional[str] = None
+    has_more: bool
     page: int
-    total_pages: int
-    total_count: int
+    total_pages: Optional[int] = None  # Omitted for cursor requests unless include_total
+    total_count: Optional[int] = None  # Approximate; omitted like total_pages
 
 
 class MigrateScanItem(BaseModel):
@@ -137,39 +141,34 @@ async def update_preferences(
 
 @router.get("/history", response_model=APIResponse[ScanHistoryData])
 async def get_scan_history(
-    page: int = Query(1, ge=1, description="Page number"),
+    page: int = Query(1, ge=1, description="Page number (prefer cursor)"),
     limit: int = Query(20, ge=1, le=100, description="Items per page"),
+    cursor: Optional[str] = Query(None, description="next_cursor from the previous page"),
+    include_total: Optional[bool] = Query(None, description="Include an approximate total count (default: only without a cursor)"),
     current_user: Dict[str, Any] = Depends(get_current_user)
 ):
     """
     Get paginated scan history for the authenticated user
     
-    Returns scans from the database, ordered by most recent first.
+    Returns scans from the database, ordered by most recent first. Pass the
+    previous page's **next_cursor** to continue. Page-based requests include
+    an approximate count that may lag recent scans by a minute; set
+    **include_total** to force or skip it.
     """
     user_id = current_user["id"]
-    supabase = get_supabase_client()
+    history_service = ScanHistoryService()
     
     try:
-        # Calculate offset
-        offset = (page - 1) * limit
-        
-        # Get total count
-        count_response = supabase.table("scans").select("id", count="exact").eq("user_id", user_id).execute()
-        total_count = count_response.count or 0
-        
-        # Get paginated scans
-        response = (
-            supabase.table("scans")
-            .select("id, barcode, product_id, result_snapshot, scanned_at")
-            .eq("user_id", user_id)
-            .order("scanned_at", desc=True)
-            .range(offset, offset + limit - 1)
-            .execute()
+        rows, next_cursor = await history_service.get_history(
+            user_id=user_id,
+            limit=limit,
+            cursor=cursor,
+            page=page
         )
         
         # Transform to response format
         scans = []
-        for scan in response.data or []:
+        for scan in rows:
             scans.append(ScanHistoryItem(
                 id=scan["id"],
                 barcode=scan["barcode"],
@@ -178,18 +177,30 @@ async def get_scan_history(
                 isLocal=False
             ))
         
-        total_pages = max(1, (total_count + limit - 1) // limit)
+        total_count = None
+        total_pages = None
+        # Page-based clients read total_pages, so they get it unless they opt out
+        if include_total or (include_total is None and not cursor):
+            total_count = await history_service.count_scans(user_id)
+            total_pages = max(1, (total_count + limit - 1) // limit)
         
         return APIResponse(
             success=True,
             data=ScanHistoryData(
                 scans=scans,
+                next_cursor=next_cursor,
+                has_more=next_cursor is not None,
                 page=page,
                 total_pages=total_pages,
                 total_count=total_count
             ),
             message="Scan history retrieved successfully"
         )
+    except ValueError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(e)
+        )
     except Exception as e:
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
@@ -229,8 +240,9 @@ async def migrate_guest_scans(
                 "scanned_at": scan.scanned_at
             })
         
-        # Bulk insert scans
-        response = supabase.table("scans").insert(records).execute()
+        # Store snapshots once, then bulk insert scans referencing them
+        records = await reference_snapshots(records)
+        response = await execute_query(supabase.table("scans").insert(records))
         
         migrated_count = len(response.data) if response.data else 0
         
@@ -1,15 +1,48 @@
 """Admin authentication and authorization"""
 
+import time
 from fastapi import HTTPException, status, Depends, Header
-from typing import Optional
+from fastapi.security import HTTPAuthorizationCredentials
+from jose import jwt
+from typing import FrozenSet, Optional
 import os
-from app.core.database import get_supabase_client
+from app.core.auth import get_current_user, token_digest
+from app.core.config import settings
+from app.shared.cache import LRUCache
+
+# Admin user IDs from ADMIN_USER_IDS, parsed once (see reload_admin_user_ids)
+_admin_user_ids: Optional[FrozenSet[str]] = None
+
+# Tokens recently confirmed as admin, keyed by token digest
+_admin_decisions = LRUCache(
+    maxsize=settings.ADMIN_DECISION_CACHE_MAXSIZE,
+    ttl=settings.ADMIN_DECISION_CACHE_TTL_SECONDS
+)
+
+
+def reload_admin_user_ids() -> FrozenSet[str]:
+    """Re-read the ADMIN_USER_IDS allowlist and drop cached admin decisions"""
+    global _admin_user_ids
+    admin_user_ids = os.getenv("ADMIN_USER_IDS", "").split(",")
+    _admin_user_ids = frozenset(uid.strip() for uid in admin_user_ids if uid.strip())
+    _admin_decisions.clear()
+    return _admin_user_ids
+
+
+def get_admin_user_ids() -> FrozenSet[str]:
+    """Get the admin allowlist (loaded on first use)"""
+    if _admin_user_ids is None:
+        return reload_admin_user_ids()
+    return _admin_user_ids
 
 
 async def verify_admin_user(authorization: Optional[str] = Header(None)) -> str:
     """
     Verify that the request is from an authenticated admin user.
     
+    The token is verified locally like get_current_user (no Supabase Auth
+    round trip), and positive decisions are cached briefly per token.
+    
     Returns the admin user ID if valid, raises HTTPException otherwise.
     """
     if not authorization:
@@ -29,36 +62,32 @@ async def verify_admin_user(authorization: Optional[str] = Header(None)) -> str:
             detail="Invalid authorization header format"
         )
     
-    # Verify token with Supabase
-    supabase = get_supabase_client()
-    try:
-        user_response = supabase.auth.get_user(token)
-        user = user_response.user
-        
-        if not user:
-            raise HTTPException(
-                status_code=status.HTTP_401_UNAUTHORIZED,
-                detail="Invalid or expired token"
-            )
-        
-        user_id = user.id
-        
-    except Exception as e:
-        raise HTTPException(
-            status_code=status.HTTP_401_UNAUTHORIZED,
-            detail=f"Authentication failed: {str(e)}"
-        )
+    digest = token_digest(token)
+    cached_user_id: Optional[str] = _admin_decisions.get(digest)
+    if cached_user_id is not None:
+        return cached_user_id
     
-    # Check if user is in admin allowlist
-    admin_user_ids = os.getenv("ADMIN_USER_IDS", "").split(",")
-    admin_user_ids = [uid.strip() for uid in admin_user_ids if uid.strip()]
+    # Verify token signature and expiry locally (raises 401 if invalid)
+    user = await get_current_user(
+        HTTPAuthorizationCredentials(scheme="Bearer", credentials=token)
+    )
+    user_id: str = user["id"]
     
-    if user_id not in admin_user_ids:
+    # Check if user is in admin allowlist
+    if user_id not in get_admin_user_ids():
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
             detail="User does not have admin privileges"
         )
     
+    # Never keep a decision past the token's own expiry
+    ttl: float = settings.ADMIN_DECISION_CACHE_TTL_SECONDS
+    exp = jwt.get_unverified_claims(token).get("exp")
+    if isinstance(exp, (int, float)):
+        ttl = min(ttl, exp - time.time())
+    if ttl > 0:
+        _admin_decisions.set(digest, user_id, ttl=ttl)
+    
     return user_id
 
 
@@ -1,16 +1,97 @@
 """Authentication dependencies for FastAPI routes"""
 
+import hashlib
+import time
 from fastapi import Depends, HTTPException, status
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from supabase import Client
 from typing import Dict, Any
-from jose import jwt, JWTError
+from jose import jwt, jws, JWTError
+from jose.exceptions import JWSError
 from app.core.database import get_supabase_client
 from app.core.config import settings
+from app.shared.cache import LRUCache
 
 # HTTP Bearer token security scheme
 security = HTTPBearer()
 
+# Verified users keyed by token digest, each kept until its token expires
+_verified_tokens = LRUCache(maxsize=settings.AUTH_TOKEN_CACHE_MAXSIZE)
+
+# Error details for tokens that failed verification, kept briefly so a
+# client retrying a bad token does not cost an HMAC per request
+_rejected_tokens = LRUCache(
+    maxsize=settings.AUTH_TOKEN_CACHE_MAXSIZE,
+    ttl=settings.AUTH_REJECT_CACHE_TTL_SECONDS
+)
+
+_token_cache_counters = {"hits": 0, "misses": 0, "rejects": 0, "cached_rejects": 0}
+
+
+def token_digest(token: str) -> str:
+    """Cache key for a bearer token (the raw token is never stored)"""
+    return hashlib.sha256(token.encode()).hexdigest()
+
+
+def _verify_token(token: str) -> Dict[str, Any]:
+    """
+    Verify a Supabase JWT and return its claims
+    
+    The token is parsed once and its signature checked against the anon key,
+    then the service role key, so each key costs at most one HMAC. Expiry and
+    other claims are validated afterwards without re-verifying the signature.
+    """
+    # Malformed tokens fail here, before any signature work
+    jwt.get_unverified_header(token)
+    
+    # Supabase user tokens are signed with the anon key; service tokens with
+    # the service role key
+    for key in (settings.SUPABASE_ANON_KEY, settings.SUPABASE_KEY):
+        try:
+            jws.verify(token, key, algorithms=["HS256"])
+            break
+        except JWSError:
+            continue
+    else:
+        raise JWTError("Signature verification failed.")
+    
+    claims: Dict[str, Any] = jwt.decode(
+        token,
+        None,
+        algorithms=["HS256"],
+        options={"verify_signature": False, "verify_exp": True}
+    )
+    return claims
+
+
+def _cache_ttl(payload: Dict[str, Any]) -> float:
+    """Seconds until the token expires, capped by AUTH_TOKEN_CACHE_MAX_TTL_SECONDS"""
+    ttl: float = settings.AUTH_TOKEN_CACHE_MAX_TTL_SECONDS
+    exp = payload.get("exp")
+    if isinstance(exp, (int, float)):
+        ttl = min(ttl, exp - time.time())
+    return ttl
+
+
+def _reject(digest: str, detail: str) -> HTTPException:
+    _token_cache_counters["rejects"] += 1
+    _rejected_tokens.set(digest, detail)
+    return HTTPException(
+        status_code=status.HTTP_401_UNAUTHORIZED,
+        detail=detail,
+        headers={"WWW-Authenticate": "Bearer"},
+    )
+
+
+def token_cache_stats() -> Dict[str, Any]:
+    """Verified-token cache size and hit, miss and reject counters"""
+    lookups = _token_cache_counters["hits"] + _token_cache_counters["misses"]
+    return {
+        "size": len(_verified_tokens),
+        **_token_cache_counters,
+        "hit_rate": round(_token_cache_counters["hits"] / lookups, 4) if lookups else 0.0,
+    }
+
 
 async def get_current_user(
     credentials: HTTPAuthorizationCredentials = Depends(security),
@@ -19,8 +100,9 @@ async def get_current_user(
     """
     Extract and validate user from JWT token
     
-    Validates the JWT token using Supabase's get_user method.
-    The Supabase client validates the token signature and expiration.
+    Verifies the JWT signature and expiration locally. Verified tokens are
+    cached by digest until they expire, and rejected tokens for
+    AUTH_REJECT_CACHE_TTL_SECONDS.
     
     Args:
         credentials: HTTP Bearer token credentials
@@ -37,34 +119,29 @@ async def get_current_user(
         HTTPException: If token is invalid, expired, or user not found
     """
     token = credentials.credentials
+    digest = token_digest(token)
+    
+    # Mobile clients reuse one token for many calls; serve repeat
+    # verifications from the cache until the token expires
+    user = _verified_tokens.get(digest)
+    if user is not None:
+        _token_cache_counters["hits"] += 1
+        return dict(user)
     
+    rejected_detail = _rejected_tokens.get(digest)
+    if rejected_detail is not None:
+        _token_cache_counters["cached_rejects"] += 1
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail=rejected_detail,
+            headers={"WWW-Authenticate": "Bearer"},
+        )
+    
+    _token_cache_counters["misses"] += 1
     try:
-        # Use Supabase client to verify token and get user
-        # Create a temporary client instance with the token for validation
-        # The get_user method will validate the JWT token signature and expiration
-        
-        # Note: Supabase Python client's get_user() requires a session
         # For backend validation, we decode the JWT directly
-        # Supabase JWT tokens are signed with the anon key or service role key
-        
-        # Verify token using Supabase anon key (used to sign user tokens)
-        # Supabase uses HS256 algorithm and signs with the anon key
-        try:
-            payload = jwt.decode(
-                token,
-                settings.SUPABASE_ANON_KEY,
-                algorithms=["HS256"],
-                options={"verify_exp": True}
-            )
-        except JWTError:
-            # If anon key doesn't work, try service role key
-            # (though user tokens should be signed with anon key)
-            payload = jwt.decode(
-                token,
-                settings.SUPABASE_KEY,
-                algorithms=["HS256"],
-                options={"verify_exp": True}
-            )
+        # (Supabase Python client's get_user() requires a session)
+        payload = _verify_token(token)
         
         # Extract user information from JWT payload
         user_id = payload.get("sub")
@@ -73,19 +150,20 @@ async def get_current_user(
         app_metadata = payload.get("app_metadata", {})
         
         if not user_id:
-            raise HTTPException(
-                status_code=status.HTTP_401_UNAUTHORIZED,
-                detail="Invalid token: missing user ID",
-                headers={"WWW-Authenticate": "Bearer"},
-            )
+            raise _reject(digest, "Invalid token: missing user ID")
         
-        # Return user data as dictionary
-        return {
+        user = {
             "id": user_id,
             "email": email,
             "user_metadata": user_metadata,
             "app_metadata": app_metadata,
         }
+        ttl = _cache_ttl(payload)
+        if ttl > 0:
+            _verified_tokens.set(digest, user, ttl=ttl)
+        
+        # Return user data as dictionary
+        return dict(user)
         
     except HTTPException:
         raise
@@ -93,16 +171,8 @@ async def get_current_user(
         # Handle JWT-specific errors
         error_msg = str(e)
         if "expired" in error_msg.lower():
-            raise HTTPException(
-                status_code=status.HTTP_401_UNAUTHORIZED,
-                detail="Token has expired",
-                headers={"WWW-Authenticate": "Bearer"},
-            )
-        raise HTTPException(
-            status_code=status.HTTP_401_UNAUTHORIZED,
-            detail="Invalid authentication token",
-            headers={"WWW-Authenticate": "Bearer"},
-        )
+            raise _reject(digest, "Token has expired")
+        raise _reject(digest, "Invalid authentication token")
     except Exception as e:
         # Handle other authentication errors
         error_message = str(e)
@@ -113,4 +183,3 @@ async def get_current_user(
             detail=f"Authentication failed: {error_message}",
             headers={"WWW-Authenticate": "Bearer"},
         )
-
@@ -14,9 +14,66 @@ class Settings(BaseSettings):
     
     # Database
     DATABASE_URL: str = ""
+    DB_MAX_WORKERS: int = 32
     
     # Redis
     REDIS_URL: str = "redis://localhost:6379/0"
+    REDIS_ENABLED: bool = True
+    REDIS_SOCKET_TIMEOUT_SECONDS: float = 0.5
+    REDIS_RETRY_SECONDS: float = 30.0
+    
+    # Product cache
+    PRODUCT_CACHE_MAXSIZE: int = 2048
+    PRODUCT_CACHE_L1_TTL_SECONDS: int = 300
+    PRODUCT_CACHE_L2_TTL_SECONDS: int = 86400
+    NEGATIVE_CACHE_MAXSIZE: int = 4096
+    NEGATIVE_CACHE_TTL_SECONDS: int = 3600
+    NEGATIVE_CACHE_MAX_TTL_SECONDS: int = 604800
+    
+    # User profile cache
+    USER_PROFILE_CACHE_MAXSIZE: int = 10000
+    USER_PROFILE_CACHE_L1_TTL_SECONDS: int = 300
+    USER_PROFILE_CACHE_L2_TTL_SECONDS: int = 3600
+    
+    # Approximate per-user totals for paginated lists
+    COUNT_CACHE_MAXSIZE: int = 10000
+    COUNT_CACHE_TTL_SECONDS: int = 60
+    
+    # Per-user favorited product IDs, for favorite badges on list screens
+    FAVORITE_IDS_CACHE_MAXSIZE: int = 10000
+    FAVORITE_IDS_CACHE_L1_TTL_SECONDS: int = 300
+    FAVORITE_IDS_CACHE_L2_TTL_SECONDS: int = 1800
+    
+    # Search result cache (short-lived: new products should show up quickly)
+    SEARCH_CACHE_MAXSIZE: int = 1000
+    SEARCH_CACHE_TTL_SECONDS: int = 60
+    
+    # Write-behind persistence of newly fetched products
+    PRODUCT_WRITE_BATCH_SIZE: int = 100
+    PRODUCT_WRITE_FLUSH_INTERVAL_SECONDS: float = 0.5
+    PRODUCT_WRITE_QUEUE_SIZE: int = 5000
+    PRODUCT_WRITE_MAX_RETRIES: int = 5
+    PRODUCT_WRITE_RETRY_BACKOFF_SECONDS: float = 0.5
+    
+    # Buffered scan history writes
+    SCAN_WRITE_BATCH_SIZE: int = 200
+    SCAN_WRITE_FLUSH_INTERVAL_SECONDS: float = 1.0
+    SCAN_WRITE_QUEUE_SIZE: int = 10000
+    SCAN_WRITE_MAX_RETRIES: int = 3
+    SCAN_WRITE_RETRY_BACKOFF_SECONDS: float = 0.5
+    
+    # Stale-while-revalidate refresh from Open Food Facts
+    PRODUCT_REFRESH_AFTER_HOURS: float = 168
+    PRODUCT_REFRESH_QUEUE_SIZE: int = 1000
+    OFF_REFRESH_RATE_PER_SECOND: float = 2.0
+    
+    # Healthier-alternatives index (loaded in the background at startup)
+    NUTRITION_INDEX_ENABLED: bool = True
+    NUTRITION_INDEX_PAGE_SIZE: int = 1000
+    NUTRITION_INDEX_SYNC_SECONDS: int = 60
+    
+    # Allergen matching
+    ALLERGEN_ALIAS_RELOAD_SECONDS: int = 300
     
     # API
     API_V1_PREFIX: str = "/api/v1"
@@ -25,12 +82,24 @@ class Settings(BaseSettings):
     
     # External APIs
     OPEN_FOOD_FACTS_BASE_URL: str = "https://world.openfoodfacts.org/api/v0"
+    OFF_TIMEOUT_SECONDS: float = 10.0
+    OFF_HTTP2: bool = True
+    OFF_MAX_CONNECTIONS: int = 50
+    OFF_MAX_KEEPALIVE_CONNECTIONS: int = 20
+    OFF_KEEPALIVE_EXPIRY_SECONDS: float = 30.0
+    OFF_BATCH_CONCURRENCY: int = 8
+    OFF_IMPORT_BATCH_SIZE: int = 1000
     USDA_API_KEY: str = ""
     
     # Security
     SECRET_KEY: str
     ALGORITHM: str = "HS256"
     ACCESS_TOKEN_EXPIRE_MINUTES: int = 30
+    AUTH_TOKEN_CACHE_MAXSIZE: int = 10000
+    AUTH_TOKEN_CACHE_MAX_TTL_SECONDS: int = 3600
+    AUTH_REJECT_CACHE_TTL_SECONDS: int = 60
+    ADMIN_DECISION_CACHE_MAXSIZE: int = 1024
+    ADMIN_DECISION_CACHE_TTL_SECONDS: int = 60
     
     # CORS
     CORS_ORIGINS: List[str] = ["http://localhost:3000", "http://localhost:8081"]
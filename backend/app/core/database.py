@@ -1,12 +1,21 @@
 """Database connection and session management"""
 
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
 from supabase import create_client, Client
+from postgrest import APIResponse
 from app.core.config import settings
-from typing import Optional
+from typing import Any, Callable, Optional, TypeVar
+
+T = TypeVar("T")
 
 # Lazy initialization of Supabase client
 _supabase_client: Optional[Client] = None
 
+# Bounded pool that runs the synchronous supabase-py calls off the event loop
+_db_executor: Optional[ThreadPoolExecutor] = None
+
 def get_supabase_client() -> Client:
     """Get Supabase client instance (lazy initialization)"""
     global _supabase_client
@@ -25,3 +34,37 @@ def get_supabase_client() -> Client:
             raise
     return _supabase_client
 
+
+def get_db_executor() -> ThreadPoolExecutor:
+    """Get the database thread pool (lazy initialization)"""
+    global _db_executor
+    if _db_executor is None:
+        _db_executor = ThreadPoolExecutor(
+            max_workers=settings.DB_MAX_WORKERS,
+            thread_name_prefix="supabase"
+        )
+    return _db_executor
+
+
+async def run_blocking(fn: Callable[..., T], *args: Any, **kwargs: Any) -> T:
+    """
+    Run a blocking Supabase call in the database thread pool
+    
+    supabase-py is synchronous, so calling it directly from an async route
+    freezes the whole worker for the duration of the HTTP round trip.
+    """
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(get_db_executor(), partial(fn, *args, **kwargs))
+
+
+async def execute_query(query: Any) -> APIResponse:
+    """Execute a PostgREST query builder without blocking the event loop"""
+    return await run_blocking(query.execute)
+
+
+def shutdown_db_executor() -> None:
+    """Wait for in-flight queries and stop the database thread pool"""
+    global _db_executor
+    if _db_executor is not None:
+        _db_executor.shutdown(wait=True)
+    _db_executor = None
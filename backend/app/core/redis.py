@@ -0,0 +1,53 @@
+"""Redis connection management"""
+
+import time
+from typing import Optional
+from redis.asyncio import Redis, from_url
+from app.core.config import settings
+
+# Lazy initialization of Redis client
+_redis_client: Optional[Redis] = None
+_unavailable_until: float = 0.0
+
+
+def get_redis_client() -> Optional[Redis]:
+    """
+    Get Redis client instance (lazy initialization)
+
+    Returns None when Redis is disabled or was recently unreachable, so callers
+    can fall back to their in-process tier without paying a connect timeout
+    on every request.
+    """
+    global _redis_client
+    if not settings.REDIS_ENABLED:
+        return None
+    if time.monotonic() < _unavailable_until:
+        return None
+    if _redis_client is None:
+        _redis_client = from_url(
+            settings.REDIS_URL,
+            decode_responses=True,
+            socket_timeout=settings.REDIS_SOCKET_TIMEOUT_SECONDS,
+            socket_connect_timeout=settings.REDIS_SOCKET_TIMEOUT_SECONDS,
+        )
+    return _redis_client
+
+
+def mark_redis_unavailable(error: Exception) -> None:
+    """Skip Redis for REDIS_RETRY_SECONDS after a connection or command failure"""
+    global _unavailable_until
+    if time.monotonic() >= _unavailable_until:
+        print(f"Redis unavailable, using in-process cache only: {error}")
+    _unavailable_until = time.monotonic() + settings.REDIS_RETRY_SECONDS
+
+
+async def close_redis_client() -> None:
+    """Close the Redis connection pool (called on application shutdown)"""
+    global _redis_client
+    if _redis_client is None:
+        return
+    try:
+        await _redis_client.close()
+    except Exception as e:
+        print(f"Error closing Redis client: {e}")
+    _redis_client = None
@@ -0,0 +1,358 @@
+"""Compiled allergen matcher over normalized ingredient tokens"""
+
+import re
+from collections import deque
+from typing import Dict, FrozenSet, Iterable, List, Optional, Sequence, Tuple
+from app.entities.product.models import Product
+from app.shared.cache import LRUCache
+
+# Seed aliases used until (and in addition to) the ingredient_aliases table.
+# Keys are allergen categories, named after the Open Food Facts allergen tags.
+DEFAULT_ALLERGEN_ALIASES: Dict[str, Tuple[str, ...]] = {
+    "milk": (
+        "milk", "dairy", "lactose", "casein", "caseinate", "whey", "butter",
+        "buttermilk", "cream", "cheese", "ghee", "yogurt", "yoghurt", "curd",
+        "lactalbumin", "lactoglobulin", "lactoserum",
+    ),
+    "eggs": ("egg", "albumen", "albumin", "ovalbumin", "lysozyme", "mayonnaise", "meringue"),
+    "peanuts": ("peanut", "groundnut", "arachis oil", "peanut butter"),
+    "nuts": (
+        "nut", "tree nut", "almond", "hazelnut", "walnut", "cashew", "pecan",
+        "pistachio", "macadamia", "brazil nut", "praline", "marzipan", "almond milk",
+    ),
+    "gluten": (
+        "gluten", "wheat", "barley", "rye", "oat", "spelt", "kamut", "semolina",
+        "durum", "triticale", "malt", "couscous", "oat milk",
+    ),
+    "soybeans": ("soy", "soya", "soybean", "edamame", "tofu", "tempeh", "miso"),
+    "fish": ("fish", "anchovy", "cod", "salmon", "tuna", "sardine", "haddock", "mackerel"),
+    "crustaceans": ("crustacean", "shellfish", "shrimp", "prawn", "crab", "lobster", "crayfish"),
+    "molluscs": ("mollusc", "mollusk", "mussel", "oyster", "squid", "clam", "scallop", "octopus"),
+    "sesame-seeds": ("sesame", "tahini"),
+    "mustard": ("mustard",),
+    "celery": ("celery", "celeriac"),
+    "lupin": ("lupin", "lupine"),
+    "sulphites": (
+        "sulphite", "sulfite", "sulphur dioxide", "sulfur dioxide",
+        "metabisulphite", "metabisulfite", "e220", "e221", "e222", "e223",
+        "e224", "e226", "e227", "e228",
+    ),
+}
+
+# Bit positions of the canonical categories in products.allergen_mask.
+# Stored in the database: only ever append, never reorder or remove.
+ALLERGEN_BITS: Tuple[str, ...] = (
+    "milk", "eggs", "peanuts", "nuts", "gluten", "soybeans", "fish",
+    "crustaceans", "molluscs", "sesame-seeds", "mustard", "celery", "lupin",
+    "sulphites",
+)
+
+# Product fields the allergen bitmask is derived from; a change to any of
+# them means allergen_mask has to be recomputed
+ALLERGEN_SOURCE_FIELDS: Tuple[str, ...] = ("allergens", "ingredients_parsed", "ingredients_raw")
+
+_BIT_BY_CATEGORY = {category: 1 << index for index, category in enumerate(ALLERGEN_BITS)}
+
+# Phrases that contain an allergen word but are not that allergen. The
+# longest match wins, so these shadow e.g. "butter" inside "cocoa butter".
+DEFAULT_NEUTRAL_PHRASES: Tuple[str, ...] = (
+    "cocoa butter", "shea butter", "cream of tartar", "coconut milk",
+    "coconut cream", "rice milk",
+)
+
+_TAG_PREFIX = re.compile(r"^[a-z]{2,3}:")
+_NON_WORD = re.compile(r"[^0-9a-z]+")
+
+# Marker between fields so a match never spans two ingredients
+_BOUNDARY = "|"
+
+# Distinct allergy lists whose compiled form is kept per matcher
+COMPILED_PROFILE_CACHE_SIZE = 4096
+
+# A user allergy as written, with its category or (if unknown) literal tokens
+CompiledAllergy = Tuple[str, Optional[str], Tuple[str, ...]]
+
+
+def _fold(token: str) -> str:
+    """Fold simple English plurals so "peanuts" and "peanut" share a token"""
+    if len(token) > 3 and token.endswith("s") and not token.endswith("ss"):
+        return token[:-1]
+    return token
+
+
+def tokenize(text: str) -> List[str]:
+    """Lowercase, drop `en:`-style tag prefixes and split into folded word tokens"""
+    text = _TAG_PREFIX.sub("", text.strip().lower())
+    return [_fold(token) for token in _NON_WORD.split(text) if token]
+
+
+def normalize_category(category: str) -> str:
+    """Canonical category key: lowercase without a language prefix"""
+    return _TAG_PREFIX.sub("", category.strip().lower())
+
+
+def categories_to_mask(categories: Iterable[str]) -> int:
+    """OR together the bits of canonical categories (others have no bit)"""
+    mask = 0
+    for category in categories:
+        mask |= _BIT_BY_CATEGORY.get(category, 0)
+    return mask
+
+
+class TokenAutomaton:
+    """
+    Aho-Corasick automaton over token sequences
+
+    Patterns are phrases of whole tokens, so "nut" never matches inside
+    "peanut" and one left-to-right pass finds every pattern occurrence.
+    """
+
+    def __init__(self):
+        self._goto: List[Dict[str, int]] = [{}]
+        self._fail: List[int] = [0]
+        self._output: List[List[Tuple[int, Optional[str]]]] = [[]]
+
+    def add(self, tokens: Sequence[str], value: Optional[str]) -> None:
+        """Add a phrase; value is the category it signals (None for neutral phrases)"""
+        node = 0
+        for token in tokens:
+            next_node = self._goto[node].get(token)
+            if next_node is None:
+                next_node = len(self._goto)
+                self._goto[node][token] = next_node
+                self._goto.append({})
+                self._fail.append(0)
+                self._output.append([])
+            node = next_node
+        self._output[node].append((len(tokens), value))
+
+    def build(self) -> None:
+        """Compute failure links breadth-first (call once after all add() calls)"""
+        queue = deque(self._goto[0].values())
+        while queue:
+            node = queue.popleft()
+            for token, child in self._goto[node].items():
+                queue.append(child)
+                fail = self._fail[node]
+                while fail and token not in self._goto[fail]:
+                    fail = self._fail[fail]
+                self._fail[child] = self._goto[fail].get(token, 0)
+                self._output[child] = self._output[child] + self._output[self._fail[child]]
+
+    def find(self, tokens: Sequence[str]) -> List[Tuple[int, int, Optional[str]]]:
+        """Return every (start, end, value) occurrence, end exclusive"""
+        matches = []
+        node = 0
+        for index, token in enumerate(tokens):
+            while node and token not in self._goto[node]:
+                node = self._fail[node]
+            node = self._goto[node].get(token, 0)
+            for length, value in self._output[node]:
+                matches.append((index + 1 - length, index + 1, value))
+        return matches
+
+    def __len__(self) -> int:
+        return len(self._goto)
+
+
+class AllergenMatcher:
+    """
+    Detect allergen categories in a product and match them to user allergies
+
+    Product allergen tags, parsed ingredients and the raw ingredient text are
+    tokenized into one stream and scanned in a single automaton pass.
+    Overlapping matches resolve to the longest phrase, and a phrase directly
+    followed by "free" ("gluten-free") is ignored.
+    """
+
+    def __init__(self, aliases: Iterable[Tuple[str, Optional[str]]]):
+        """
+        Args:
+            aliases: (phrase, category) pairs; a None category marks a
+                neutral phrase that shadows shorter allergen matches. The
+                first pair for a phrase wins, so later (e.g. DB) aliases can
+                add phrases but never remap one seen earlier.
+        """
+        self._automaton = TokenAutomaton()
+        self._phrase_categories: Dict[Tuple[str, ...], Optional[str]] = {}
+        for phrase, category in aliases:
+            tokens = tuple(tokenize(phrase))
+            if not tokens:
+                continue
+            category = normalize_category(category) if category else None
+            if tokens in self._phrase_categories:
+                continue
+            self._phrase_categories[tokens] = category
+        for tokens, category in self._phrase_categories.items():
+            self._automaton.add(tokens, category)
+        self._automaton.build()
+        self.categories: FrozenSet[str] = frozenset(
+            category for category in self._phrase_categories.values() if category
+        )
+        self._compiled_profiles = LRUCache(maxsize=COMPILED_PROFILE_CACHE_SIZE)
+
+    @classmethod
+    def from_defaults(
+        cls,
+        extra_aliases: Iterable[Tuple[str, Optional[str]]] = ()
+    ) -> "AllergenMatcher":
+        """
+        Build a matcher from the seed aliases plus any extra (e.g. DB) aliases
+
+        Extra aliases that repeat a seed phrase are ignored, so a DB row can
+        never change or drop a built-in allergen mapping.
+        """
+        aliases: List[Tuple[str, Optional[str]]] = []
+        for category, phrases in DEFAULT_ALLERGEN_ALIASES.items():
+            aliases.append((category, category))
+            aliases.extend((phrase, category) for phrase in phrases)
+        aliases.extend((phrase, None) for phrase in DEFAULT_NEUTRAL_PHRASES)
+        aliases.extend(extra_aliases)
+        return cls(aliases)
+
+    @property
+    def pattern_count(self) -> int:
+        return len(self._phrase_categories)
+
+    def _product_tokens(self, product: Product) -> List[str]:
+        tokens: List[str] = []
+        fields = list(product.allergens or []) + list(product.ingredients_parsed or [])
+        if product.ingredients_raw:
+            fields.extend(re.split(r"[,;()\[\]]", product.ingredients_raw))
+        for field in fields:
+            field_tokens = tokenize(field)
+            if field_tokens:
+                tokens.extend(field_tokens)
+                tokens.append(_BOUNDARY)
+        return tokens
+
+    @staticmethod
+    def _longest_matches(
+        matches: List[Tuple[int, int, Optional[str]]]
+    ) -> List[Tuple[int, int, Optional[str]]]:
+        selected = []
+        covered_until = 0
+        for start, end, value in sorted(matches, key=lambda m: (m[0], m[0] - m[1])):
+            if start < covered_until:
+                continue
+            selected.append((start, end, value))
+            covered_until = end
+        return selected
+
+    def detect(self, product: Product) -> Dict[str, List[str]]:
+        """Map each allergen category found in the product to the phrases that matched"""
+        return self._detect_tokens(self._product_tokens(product))
+
+    def _detect_tokens(self, tokens: List[str]) -> Dict[str, List[str]]:
+        found: Dict[str, List[str]] = {}
+        for start, end, category in self._longest_matches(self._automaton.find(tokens)):
+            if category is None:
+                continue
+            if end < len(tokens) and tokens[end] == "free":
+                continue
+            phrase = " ".join(tokens[start:end])
+            if phrase not in found.setdefault(category, []):
+                found[category].append(phrase)
+        return found
+
+    def resolve(self, allergy: str) -> Optional[str]:
+        """Map a user allergy ("Peanuts", "dairy", "en:milk") to its category"""
+        tokens = tuple(tokenize(allergy))
+        category = normalize_category(allergy)
+        if category in self.categories:
+            return category
+        return self._phrase_categories.get(tokens)
+
+    def compile_allergies(self, allergies: Iterable[str]) -> Tuple[CompiledAllergy, ...]:
+        """
+        Resolve a user's allergy list once per matcher
+
+        Users share a handful of allergy lists, so the resolved form is
+        memoized by content; a reloaded matcher starts with an empty memo.
+        """
+        key = tuple(allergies)
+        compiled = self._compiled_profiles.get(key)
+        if compiled is None:
+            compiled = tuple(
+                (allergy.strip(), self.resolve(allergy), tuple(tokenize(allergy)))
+                for allergy in key
+            )
+            self._compiled_profiles.set(key, compiled)
+        return compiled
+
+    def product_mask(self, product: Product) -> int:
+        """Bitmask of the canonical allergen categories found in a product"""
+        return categories_to_mask(self.detect(product))
+
+    def allergy_mask(self, allergies: Iterable[str]) -> int:
+        """
+        Bitmask of a user's allergies; a product is safe if the AND with its
+        allergen_mask is zero. Allergies without a canonical category have no
+        bit and are only caught by find_warnings().
+        """
+        return categories_to_mask(
+            category for _, category, _ in self.compile_allergies(allergies) if category
+        )
+
+    def mask_warnings(self, allergen_mask: Optional[int], allergies: Iterable[str]) -> List[str]:
+        """
+        Return the user allergies whose category bit is set in a stored mask
+
+        For listings that skip the ingredient columns; allergies without a
+        canonical category cannot be checked this way.
+        """
+        if not allergen_mask:
+            return []
+        return [
+            label for label, category, _ in self.compile_allergies(allergies)
+            if category and categories_to_mask([category]) & allergen_mask
+        ]
+
+    def find_warnings(self, product: Product, allergies: Iterable[str]) -> List[str]:
+        """
+        Return the user allergies present in the product, as the user wrote them
+
+        Allergies without a known category are matched as literal phrases
+        against the same token stream.
+        """
+        tokens = self._product_tokens(product)
+        detected = None
+        warnings = []
+        for label, category, phrase in self.compile_allergies(allergies):
+            if category:
+                if detected is None:
+                    detected = self._detect_tokens(tokens)
+                if category in detected:
+                    warnings.append(label)
+            elif phrase and _contains_phrase(tokens, list(phrase)):
+                warnings.append(label)
+        return warnings
+
+
+def _contains_phrase(tokens: List[str], phrase: List[str]) -> bool:
+    size = len(phrase)
+    return any(tokens[i:i + size] == phrase for i in range(len(tokens) - size + 1))
+
+
+# Matcher used by ingest paths that cannot await the alias loader; replaced by
+# app.features.allergen.service whenever the alias table is (re)loaded
+_active_matcher: Optional[AllergenMatcher] = None
+
+
+def get_active_allergen_matcher() -> AllergenMatcher:
+    """Get the most recently loaded matcher (seed aliases until the first load)"""
+    global _active_matcher
+    if _active_matcher is None:
+        _active_matcher = AllergenMatcher.from_defaults()
+    return _active_matcher
+
+
+def set_active_allergen_matcher(matcher: AllergenMatcher) -> None:
+    """Install a freshly built matcher for every caller"""
+    global _active_matcher
+    _active_matcher = matcher
+
+
+def compute_allergen_mask(product: Product) -> int:
+    """Allergen bitmask stored with a product at ingest and on corrections"""
+    return get_active_allergen_matcher().product_mask(product)
@@ -0,0 +1,191 @@
+"""Parsing of raw ingredient lists into canonical ingredient names"""
+
+import difflib
+import re
+from typing import Dict, Iterable, List, Optional, Tuple
+from app.shared.cache import LRUCache
+
+# Distinct normalized ingredient strings (and, separately, fuzzy-matched
+# names) kept per parser; least recently used entries are evicted
+PARSE_CACHE_SIZE = 20000
+
+# Fuzzy matching only kicks in for names at least this long, and only for
+# near-identical spellings ("hazelnuts" / "hazlenuts")
+FUZZY_MIN_LENGTH = 4
+FUZZY_CUTOFF = 0.85
+
+_OPENERS = {"(": ")", "[": "]", "{": "}"}
+_CLOSERS = set(_OPENERS.values())
+_SEPARATORS = {",", ";"}
+
+_PERCENT = re.compile(r"(?:\b(?:min|max)\.?\s*)?<?\s*\d+(?:[.,]\d+)?\s*%")
+_SPACES = re.compile(r"\s+")
+_TRIM = " .*:_-\t\n"
+
+
+def normalize_ingredient_text(text: str) -> str:
+    """Lowercase and collapse whitespace; the memo key for a raw string"""
+    return _SPACES.sub(" ", text.strip().lower())
+
+
+def split_top_level(text: str) -> List[str]:
+    """Split on commas and semicolons that are not inside brackets"""
+    parts = []
+    depth = 0
+    current: List[str] = []
+    for char in text:
+        if char in _OPENERS:
+            depth += 1
+        elif char in _CLOSERS and depth:
+            depth -= 1
+        elif char in _SEPARATORS and depth == 0:
+            parts.append("".join(current))
+            current = []
+            continue
+        current.append(char)
+    parts.append("".join(current))
+    return [part for part in parts if part.strip()]
+
+
+def split_nested(item: str) -> Tuple[str, List[str]]:
+    """
+    Separate an item's own name from its bracketed sub-ingredient lists
+
+    "chocolate (cocoa mass, sugar) 20%" -> ("chocolate  20%", ["cocoa mass, sugar"])
+    """
+    name = []
+    nested = []
+    depth = 0
+    current = []
+    for char in item:
+        if char in _OPENERS:
+            if depth:
+                current.append(char)
+            depth += 1
+        elif char in _CLOSERS and depth:
+            depth -= 1
+            if depth:
+                current.append(char)
+            else:
+                nested.append("".join(current))
+                current = []
+        elif depth:
+            current.append(char)
+        else:
+            name.append(char)
+    if current:
+        # Unbalanced bracket: treat the rest as a nested list
+        nested.append("".join(current))
+    return "".join(name), nested
+
+
+def clean_ingredient_name(name: str) -> str:
+    """Drop percentages and "class:" labels ("emulsifier: soy lecithin" -> "soy lecithin")"""
+    name = _PERCENT.sub(" ", name)
+    if ":" in name:
+        name = name.rsplit(":", 1)[1]
+    return _SPACES.sub(" ", name).strip(_TRIM)
+
+
+class IngredientParser:
+    """
+    Turn ingredients_raw into a flat list of canonical ingredient names
+
+    Nested lists are flattened after their parent ("chocolate (cocoa,
+    sugar)" -> chocolate, cocoa, sugar). Names are mapped through the alias
+    table, with a close-spelling fallback. Whole strings are memoized by
+    their normalized form, since the same ingredient lists recur across
+    many products.
+    """
+
+    def __init__(self, aliases: Iterable[Tuple[str, str]] = ()):
+        """
+        Args:
+            aliases: (alias, canonical_name) pairs, e.g. from ingredient_aliases
+        """
+        self._canonical: Dict[str, str] = {}
+        for alias, canonical_name in aliases:
+            canonical = normalize_ingredient_text(canonical_name)
+            self._canonical[normalize_ingredient_text(alias)] = canonical
+            self._canonical.setdefault(canonical, canonical)
+        self._names = list(self._canonical)
+        self._name_memo = LRUCache(maxsize=PARSE_CACHE_SIZE)
+        self._parses = LRUCache(maxsize=PARSE_CACHE_SIZE)
+        self.hits = 0
+        self.misses = 0
+
+    def canonicalize(self, name: str) -> str:
+        """Map one cleaned ingredient name to its canonical form"""
+        canonical = self._canonical.get(name)
+        if canonical is not None:
+            return canonical
+
+        canonical = self._name_memo.get(name)
+        if canonical is None:
+            canonical = name
+            if len(name) >= FUZZY_MIN_LENGTH and self._names:
+                close = difflib.get_close_matches(name, self._names, n=1, cutoff=FUZZY_CUTOFF)
+                if close:
+                    canonical = self._canonical[close[0]]
+            self._name_memo.set(name, canonical)
+        return canonical
+
+    def _parse_list(self, text: str, names: List[str]) -> None:
+        for item in split_top_level(text):
+            own_name, nested = split_nested(item)
+            name = clean_ingredient_name(own_name)
+            if name:
+                names.append(self.canonicalize(name))
+            for sub_list in nested:
+                self._parse_list(sub_list, names)
+
+    def parse(self, text: Optional[str]) -> List[str]:
+        """Parse a raw ingredient list; repeated strings are served from the memo"""
+        if not text or not text.strip():
+            return []
+        key = normalize_ingredient_text(text)
+        parsed = self._parses.get(key)
+        if parsed is not None:
+            self.hits += 1
+            return list(parsed)
+
+        self.misses += 1
+        names: List[str] = []
+        self._parse_list(key, names)
+        # Keep first occurrences only ("sugar" often appears at several levels)
+        parsed = tuple(dict.fromkeys(names))
+        self._parses.set(key, parsed)
+        return list(parsed)
+
+    def stats(self) -> Dict[str, int]:
+        """Memo size and hit counters for monitoring"""
+        return {
+            "aliases": len(self._canonical),
+            "memo_size": len(self._parses),
+            "hits": self.hits,
+            "misses": self.misses,
+        }
+
+
+# Parser used by ingest paths; replaced by app.features.allergen.service
+# whenever the alias table is (re)loaded
+_active_parser: Optional[IngredientParser] = None
+
+
+def get_active_ingredient_parser() -> IngredientParser:
+    """Get the most recently loaded parser (no aliases until the first load)"""
+    global _active_parser
+    if _active_parser is None:
+        _active_parser = IngredientParser()
+    return _active_parser
+
+
+def set_active_ingredient_parser(parser: IngredientParser) -> None:
+    """Install a freshly built parser for every caller"""
+    global _active_parser
+    _active_parser = parser
+
+
+def parse_ingredients(text: Optional[str]) -> List[str]:
+    """Parse ingredients_raw with the active parser"""
+    return get_active_ingredient_parser().parse(text)
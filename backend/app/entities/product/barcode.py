@@ -0,0 +1,62 @@
+"""Barcode validation and canonicalization"""
+
+import re
+
+# Lengths of the GS1 GTIN family: GTIN-8 (EAN-8), GTIN-12 (UPC-A),
+# GTIN-13 (EAN-13) and GTIN-14
+GTIN_LENGTHS = (8, 12, 13, 14)
+
+_SEPARATORS = re.compile(r"[\s-]")
+
+# ASCII digits only, like '^[0-9]+$' in the SQL mirror; str.isdigit() also
+# accepts characters such as "²" that int() cannot parse
+_DIGITS = re.compile(r"[0-9]+")
+
+
+def gtin_check_digit(body: str) -> int:
+    """
+    Compute the GS1 check digit for a GTIN without its check digit
+
+    Digits are weighted 3, 1, 3, ... starting from the rightmost one.
+    """
+    total = sum(
+        int(digit) * (3 if position % 2 == 0 else 1)
+        for position, digit in enumerate(reversed(body))
+    )
+    return (10 - total % 10) % 10
+
+
+def is_valid_gtin(code: str) -> bool:
+    """Check that a code is a GTIN-8/12/13/14 with a correct check digit"""
+    if not _DIGITS.fullmatch(code) or len(code) not in GTIN_LENGTHS:
+        return False
+    return gtin_check_digit(code[:-1]) == int(code[-1])
+
+
+def normalize_barcode(code: str) -> str:
+    """
+    Canonicalize a scanned code to the key used by every lookup path
+
+    Valid GTINs are zero-padded to GTIN-14 and then shortened:
+    - GTIN-8 codes (padded with six zeros) become their 8 digits
+    - codes with a leading zero become EAN-13, so a 12-digit UPC-A, its
+      13-digit EAN form and its GTIN-14 form share one key
+    - GTIN-14 codes with a packaging indicator keep all 14 digits
+
+    Anything else (QR payloads, internal codes, bad check digits) is only
+    stripped, so it still works as an exact-match key.
+
+    Must stay in sync with normalize_barcode() in
+    migrations/009_add_products_barcode_normalized.sql.
+    """
+    stripped = code.strip()
+    digits = _SEPARATORS.sub("", stripped)
+    if not is_valid_gtin(digits):
+        return stripped
+
+    gtin14 = digits.zfill(14)
+    if gtin14.startswith("000000"):
+        return gtin14[6:]
+    if gtin14.startswith("0"):
+        return gtin14[1:]
+    return gtin14
@@ -0,0 +1,115 @@
+"""Read-through product cache shared by product lookups and admin corrections"""
+
+import time
+from typing import Iterable, Optional
+from app.core.config import settings
+from app.entities.product.models import Product
+from app.entities.product.barcode import normalize_barcode
+from app.shared.cache import TwoTierCache
+
+# Products are cached under both their normalized barcode and their ID so
+# scans and product detail views share the same entries. Corrections and
+# refreshes invalidate the entries on every worker through Redis pub/sub.
+product_cache = TwoTierCache(
+    namespace="product",
+    maxsize=settings.PRODUCT_CACHE_MAXSIZE,
+    l1_ttl=settings.PRODUCT_CACHE_L1_TTL_SECONDS,
+    l2_ttl=settings.PRODUCT_CACHE_L2_TTL_SECONDS,
+    broadcast_invalidations=True,
+)
+
+# Barcodes unknown to Open Food Facts. Only consulted after a DB miss, so
+# products inserted by any writer are served regardless. Entries outlive
+# their retry window so repeated misses can back off exponentially.
+negative_cache = TwoTierCache(
+    namespace="product-missing",
+    maxsize=settings.NEGATIVE_CACHE_MAXSIZE,
+    l1_ttl=settings.NEGATIVE_CACHE_MAX_TTL_SECONDS,
+    l2_ttl=settings.NEGATIVE_CACHE_MAX_TTL_SECONDS,
+)
+
+
+def _barcode_key(barcode: str) -> str:
+    return f"barcode:{normalize_barcode(barcode)}"
+
+
+def _id_key(product_id: str) -> str:
+    return f"id:{product_id}"
+
+
+async def get_cached_product_by_barcode(barcode: str) -> Optional[Product]:
+    """Get a product from the cache by barcode"""
+    data = await product_cache.get(_barcode_key(barcode))
+    # Build a fresh model on every hit so per-request mutations (e.g. warnings)
+    # never leak into the cached copy
+    return Product(**data) if data else None
+
+
+async def get_cached_product_by_id(product_id: str) -> Optional[Product]:
+    """Get a product from the cache by ID"""
+    data = await product_cache.get(_id_key(product_id))
+    return Product(**data) if data else None
+
+
+async def cache_product(product: Product) -> None:
+    """Store a product under its barcode and, once persisted, its ID"""
+    data = product.model_dump(mode="json", exclude={"warnings"})
+    await product_cache.set(_barcode_key(product.barcode), data)
+    if product.id:
+        await product_cache.set(_id_key(product.id), data)
+
+
+async def invalidate_product(
+    product_id: Optional[str] = None,
+    barcode: Optional[str] = None
+) -> None:
+    """Drop a product from every cache tier after it changes"""
+    keys = []
+    if product_id:
+        keys.append(_id_key(product_id))
+    if barcode:
+        keys.append(_barcode_key(barcode))
+    await product_cache.delete(*keys)
+
+
+async def invalidate_products(
+    product_ids: Iterable[str] = (),
+    barcodes: Iterable[str] = ()
+) -> None:
+    """Drop many products from every cache tier with a single delete"""
+    keys = [_id_key(product_id) for product_id in product_ids]
+    keys.extend(_barcode_key(barcode) for barcode in barcodes)
+    if keys:
+        await product_cache.delete(*keys)
+
+
+async def is_known_missing(barcode: str) -> bool:
+    """Check whether a barcode is inside its negative-cache retry window"""
+    entry = await negative_cache.get(normalize_barcode(barcode))
+    return entry is not None and entry["retry_after"] > time.time()
+
+
+async def remember_missing(barcode: str) -> None:
+    """
+    Record that a barcode is unknown upstream
+    
+    The retry window doubles with every consecutive miss, starting at
+    NEGATIVE_CACHE_TTL_SECONDS and capped at NEGATIVE_CACHE_MAX_TTL_SECONDS.
+    """
+    barcode = normalize_barcode(barcode)
+    entry = await negative_cache.get(barcode)
+    misses = (entry["misses"] if entry else 0) + 1
+    backoff = min(
+        settings.NEGATIVE_CACHE_TTL_SECONDS * 2 ** (misses - 1),
+        settings.NEGATIVE_CACHE_MAX_TTL_SECONDS
+    )
+    await negative_cache.set(
+        barcode,
+        {"misses": misses, "retry_after": time.time() + backoff},
+        ttl=backoff + settings.NEGATIVE_CACHE_MAX_TTL_SECONDS
+    )
+
+
+async def forget_missing(*barcodes: str) -> None:
+    """Clear negative-cache entries once products with these barcodes exist"""
+    await negative_cache.delete(*[normalize_barcode(barcode) for barcode in barcodes])
@@ -29,6 +29,7 @@ class Product(BaseModel):
     """Product model"""
     id: Optional[str] = None
     barcode: str
+    barcode_normalized: Optional[str] = None  # Canonical GTIN lookup key
     name: str
     brand: Optional[str] = None
     category: Optional[str] = None
@@ -38,11 +39,14 @@ class Product(BaseModel):
     ingredients_parsed: Optional[List[str]] = None
     nutrition: Optional[Nutrition] = None
     allergens: Optional[List[str]] = None
+    allergen_mask: Optional[int] = None  # Canonical allergen bits (see entities/allergen)
     warnings: Optional[List[str]] = None
     images: Optional[List[str]] = None
     health_score: Optional[float] = None
     nutriscore_grade: Optional[str] = None  # A, B, C, D, or E
     source: Optional[str] = None
+    corrected_fields: Optional[List[str]] = None  # Set by approved corrections; kept on refresh
+    last_fetched_at: Optional[datetime] = None  # Last successful fetch from source
     created_at: Optional[datetime] = None
     updated_at: Optional[datetime] = None
     
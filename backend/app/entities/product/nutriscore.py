@@ -0,0 +1,139 @@
+"""Nutri-Score calculation from per-100g nutrition facts"""
+
+from bisect import bisect_left
+from typing import Iterable, Optional, Tuple
+import numpy as np
+from app.entities.product.models import NutritionFacts, Product
+
+# Points are the number of thresholds a value exceeds (2017 general-food
+# table). Fruit/vegetable content is not stored, so it never earns points;
+# beverages and cheese use other tables and are scored as general food.
+ENERGY_KJ_THRESHOLDS = (335, 670, 1005, 1340, 1675, 2010, 2345, 2680, 3015, 3350)
+SUGARS_THRESHOLDS = (4.5, 9, 13.5, 18, 22.5, 27, 31, 36, 40, 45)
+SATURATED_FAT_THRESHOLDS = (1, 2, 3, 4, 5, 6, 7, 8, 9, 10)
+SODIUM_MG_THRESHOLDS = (90, 180, 270, 360, 450, 540, 630, 720, 810, 900)
+FIBER_THRESHOLDS = (0.9, 1.9, 2.8, 3.7, 4.7)
+PROTEINS_THRESHOLDS = (1.6, 3.2, 4.8, 6.4, 8.0)
+
+# Proteins stop counting once negative points reach this
+PROTEIN_CAP_POINTS = 11
+
+# Highest score of each grade; anything above the last is E
+GRADE_UPPER_BOUNDS = ((-1, "A"), (2, "B"), (10, "C"), (18, "D"))
+
+# Column order of the batch input (see facts_to_columns)
+BATCH_COLUMNS = ("energy_kj", "sugars", "saturated_fat", "sodium_mg", "fiber", "proteins")
+
+
+def _inputs(facts: Optional[NutritionFacts]) -> Optional[Tuple[float, ...]]:
+    """Values in BATCH_COLUMNS order, or None if a negative component is unknown"""
+    if facts is None:
+        return None
+    energy_kj = facts.energy_kj
+    if energy_kj is None and facts.energy_kcal is not None:
+        energy_kj = facts.energy_kcal * 4.184
+    sodium_mg = facts.sodium * 1000 if facts.sodium is not None else None
+    if sodium_mg is None and facts.salt is not None:
+        sodium_mg = facts.salt * 400
+    if energy_kj is None or facts.sugars is None or facts.saturated_fat is None or sodium_mg is None:
+        return None
+    return (energy_kj, facts.sugars, facts.saturated_fat, sodium_mg, facts.fiber or 0.0, facts.proteins or 0.0)
+
+
+def score_to_grade(score: int) -> str:
+    """Letter grade for a Nutri-Score"""
+    for upper_bound, grade in GRADE_UPPER_BOUNDS:
+        if score <= upper_bound:
+            return grade
+    return "E"
+
+
+def compute_nutriscore(facts: Optional[NutritionFacts]) -> Optional[Tuple[int, str]]:
+    """
+    Nutri-Score of one product
+
+    Returns:
+        (score, grade), or None if energy, sugars, saturated fat or salt is missing
+    """
+    values = _inputs(facts)
+    if values is None:
+        return None
+    energy_kj, sugars, saturated_fat, sodium_mg, fiber, proteins = values
+    negative = (
+        bisect_left(ENERGY_KJ_THRESHOLDS, energy_kj)
+        + bisect_left(SUGARS_THRESHOLDS, sugars)
+        + bisect_left(SATURATED_FAT_THRESHOLDS, saturated_fat)
+        + bisect_left(SODIUM_MG_THRESHOLDS, sodium_mg)
+    )
+    positive = bisect_left(FIBER_THRESHOLDS, fiber)
+    if negative < PROTEIN_CAP_POINTS:
+        positive += bisect_left(PROTEINS_THRESHOLDS, proteins)
+    score = negative - positive
+    return score, score_to_grade(score)
+
+
+def facts_to_columns(facts: Iterable[Optional[NutritionFacts]]) -> np.ndarray:
+    """Stack facts into an (n, 6) float array; rows missing a required value are NaN"""
+    nan_row = (np.nan,) * len(BATCH_COLUMNS)
+    return np.array([_inputs(item) or nan_row for item in facts], dtype=np.float64).reshape(-1, len(BATCH_COLUMNS))
+
+
+def _points(values: np.ndarray, thresholds: Tuple[float, ...]) -> np.ndarray:
+    return np.searchsorted(np.asarray(thresholds, dtype=np.float64), values, side="left")
+
+
+def compute_nutriscores(columns: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Nutri-Scores of many products at once
+
+    Args:
+        columns: (n, 6) array in BATCH_COLUMNS order, NaN rows for unknown inputs
+
+    Returns:
+        (scores, grades): float scores with NaN where unknown, and grade
+        strings with "" where unknown
+    """
+    energy_kj, sugars, saturated_fat, sodium_mg, fiber, proteins = columns.T
+    negative = (
+        _points(energy_kj, ENERGY_KJ_THRESHOLDS)
+        + _points(sugars, SUGARS_THRESHOLDS)
+        + _points(saturated_fat, SATURATED_FAT_THRESHOLDS)
+        + _points(sodium_mg, SODIUM_MG_THRESHOLDS)
+    )
+    positive = _points(fiber, FIBER_THRESHOLDS) + np.where(
+        negative < PROTEIN_CAP_POINTS, _points(proteins, PROTEINS_THRESHOLDS), 0
+    )
+    scores = (negative - positive).astype(np.float64)
+    known = ~np.isnan(columns).any(axis=1)
+    scores[~known] = np.nan
+
+    bounds = np.array([upper_bound for upper_bound, _ in GRADE_UPPER_BOUNDS], dtype=np.float64)
+    letters = np.array([grade for _, grade in GRADE_UPPER_BOUNDS] + ["E"])
+    grades = np.where(known, letters[np.searchsorted(bounds, np.nan_to_num(scores), side="left")], "")
+    return scores, grades
+
+
+def apply_nutriscore(product: Product, overwrite: bool = False) -> bool:
+    """
+    Fill health_score and nutriscore_grade from the product's nutrition
+
+    Values already present (e.g. copied from Open Food Facts) are kept
+    unless overwrite is set.
+
+    Args:
+        overwrite: Replace existing values (e.g. after nutrition was corrected)
+
+    Returns:
+        True if a score was computed
+    """
+    if not overwrite and product.health_score is not None and product.nutriscore_grade:
+        return False
+    per_100g = product.nutrition.per_100g if product.nutrition else None
+    result = compute_nutriscore(per_100g)
+    if result is None:
+        return False
+    if overwrite or product.health_score is None:
+        product.health_score = float(result[0])
+    if overwrite or not product.nutriscore_grade:
+        product.nutriscore_grade = result[1]
+    return True
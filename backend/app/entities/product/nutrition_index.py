@@ -0,0 +1,246 @@
+"""In-memory nearest-neighbour index of per-100g nutrition, partitioned by category"""
+
+import math
+from typing import Dict, List, Optional, Tuple
+import numpy as np
+from app.entities.product.models import NutritionFacts, Product
+
+# Vector components, each divided by its adult daily reference intake so a
+# unit of distance means the same everywhere. energy_kj and sodium are unit
+# conversions of energy_kcal and salt and only fill those in when missing.
+VECTOR_FIELDS = (
+    "energy_kcal",
+    "fat",
+    "saturated_fat",
+    "carbohydrates",
+    "sugars",
+    "fiber",
+    "proteins",
+    "salt",
+)
+REFERENCE_INTAKES = np.array([2000, 70, 20, 260, 90, 25, 50, 6], dtype=np.float32)
+
+# Products with fewer known components are not indexed
+MIN_KNOWN_FIELDS = 3
+
+# Distance charged per component a candidate lacks (a quarter of a daily intake)
+MISSING_PENALTY = 0.25
+
+# Nutri-Score grades as sortable codes; unknown grades sort after E
+GRADE_CODES = {"A": 0, "B": 1, "C": 2, "D": 3, "E": 4}
+UNKNOWN_GRADE = len(GRADE_CODES)
+
+# allergen_mask value for products whose mask is not computed yet
+UNKNOWN_MASK = -1
+
+_INITIAL_CAPACITY = 64
+
+
+def category_key(category: Optional[str]) -> Optional[str]:
+    """
+    Partition key for a category string
+
+    OFF lists categories from general to specific ("Spreads, Sweet spreads,
+    Hazelnut spreads"); the most specific one holds the closest substitutes.
+    """
+    if not category:
+        return None
+    parts = [part.strip().lower() for part in category.split(",") if part.strip()]
+    if not parts:
+        return None
+    key = parts[-1]
+    return key.split(":", 1)[1] if len(key) > 3 and key[2] == ":" else key
+
+
+def nutrition_vector(facts: Optional[NutritionFacts]) -> Optional[np.ndarray]:
+    """Scaled per-100g vector with NaN for unknown components, or None if too sparse"""
+    if facts is None:
+        return None
+    values = [getattr(facts, field) for field in VECTOR_FIELDS]
+    if values[0] is None and facts.energy_kj is not None:
+        values[0] = facts.energy_kj / 4.184
+    if values[-1] is None and facts.sodium is not None:
+        values[-1] = facts.sodium * 2.5
+    vector = np.array([math.nan if value is None else value for value in values], dtype=np.float32)
+    if np.count_nonzero(~np.isnan(vector)) < MIN_KNOWN_FIELDS:
+        return None
+    return vector / REFERENCE_INTAKES
+
+
+class _Partition:
+    """Growable column arrays for one category; removed rows are tombstoned"""
+
+    def __init__(self, capacity: int = _INITIAL_CAPACITY):
+        self.ids: List[Optional[str]] = []
+        self.vectors = np.empty((capacity, len(VECTOR_FIELDS)), dtype=np.float32)
+        self.grades = np.empty(capacity, dtype=np.int8)
+        self.masks = np.empty(capacity, dtype=np.int64)
+        self.live = np.zeros(capacity, dtype=bool)
+        self.dead = 0
+
+    @property
+    def size(self) -> int:
+        return len(self.ids)
+
+    def _grow(self) -> None:
+        capacity = len(self.live) * 2
+        self.vectors = np.resize(self.vectors, (capacity, len(VECTOR_FIELDS)))
+        self.grades = np.resize(self.grades, capacity)
+        self.masks = np.resize(self.masks, capacity)
+        live = np.zeros(capacity, dtype=bool)
+        live[:self.size] = self.live[:self.size]
+        self.live = live
+
+    def append(self, product_id: str, vector: np.ndarray, grade: int, mask: int) -> int:
+        if self.size == len(self.live):
+            self._grow()
+        row = self.size
+        self.ids.append(product_id)
+        self.put(row, vector, grade, mask)
+        return row
+
+    def put(self, row: int, vector: np.ndarray, grade: int, mask: int) -> None:
+        self.vectors[row] = vector
+        self.grades[row] = grade
+        self.masks[row] = mask
+        self.live[row] = True
+
+    def remove(self, row: int) -> None:
+        self.ids[row] = None
+        self.live[row] = False
+        self.dead += 1
+
+
+class NutritionIndex:
+    """
+    Nearest neighbours by nutrition within a product's category
+
+    Each category keeps its vectors, grades and allergen masks in NumPy
+    arrays, so a query is a handful of vectorized passes over one partition
+    rather than a scan of the catalog. upsert() and remove() keep it current
+    as products are inserted or corrected.
+    """
+
+    def __init__(self):
+        self._partitions: Dict[str, _Partition] = {}
+        self._rows: Dict[str, Tuple[str, int]] = {}
+
+    def __len__(self) -> int:
+        return len(self._rows)
+
+    def __contains__(self, product_id: str) -> bool:
+        return product_id in self._rows
+
+    def upsert(self, product: Product) -> bool:
+        """
+        Add or update a product; returns False (and drops any stale entry) if
+        it lacks an ID, a category or enough nutrition data to be compared
+        """
+        key = category_key(product.category)
+        per_100g = product.nutrition.per_100g if product.nutrition else None
+        vector = nutrition_vector(per_100g)
+        if not product.id or key is None or vector is None:
+            if product.id:
+                self.remove(product.id)
+            return False
+
+        grade = GRADE_CODES.get((product.nutriscore_grade or "").upper(), UNKNOWN_GRADE)
+        mask = UNKNOWN_MASK if product.allergen_mask is None else product.allergen_mask
+        current = self._rows.get(product.id)
+        if current and current[0] == key:
+            self._partitions[key].put(current[1], vector, grade, mask)
+            return True
+        if current:
+            self.remove(product.id)
+
+        partition = self._partitions.get(key)
+        if partition is None:
+            partition = self._partitions[key] = _Partition()
+        self._rows[product.id] = (key, partition.append(product.id, vector, grade, mask))
+        return True
+
+    def remove(self, product_id: str) -> None:
+        """Drop a product, compacting its partition once half of it is tombstones"""
+        current = self._rows.pop(product_id, None)
+        if current is None:
+            return
+        key, row = current
+        partition = self._partitions[key]
+        partition.remove(row)
+        if partition.dead * 2 >= partition.size:
+            self._compact(key)
+
+    def _compact(self, key: str) -> None:
+        old = self._partitions[key]
+        rows = np.flatnonzero(old.live[:old.size])
+        if not len(rows):
+            del self._partitions[key]
+            return
+        count = len(rows)
+        partition = _Partition(capacity=max(_INITIAL_CAPACITY, count * 2))
+        partition.ids = [old.ids[row] for row in rows]
+        partition.vectors[:count] = old.vectors[rows]
+        partition.grades[:count] = old.grades[rows]
+        partition.masks[:count] = old.masks[rows]
+        partition.live[:count] = True
+        for new_row, product_id in enumerate(partition.ids):
+            if product_id is not None:
+                self._rows[product_id] = (key, new_row)
+        self._partitions[key] = partition
+
+    def nearest(
+        self,
+        product_id: str,
+        limit: int = 10,
+        exclude_allergen_mask: int = 0
+    ) -> List[Tuple[str, float]]:
+        """
+        Closest products in the same category with a better Nutri-Score
+
+        Products without a grade count as worse than E, so for an ungraded
+        product any graded neighbour qualifies. With exclude_allergen_mask,
+        products sharing a bit with it, or whose mask is unknown, are skipped.
+
+        Returns:
+            (product_id, distance) pairs, nearest first; empty if the product
+            is not indexed
+        """
+        current = self._rows.get(product_id)
+        if current is None:
+            return []
+        key, row = current
+        partition = self._partitions[key]
+        size = partition.size
+        grade = partition.grades[row]
+
+        candidates = partition.live[:size] & (partition.grades[:size] < grade)
+        if exclude_allergen_mask:
+            masks = partition.masks[:size]
+            candidates &= (masks != UNKNOWN_MASK) & (masks & exclude_allergen_mask == 0)
+        rows = np.flatnonzero(candidates)
+        if not len(rows):
+            return []
+
+        query = partition.vectors[row]
+        known = ~np.isnan(query)
+        diffs = partition.vectors[rows][:, known] - query[known]
+        distances = np.sqrt(np.square(np.nan_to_num(diffs, nan=MISSING_PENALTY)).sum(axis=1))
+
+        if len(rows) > limit:
+            top = np.argpartition(distances, limit - 1)[:limit]
+        else:
+            top = np.arange(len(rows))
+        top = top[np.argsort(distances[top], kind="stable")]
+        return [(partition.ids[rows[i]], float(distances[i])) for i in top]
+
+    def stats(self) -> Dict[str, int]:
+        """Index size for monitoring"""
+        return {
+            "products": len(self._rows),
+            "categories": len(self._partitions),
+            "largest_category": max((p.size - p.dead for p in self._partitions.values()), default=0),
+        }
+
+
+# Shared by lookups, the background loader and the correction workflow
+nutrition_index = NutritionIndex()
@@ -1,17 +1,87 @@
 """Open Food Facts API client"""
 
 import httpx
-from typing import Optional
+from typing import Optional, Tuple
 from app.core.config import settings
 from app.entities.product.models import Product, Nutrition, NutritionFacts
+from app.entities.product.barcode import normalize_barcode
+from app.entities.product.nutriscore import apply_nutriscore
+from app.entities.allergen.matcher import compute_allergen_mask
+from app.entities.ingredient.parser import parse_ingredients
+
+DEFAULT_HEADERS = {
+    "User-Agent": "BiteCheck/1.0 (Integration Test)",
+    "Accept": "application/json"
+}
+
+# Shared connection pool, created and closed by the application lifespan
+_http_client: Optional[httpx.AsyncClient] = None
+
+
+def create_off_http_client(
+    transport: Optional[httpx.AsyncBaseTransport] = None
+) -> httpx.AsyncClient:
+    """
+    Create a pooled HTTP client for Open Food Facts
+    
+    Keep-alive connections (and HTTP/2 multiplexing when enabled) let every
+    lookup after the first skip DNS, TCP connect and the TLS handshake.
+    
+    Args:
+        transport: Optional transport override (e.g. a local stand-in in tests)
+    """
+    return httpx.AsyncClient(
+        timeout=settings.OFF_TIMEOUT_SECONDS,
+        headers=DEFAULT_HEADERS,
+        http2=settings.OFF_HTTP2,
+        limits=httpx.Limits(
+            max_connections=settings.OFF_MAX_CONNECTIONS,
+            max_keepalive_connections=settings.OFF_MAX_KEEPALIVE_CONNECTIONS,
+            keepalive_expiry=settings.OFF_KEEPALIVE_EXPIRY_SECONDS,
+        ),
+        transport=transport,
+    )
+
+
+def get_off_http_client() -> httpx.AsyncClient:
+    """Get the shared HTTP client (lazy initialization outside the app lifespan)"""
+    global _http_client
+    if _http_client is None or _http_client.is_closed:
+        _http_client = create_off_http_client()
+    return _http_client
+
+
+async def init_off_http_client(client: Optional[httpx.AsyncClient] = None) -> httpx.AsyncClient:
+    """Open the shared HTTP client, or install a caller-provided one"""
+    global _http_client
+    await close_off_http_client()
+    _http_client = client or create_off_http_client()
+    return _http_client
+
+
+async def close_off_http_client() -> None:
+    """Close the shared HTTP client and its connection pool"""
+    global _http_client
+    if _http_client is not None:
+        await _http_client.aclose()
+    _http_client = None
 
 
 class OpenFoodFactsClient:
     """Client for Open Food Facts API"""
     
-    def __init__(self):
-        self.base_url = settings.OPEN_FOOD_FACTS_BASE_URL
-        self.timeout = 10.0
+    def __init__(
+        self,
+        http_client: Optional[httpx.AsyncClient] = None,
+        base_url: Optional[str] = None
+    ):
+        self.base_url = base_url or settings.OPEN_FOOD_FACTS_BASE_URL
+        self._http_client = http_client
+    
+    @property
+    def http_client(self) -> httpx.AsyncClient:
+        """Injected client if provided, otherwise the shared pooled client"""
+        return self._http_client or get_off_http_client()
     
     async def get_product_by_barcode(self, barcode: str) -> Optional[Product]:
         """
@@ -23,35 +93,45 @@ class OpenFoodFactsClient:
         Returns:
             Product object or None if not found
         """
+        product, _ = await self.lookup_barcode(barcode)
+        return product
+    
+    async def lookup_barcode(self, barcode: str) -> Tuple[Optional[Product], bool]:
+        """
+        Fetch product from Open Food Facts, reporting definitive misses
+        
+        Args:
+            barcode: Product barcode (EAN, UPC, etc.)
+        
+        Returns:
+            Tuple of (product, is_missing). is_missing is True only when OFF
+            answered that the barcode is unknown (404 or status 0), not on
+            timeouts or other transient errors.
+        """
         try:
-            headers = {
-                "User-Agent": "BiteCheck/1.0 (Integration Test)",
-                "Accept": "application/json"
-            }
-            async with httpx.AsyncClient(timeout=self.timeout, headers=headers) as client:
-                url = f"{self.base_url}/product/{barcode}.json"
-                response = await client.get(url)
-                
-                if response.status_code == 404:
-                    print(f"OFF returned 404 for barcode: {barcode}")
-                    return None
-                
-                response.raise_for_status()
-                data = response.json()
-                
-                if data.get("status") == 0:
-                    print(f"OFF returned status 0 for {barcode}: {data.get('status_verbose')}")
-                    return None
-                
-                product_data = data.get("product", {})
-                return self._parse_off_product(product_data, barcode)
+            url = f"{self.base_url}/product/{barcode}.json"
+            response = await self.http_client.get(url)
+            
+            if response.status_code == 404:
+                print(f"OFF returned 404 for barcode: {barcode}")
+                return None, True
+            
+            response.raise_for_status()
+            data = response.json()
+            
+            if data.get("status") == 0:
+                print(f"OFF returned status 0 for {barcode}: {data.get('status_verbose')}")
+                return None, True
+            
+            product_data = data.get("product", {})
+            return self._parse_off_product(product_data, barcode), False
         
         except httpx.HTTPError as e:
             print(f"Error fetching from Open Food Facts: {e}")
-            return None
+            return None, False
         except Exception as e:
             print(f"Unexpected error: {e}")
-            return None
+            return None, False
     
     def _parse_off_product(self, data: dict, barcode: str) -> Product:
         """Parse Open Food Facts product data into Product model"""
@@ -88,6 +168,9 @@ class OpenFoodFactsClient:
                 ing.get("text", "") for ing in data["ingredients"]
                 if ing.get("text")
             ]
+        elif data.get("ingredients_text"):
+            # No structured list from OFF; parse the label text ourselves
+            ingredients_parsed = parse_ingredients(data["ingredients_text"]) or None
         
         # Parse images
         images = []
@@ -111,8 +194,9 @@ class OpenFoodFactsClient:
             if grade in ["A", "B", "C", "D", "E"]:
                 nutriscore_grade = grade
 
-        return Product(
+        product = Product(
             barcode=barcode,
+            barcode_normalized=normalize_barcode(barcode),
             name=data.get("product_name", ""),
             brand=data.get("brands", ""),
             category=data.get("categories", ""),
@@ -127,4 +211,8 @@ class OpenFoodFactsClient:
             nutriscore_grade=nutriscore_grade,
             source="openfoodfacts"
         )
+        # Many OFF records lack a Nutri-Score; compute it from the nutriments
+        apply_nutriscore(product)
+        product.allergen_mask = compute_allergen_mask(product)
+        return product
 
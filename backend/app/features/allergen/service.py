@@ -0,0 +1,133 @@
+"""Allergen matcher and ingredient parser loading, with hot reload from the ingredient_aliases table"""
+
+import asyncio
+import time
+from typing import Any, Dict, List, Optional, Tuple
+from postgrest.types import CountMethod
+from app.core.config import settings
+from app.core.database import get_supabase_client, execute_query
+from app.entities.allergen.matcher import (
+    AllergenMatcher,
+    get_active_allergen_matcher,
+    set_active_allergen_matcher,
+)
+from app.entities.ingredient.parser import (
+    IngredientParser,
+    get_active_ingredient_parser,
+    set_active_ingredient_parser,
+)
+
+# PostgREST caps responses, so aliases are read in pages of this size
+ALIAS_PAGE_SIZE = 1000
+
+_signature: Optional[Tuple[Any, ...]] = None
+_checked_at = 0.0
+_loaded_at: Optional[float] = None
+_reload_task: Optional[asyncio.Task] = None
+_reload_lock = asyncio.Lock()
+
+
+async def _alias_table_signature() -> Tuple[Any, ...]:
+    """Row count and newest updated_at; changes whenever aliases are edited"""
+    response = await execute_query(
+        get_supabase_client().table("ingredient_aliases")
+        .select("updated_at", count=CountMethod.exact)
+        .order("updated_at", desc=True)
+        .limit(1)
+    )
+    newest = response.data[0]["updated_at"] if response.data else None
+    return (response.count, newest)
+
+
+async def load_alias_rows() -> List[Dict[str, Any]]:
+    """Read every alias row, page by page"""
+    rows: List[Dict[str, Any]] = []
+    offset = 0
+    while True:
+        response = await execute_query(
+            get_supabase_client().table("ingredient_aliases")
+            .select("canonical_name, alias, allergen_category")
+            .order("alias")
+            .range(offset, offset + ALIAS_PAGE_SIZE - 1)
+        )
+        page = response.data or []
+        rows.extend(page)
+        if len(page) < ALIAS_PAGE_SIZE:
+            return rows
+        offset += ALIAS_PAGE_SIZE
+
+
+def allergen_aliases(rows: List[Dict[str, Any]]) -> List[Tuple[str, Optional[str]]]:
+    """(phrase, category) pairs for the allergen matcher"""
+    aliases: List[Tuple[str, Optional[str]]] = []
+    for row in rows:
+        category = row.get("allergen_category")
+        aliases.append((row["alias"], category))
+        if category:
+            aliases.append((row["canonical_name"], category))
+    return aliases
+
+
+def ingredient_aliases(rows: List[Dict[str, Any]]) -> List[Tuple[str, str]]:
+    """(alias, canonical_name) pairs for the ingredient parser"""
+    return [(row["alias"], row["canonical_name"]) for row in rows]
+
+
+def install_alias_rows(rows: List[Dict[str, Any]]) -> None:
+    """Build the matcher and ingredient parser from alias rows and make them active"""
+    set_active_allergen_matcher(AllergenMatcher.from_defaults(allergen_aliases(rows)))
+    set_active_ingredient_parser(IngredientParser(ingredient_aliases(rows)))
+
+
+async def reload_allergen_matcher(force: bool = False) -> AllergenMatcher:
+    """
+    Rebuild the matcher and ingredient parser if the alias table changed
+    since the last load
+
+    Args:
+        force: Rebuild even if the table signature is unchanged
+    """
+    global _signature, _checked_at, _loaded_at
+    async with _reload_lock:
+        try:
+            signature = await _alias_table_signature()
+            if force or signature != _signature:
+                install_alias_rows(await load_alias_rows())
+                _signature = signature
+                _loaded_at = time.time()
+        except Exception as e:
+            # Keep serving the previous matcher; retry after the next interval
+            print(f"Error reloading ingredient aliases: {e}")
+        finally:
+            _checked_at = time.monotonic()
+    return get_active_allergen_matcher()
+
+
+async def get_allergen_matcher() -> AllergenMatcher:
+    """
+    Get the compiled matcher
+
+    The first call waits for the alias table to load. Afterwards the table
+    is re-checked every ALLERGEN_ALIAS_RELOAD_SECONDS in the background while
+    callers keep using the current matcher.
+    """
+    global _reload_task
+    if _checked_at == 0.0:
+        return await reload_allergen_matcher()
+
+    is_due = time.monotonic() - _checked_at >= settings.ALLERGEN_ALIAS_RELOAD_SECONDS
+    if is_due and (_reload_task is None or _reload_task.done()):
+        _reload_task = asyncio.create_task(reload_allergen_matcher())
+    return get_active_allergen_matcher()
+
+
+def allergen_matcher_stats() -> Dict[str, Any]:
+    """Matcher size and load state for monitoring"""
+    matcher = get_active_allergen_matcher()
+    return {
+        "patterns": matcher.pattern_count,
+        "categories": len(matcher.categories),
+        "alias_rows": _signature[0] if _signature else None,
+        "loaded_at": _loaded_at,
+        "ingredient_parser": get_active_ingredient_parser().stats(),
+    }
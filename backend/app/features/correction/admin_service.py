@@ -4,7 +4,7 @@ from typing import Optional, List
 from uuid import UUID
 from datetime import datetime
 import math
-from app.core.database import get_supabase_client
+from app.core.database import get_supabase_client, execute_query
 from app.features.correction.admin_schemas import (
     CorrectionListResponse,
     CorrectionListItem,
@@ -12,6 +12,22 @@ from app.features.correction.admin_schemas import (
     AdminStatsResponse
 )
 from app.shared.audit import log_admin_action
+from app.entities.product.cache import invalidate_product
+from app.entities.product.models import Product
+from app.entities.product.nutriscore import apply_nutriscore
+from app.entities.product.nutrition_index import nutrition_index
+from app.entities.allergen.matcher import ALLERGEN_SOURCE_FIELDS, compute_allergen_mask
+from app.entities.ingredient.parser import parse_ingredients
+
+# Product fields the healthier-alternatives index is built from
+NUTRITION_INDEX_FIELDS = ("nutrition", "category", "nutriscore_grade") + ALLERGEN_SOURCE_FIELDS
+
+# Fields recomputed from a corrected field; they are protected from OFF
+# refreshes along with it (see products.corrected_fields)
+CORRECTION_DERIVED_FIELDS = {
+    "ingredients_raw": ("ingredients_parsed",),
+    "nutrition": ("health_score", "nutriscore_grade"),
+}
 
 
 class AdminCorrectionService:
@@ -48,7 +64,7 @@ class AdminCorrectionService:
         query = query.order("submitted_at", desc=True)
         
         # Get total count
-        count_response = query.execute()
+        count_response = await execute_query(query)
         total = len(count_response.data) if count_response.data else 0
         
         # Apply pagination
@@ -56,7 +72,7 @@ class AdminCorrectionService:
         query = query.range(offset, offset + page_size - 1)
         
         # Execute query
-        response = query.execute()
+        response = await execute_query(query)
         
         # Transform data
         corrections = []
@@ -88,9 +104,11 @@ class AdminCorrectionService:
     
     async def get_correction_detail(self, correction_id: UUID) -> Optional[CorrectionDetailResponse]:
         """Get detailed correction information"""
-        response = self.supabase.table("corrections").select(
-            "*, products(name, barcode)"
-        ).eq("id", str(correction_id)).execute()
+        response = await execute_query(
+            self.supabase.table("corrections").select(
+                "*, products(name, barcode)"
+            ).eq("id", str(correction_id))
+        )
         
         if not response.data or len(response.data) == 0:
             return None
@@ -145,9 +163,11 @@ class AdminCorrectionService:
             "review_notes": notes
         }
         
-        self.supabase.table("corrections").update(update_data).eq(
-            "id", str(correction_id)
-        ).execute()
+        await execute_query(
+            self.supabase.table("corrections").update(update_data).eq(
+                "id", str(correction_id)
+            )
+        )
         
         # Apply changes to product
         await self._apply_correction_to_product(correction)
@@ -200,9 +220,11 @@ class AdminCorrectionService:
             "review_notes": reason
         }
         
-        self.supabase.table("corrections").update(update_data).eq(
-            "id", str(correction_id)
-        ).execute()
+        await execute_query(
+            self.supabase.table("corrections").update(update_data).eq(
+                "id", str(correction_id)
+            )
+        )
         
         # Log audit
         await log_admin_action(
@@ -223,7 +245,7 @@ class AdminCorrectionService:
     async def get_stats(self) -> AdminStatsResponse:
         """Get dashboard statistics"""
         # Get all corrections
-        all_corrections = self.supabase.table("corrections").select("*").execute()
+        all_corrections = await execute_query(self.supabase.table("corrections").select("*"))
         
         total = len(all_corrections.data) if all_corrections.data else 0
         pending = len([c for c in all_corrections.data if c["status"] == "pending"]) if all_corrections.data else 0
@@ -235,9 +257,11 @@ class AdminCorrectionService:
         approval_rate = (approved / reviewed * 100) if reviewed > 0 else 0.0
         
         # Get recent corrections
-        recent_response = self.supabase.table("corrections").select(
-            "*, products(name, barcode)"
-        ).order("submitted_at", desc=True).limit(5).execute()
+        recent_response = await execute_query(
+            self.supabase.table("corrections").select(
+                "*, products(name, barcode)"
+            ).order("submitted_at", desc=True).limit(5)
+        )
         
         recent_corrections = []
         for item in recent_response.data:
@@ -294,9 +318,51 @@ class AdminCorrectionService:
             # Simple string fields
             update_data[field_name] = new_value
         
+        # Corrected label text replaces the parsed list derived from it
+        if field_name == "ingredients_raw":
+            update_data["ingredients_parsed"] = parse_ingredients(new_value) or None
+        
+        product_response = await execute_query(
+            self.supabase.table("products").select("*").eq("id", correction.product_id)
+        )
+        stored = product_response.data[0] if product_response.data else None
+        
+        # Background refreshes from OFF must not revert the correction
+        if stored is not None:
+            corrected_fields = set(stored.get("corrected_fields") or ())
+            corrected_fields.add(field_name)
+            corrected_fields.update(CORRECTION_DERIVED_FIELDS.get(field_name, ()))
+            update_data["corrected_fields"] = sorted(corrected_fields)
+        
+        # Keep the allergen bitmask and the alternatives index in sync with the correction
+        corrected = None
+        if field_name in NUTRITION_INDEX_FIELDS and stored is not None:
+            corrected = Product(**{**stored, **update_data})
+            if field_name in ALLERGEN_SOURCE_FIELDS:
+                update_data["allergen_mask"] = compute_allergen_mask(corrected)
+                corrected.allergen_mask = update_data["allergen_mask"]
+            # Scores copied from OFF no longer match corrected nutrition; clear
+            # them when the corrected facts are too incomplete to score
+            if field_name == "nutrition":
+                if not apply_nutriscore(corrected, overwrite=True):
+                    corrected.health_score = None
+                    corrected.nutriscore_grade = None
+                update_data["health_score"] = corrected.health_score
+                update_data["nutriscore_grade"] = corrected.nutriscore_grade
+        
         # Update the product
         update_data["updated_at"] = datetime.utcnow().isoformat()
         
-        self.supabase.table("products").update(update_data).eq(
-            "id", correction.product_id
-        ).execute()
+        await execute_query(
+            self.supabase.table("products").update(update_data).eq(
+                "id", correction.product_id
+            )
+        )
+        
+        # Drop stale copies so the next scan or detail view sees the correction
+        await invalidate_product(
+            product_id=correction.product_id,
+            barcode=correction.product_barcode
+        )
+        if corrected:
+            nutrition_index.upsert(corrected)
@@ -1,6 +1,6 @@
 from typing import Optional
 import uuid
-from app.core.database import get_supabase_client
+from app.core.database import get_supabase_client, execute_query, run_blocking
 from app.features.correction.schemas import CorrectionCreate
 from app.entities.correction.models import Correction
 
@@ -27,14 +27,16 @@ class CorrectionService:
             
             # Upload to Supabase Storage
             try:
-                self.supabase.storage.from_("corrections").upload(
+                bucket = self.supabase.storage.from_("corrections")
+                await run_blocking(
+                    bucket.upload,
                     path=storage_filename,
                     file=photo_file,
                     file_options={"content-type": photo_content_type or "image/jpeg"}
                 )
                 
                 # Get public URL
-                photo_url = self.supabase.storage.from_("corrections").get_public_url(storage_filename)
+                photo_url = bucket.get_public_url(storage_filename)
             except Exception as e:
                 print(f"Error uploading photo: {e}")
                 # Continue without photo if upload fails? Or raise error?
@@ -45,7 +47,7 @@ class CorrectionService:
         correction_dict["photo_url"] = photo_url
         correction_dict["status"] = "pending"
         
-        response = self.supabase.table("corrections").insert(correction_dict).execute()
+        response = await execute_query(self.supabase.table("corrections").insert(correction_dict))
         
         if response.data and len(response.data) > 0:
             return Correction(**response.data[0])
@@ -0,0 +1,38 @@
+"""Cache of each user's favorited product IDs, read by favorite badges"""
+
+from typing import Dict, Optional
+from app.core.config import settings
+from app.shared.cache import CacheVersion, TwoTierCache
+
+# Keyed by user ID; maps every favorited product ID to its favorite ID. An
+# empty dict records that the user has no favorites. Adds and removes drop
+# the entry, and other workers drop their L1 copy through Redis pub/sub, so
+# the next read reloads it from the favorites table. A map read before an
+# add or remove is never cached after that change's invalidation.
+favorite_ids_cache = TwoTierCache(
+    namespace="favorite-ids",
+    maxsize=settings.FAVORITE_IDS_CACHE_MAXSIZE,
+    l1_ttl=settings.FAVORITE_IDS_CACHE_L1_TTL_SECONDS,
+    l2_ttl=settings.FAVORITE_IDS_CACHE_L2_TTL_SECONDS,
+    broadcast_invalidations=True,
+)
+
+
+async def get_cached_favorite_ids(user_id: str) -> Optional[Dict[str, str]]:
+    """Get a user's {product_id: favorite_id} map, or None on a miss"""
+    return await favorite_ids_cache.get(user_id)
+
+
+async def favorite_ids_version(user_id: str) -> CacheVersion:
+    """Version of a user's map; read it before loading favorites from the DB"""
+    return await favorite_ids_cache.version(user_id)
+
+
+async def cache_favorite_ids(user_id: str, favorite_ids: Dict[str, str], version: CacheVersion) -> None:
+    """Cache a user's complete {product_id: favorite_id} map unless it was invalidated since version"""
+    await favorite_ids_cache.set_if_unchanged(user_id, favorite_ids, version)
+
+
+async def invalidate_favorite_ids(user_id: str) -> None:
+    """Drop a user's cached map after an add or remove, in every worker"""
+    await favorite_ids_cache.delete(user_id)
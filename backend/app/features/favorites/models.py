@@ -1,6 +1,6 @@
 """Favorites feature models"""
 
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
 from typing import Optional, Dict, Any, List
 from datetime import datetime
 
@@ -27,9 +27,11 @@ class FavoriteItem(BaseModel):
 class FavoritesListData(BaseModel):
     """Paginated list of favorites"""
     favorites: List[FavoriteItem]
+    next_cursor: Optional[str] = None
+    has_more: bool
     page: int
-    total_pages: int
-    total_count: int
+    total_pages: Optional[int] = None  # Omitted for cursor requests unless include_total
+    total_count: Optional[int] = None  # Approximate; omitted like total_pages
 
 
 class AddFavoriteRequest(BaseModel):
@@ -41,3 +43,13 @@ class FavoriteStatusData(BaseModel):
     """Response for checking favorite status"""
     is_favorite: bool
     favorite_id: Optional[str] = None
+
+
+class FavoriteStatusRequest(BaseModel):
+    """Request to check the favorite status of many products"""
+    product_ids: List[str] = Field(..., min_length=1, max_length=200)
+
+
+class FavoriteStatusesData(BaseModel):
+    """Favorite status per requested product ID"""
+    statuses: Dict[str, FavoriteStatusData]
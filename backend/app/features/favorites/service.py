@@ -1,8 +1,52 @@
 """Favorites feature service for managing user favorites"""
 
-from typing import Optional, List, Tuple
-from app.core.database import get_supabase_client
+from typing import Optional, List, Tuple, Dict, Any
+from app.core.config import settings
+from app.core.database import get_supabase_client, execute_query
+from app.features.favorites.cache import (
+    get_cached_favorite_ids,
+    cache_favorite_ids,
+    favorite_ids_version,
+    invalidate_favorite_ids,
+)
 from app.features.favorites.models import FavoriteItem, FavoriteProduct
+from app.shared.cache import TwoTierCache
+from app.shared.pagination import decode_timestamp_cursor, encode_cursor, keyset_after_desc
+
+# Approximate per-user totals, only computed when a client asks for them
+favorite_count_cache = TwoTierCache(
+    namespace="favorite-count",
+    maxsize=settings.COUNT_CACHE_MAXSIZE,
+    l1_ttl=settings.COUNT_CACHE_TTL_SECONDS,
+    l2_ttl=settings.COUNT_CACHE_TTL_SECONDS,
+)
+
+# Rows per request when loading a user's favorited product IDs
+FAVORITE_IDS_PAGE_SIZE = 1000
+
+# A favorites row with the product card shown in lists
+FAVORITE_COLUMNS = "id, product_id, created_at, products(id, barcode, name, brand, images, health_score, nutri_score:nutriscore_grade)"
+
+
+def _favorite_item(row: Dict[str, Any], product_data: Optional[Dict[str, Any]]) -> FavoriteItem:
+    """Build a FavoriteItem from a favorites row and its embedded product"""
+    product = None
+    if product_data:
+        product = FavoriteProduct(
+            id=product_data["id"],
+            barcode=product_data.get("barcode"),
+            name=product_data.get("name", "Unknown Product"),
+            brand=product_data.get("brand"),
+            images=product_data.get("images"),
+            health_score=product_data.get("health_score"),
+            nutri_score=product_data.get("nutri_score"),
+        )
+    return FavoriteItem(
+        id=row["id"],
+        product_id=row["product_id"],
+        product=product,
+        created_at=row["created_at"],
+    )
 
 
 class FavoritesService:
@@ -15,107 +59,167 @@ class FavoritesService:
         self,
         user_id: str,
         page: int = 1,
-        limit: int = 20
-    ) -> Tuple[List[FavoriteItem], int]:
+        limit: int = 20,
+        cursor: Optional[str] = None
+    ) -> Tuple[List[FavoriteItem], Optional[str]]:
         """
         Get paginated favorites for a user with product details
         
+        Pages are keyed on (created_at, id) and read through the
+        idx_favorites_user_created_at index. page > 1 without a cursor still
+        skips rows with OFFSET for older clients.
+        
         Args:
             user_id: User ID
-            page: Page number (1-indexed)
+            page: Page number (1-indexed), used when no cursor is given
             limit: Items per page
+            cursor: next_cursor from the previous page
             
         Returns:
-            Tuple of (favorites list, total count)
+            Tuple of (favorites list, next_cursor); next_cursor is None on the last page
+        
+        Raises:
+            ValueError: If the cursor is malformed
         """
-        try:
+        query = (
+            self.supabase.table("favorites")
+            .select(FAVORITE_COLUMNS)
+            .eq("user_id", user_id)
+        )
+        offset = 0
+        if cursor:
+            created_at, favorite_id = decode_timestamp_cursor(cursor)
+            query = query.or_(keyset_after_desc("created_at", created_at, favorite_id))
+        else:
             offset = (page - 1) * limit
-            
-            # Get total count
-            count_response = (
-                self.supabase.table("favorites")
-                .select("id", count="exact")
-                .eq("user_id", user_id)
-                .execute()
+        
+        try:
+            # Get one page of favorites with product data, plus one row to
+            # know whether another page exists
+            response = await execute_query(
+                query.order("created_at", desc=True)
+                .order("id", desc=True)
+                .range(offset, offset + limit)
             )
-            total_count = count_response.count or 0
             
-            # Get paginated favorites with product data
-            response = (
-                self.supabase.table("favorites")
-                .select("id, product_id, created_at, products(id, barcode, name, brand, images, health_score, nutri_score)")
-                .eq("user_id", user_id)
-                .order("created_at", desc=True)
-                .range(offset, offset + limit - 1)
-                .execute()
-            )
+            rows = response.data or []
+            next_cursor = None
+            if len(rows) > limit:
+                rows = rows[:limit]
+                next_cursor = encode_cursor([rows[-1]["created_at"], rows[-1]["id"]])
             
-            favorites = []
-            for row in response.data or []:
-                product_data = row.get("products")
-                product = None
-                if product_data:
-                    product = FavoriteProduct(
-                        id=product_data.get("id"),
-                        barcode=product_data.get("barcode"),
-                        name=product_data.get("name", "Unknown Product"),
-                        brand=product_data.get("brand"),
-                        images=product_data.get("images"),
-                        health_score=product_data.get("health_score"),
-                        nutri_score=product_data.get("nutri_score"),
-                    )
-                
-                favorites.append(FavoriteItem(
-                    id=row["id"],
-                    product_id=row["product_id"],
-                    product=product,
-                    created_at=row["created_at"],
-                ))
+            favorites = [_favorite_item(row, row.get("products")) for row in rows]
             
-            return favorites, total_count
+            return favorites, next_cursor
             
         except Exception as e:
             print(f"Error fetching user favorites: {e}")
             raise
     
-    async def add_favorite(self, user_id: str, product_id: str) -> Optional[str]:
+    async def count_favorites(self, user_id: str) -> int:
+        """
+        Approximate number of favorites for a user
+        
+        Cached for COUNT_CACHE_TTL_SECONDS and dropped when the user adds or
+        removes a favorite.
+        """
+        total = await favorite_count_cache.get(user_id)
+        if total is None:
+            response = await execute_query(
+                self.supabase.table("favorites")
+                .select("id", count="estimated", head=True)
+                .eq("user_id", user_id)
+            )
+            total = response.count or 0
+            await favorite_count_cache.set(user_id, total)
+        return total
+    
+    async def get_favorite_ids(self, user_id: str) -> Dict[str, str]:
+        """
+        Map of every product the user has favorited to its favorite ID
+        
+        Served from favorite_ids_cache; on a miss the user's favorites are
+        read once (only product_id and id, in pages of FAVORITE_IDS_PAGE_SIZE)
+        and cached, unless an add or remove invalidated the map meanwhile.
+        """
+        favorite_ids = await get_cached_favorite_ids(user_id)
+        if favorite_ids is not None:
+            return favorite_ids
+        
+        version = await favorite_ids_version(user_id)
+        favorite_ids = {}
+        after_id = None
+        while True:
+            query = self.supabase.table("favorites").select("id, product_id").eq("user_id", user_id)
+            if after_id:
+                query = query.gt("id", after_id)
+            response = await execute_query(query.order("id").limit(FAVORITE_IDS_PAGE_SIZE))
+            rows = response.data or []
+            for row in rows:
+                favorite_ids[row["product_id"]] = row["id"]
+            if len(rows) < FAVORITE_IDS_PAGE_SIZE:
+                break
+            after_id = rows[-1]["id"]
+        
+        await cache_favorite_ids(user_id, favorite_ids, version)
+        return favorite_ids
+    
+    async def get_favorite_statuses(self, user_id: str, product_ids: List[str]) -> Dict[str, Optional[str]]:
+        """
+        Favorite status of many products at once
+        
+        Args:
+            user_id: User ID
+            product_ids: Product IDs to check
+            
+        Returns:
+            Dict of product ID to favorite ID, None for products not favorited
+        """
+        favorite_ids = await self.get_favorite_ids(user_id)
+        return {product_id: favorite_ids.get(product_id) for product_id in product_ids}
+    
+    async def add_favorite(self, user_id: str, product_id: str) -> Optional[FavoriteItem]:
         """
         Add a product to user's favorites
         
+        One call to add_favorite() (migration 014), which inserts on the
+        (user_id, product_id) key or returns the existing row, together with
+        the product card. If a concurrent add of the same product commits
+        while the call runs, it returns no row and the favorite is re-read.
+        
         Args:
             user_id: User ID
             product_id: Product ID to add
             
         Returns:
-            Favorite ID if created, None if already exists
+            The new or existing favorite, or None if it cannot be found
         """
         try:
-            # Check if already favorited
-            existing = (
-                self.supabase.table("favorites")
-                .select("id")
-                .eq("user_id", user_id)
-                .eq("product_id", product_id)
-                .execute()
-            )
-            
-            if existing.data and len(existing.data) > 0:
-                # Already favorited, return existing ID
-                return existing.data[0]["id"]
-            
-            # Add to favorites
-            response = (
-                self.supabase.table("favorites")
-                .insert({
-                    "user_id": user_id,
-                    "product_id": product_id
+            response = await execute_query(
+                self.supabase.rpc("add_favorite", {
+                    "p_user_id": user_id,
+                    "p_product_id": product_id
                 })
-                .execute()
             )
             
-            if response.data and len(response.data) > 0:
-                return response.data[0]["id"]
-            return None
+            if not response.data:
+                existing = await execute_query(
+                    self.supabase.table("favorites")
+                    .select(FAVORITE_COLUMNS)
+                    .eq("user_id", user_id)
+                    .eq("product_id", product_id)
+                    .limit(1)
+                )
+                if not existing.data:
+                    return None
+                row = existing.data[0]
+                return _favorite_item(row, row.get("products"))
+            row = response.data[0]
+            
+            if row.get("created"):
+                await favorite_count_cache.delete(user_id)
+                await invalidate_favorite_ids(user_id)
+            return _favorite_item(row, row.get("product"))
             
         except Exception as e:
             print(f"Error adding favorite: {e}")
@@ -125,22 +229,27 @@ class FavoritesService:
         """
         Remove a product from user's favorites
         
+        Removing a product that is not a favorite is not an error.
+        
         Args:
             user_id: User ID
             product_id: Product ID to remove
             
         Returns:
-            True if removed successfully
+            True if a favorite was deleted, False if there was none
         """
         try:
-            response = (
+            response = await execute_query(
                 self.supabase.table("favorites")
                 .delete()
                 .eq("user_id", user_id)
                 .eq("product_id", product_id)
-                .execute()
             )
-            return True
+            removed = bool(response.data)
+            if removed:
+                await favorite_count_cache.delete(user_id)
+                await invalidate_favorite_ids(user_id)
+            return removed
         except Exception as e:
             print(f"Error removing favorite: {e}")
             raise
@@ -149,6 +258,8 @@ class FavoritesService:
         """
         Check if a product is in user's favorites
         
+        Reads the cached favorite map (see get_favorite_ids).
+        
         Args:
             user_id: User ID
             product_id: Product ID to check
@@ -157,17 +268,8 @@ class FavoritesService:
             Tuple of (is_favorite, favorite_id)
         """
         try:
-            response = (
-                self.supabase.table("favorites")
-                .select("id")
-                .eq("user_id", user_id)
-                .eq("product_id", product_id)
-                .execute()
-            )
-            
-            if response.data and len(response.data) > 0:
-                return True, response.data[0]["id"]
-            return False, None
+            favorite_id = (await self.get_favorite_ids(user_id)).get(product_id)
+            return favorite_id is not None, favorite_id
             
         except Exception as e:
             print(f"Error checking favorite status: {e}")
@@ -0,0 +1,163 @@
+"""Background loading of the healthier-alternatives index from the products table"""
+
+import asyncio
+import time
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional, Tuple
+from app.core.config import settings
+from app.core.database import get_supabase_client, execute_query
+from app.entities.product.models import Product
+from app.entities.product.nutrition_index import nutrition_index
+from app.shared.pagination import keyset_after_asc
+
+# Columns the index is built from, plus the NOT NULL columns of Product
+INDEX_COLUMNS = "id, barcode, name, category, nutrition, nutriscore_grade, allergen_mask, updated_at"
+
+# Re-read rows this far behind the newest updated_at seen, so rows committed
+# late by slower transactions are not skipped
+SYNC_OVERLAP = timedelta(seconds=5)
+
+
+class NutritionIndexSync:
+    """
+    Fill the shared NutritionIndex and keep it current
+
+    On start, every product is loaded in ID order. Afterwards rows with a
+    newer updated_at are re-read every NUTRITION_INDEX_SYNC_SECONDS, which
+    picks up inserts and corrections made by other workers; writes in this
+    worker update the index directly.
+    """
+
+    def __init__(self):
+        self._task: Optional[asyncio.Task] = None
+        self._since: Optional[datetime] = None
+        self.ready = False
+        self.loaded = 0
+        self.synced = 0
+        self.failed = 0
+        self.load_seconds: Optional[float] = None
+
+    @property
+    def is_running(self) -> bool:
+        return self._task is not None and not self._task.done()
+
+    def start(self) -> None:
+        """Start loading in the background (called from the app lifespan)"""
+        if self.is_running or not settings.NUTRITION_INDEX_ENABLED:
+            return
+        self._task = asyncio.create_task(self._run(), name="nutrition-index-sync")
+
+    async def stop(self) -> None:
+        """Stop loading and syncing; the index keeps its current contents"""
+        task = self._task
+        if task is None or task.done():
+            return
+        task.cancel()
+        try:
+            await task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+
+    async def _run(self) -> None:
+        while not self.ready:
+            try:
+                await self.load()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                self.failed += 1
+                print(f"Error loading nutrition index: {e}")
+                await asyncio.sleep(settings.NUTRITION_INDEX_SYNC_SECONDS)
+
+        while True:
+            await asyncio.sleep(settings.NUTRITION_INDEX_SYNC_SECONDS)
+            try:
+                await self.sync()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                self.failed += 1
+                print(f"Error syncing nutrition index: {e}")
+
+    async def _newest_update(self) -> Optional[datetime]:
+        response = await execute_query(
+            get_supabase_client().table("products").select("updated_at")
+            .not_.is_("updated_at", "null")
+            .order("updated_at", desc=True)
+            .limit(1)
+        )
+        return datetime.fromisoformat(response.data[0]["updated_at"]) if response.data else None
+
+    def _add_rows(self, rows: List[Dict[str, Any]]) -> None:
+        for row in rows:
+            nutrition_index.upsert(Product(**row))
+
+    async def load(self) -> None:
+        """Read every product page by page, keyed on ID"""
+        started = time.monotonic()
+        page_size = settings.NUTRITION_INDEX_PAGE_SIZE
+        # Changes made while the load runs are picked up by the first sync
+        self._since = await self._newest_update()
+        self.loaded = 0
+        after_id = None
+        while True:
+            query = get_supabase_client().table("products").select(INDEX_COLUMNS)
+            if after_id:
+                query = query.gt("id", after_id)
+            response = await execute_query(query.order("id").limit(page_size))
+            rows = response.data or []
+            self._add_rows(rows)
+            self.loaded += len(rows)
+            if len(rows) < page_size:
+                break
+            after_id = rows[-1]["id"]
+        self.load_seconds = round(time.monotonic() - started, 2)
+        self.ready = True
+
+    async def sync(self) -> None:
+        """
+        Re-read products changed since the last load or sync
+
+        Pages are keyed on (updated_at, id), so rows updated while the sync
+        runs cannot shift later pages; they are re-read by the next sync.
+        """
+        since = self._since
+        page_size = settings.NUTRITION_INDEX_PAGE_SIZE
+        after: Optional[Tuple[str, str]] = None
+        while True:
+            query = (
+                get_supabase_client().table("products").select(INDEX_COLUMNS)
+                .not_.is_("updated_at", "null")
+            )
+            if since is not None:
+                query = query.gte("updated_at", (since - SYNC_OVERLAP).isoformat())
+            if after is not None:
+                query = query.or_(keyset_after_asc("updated_at", *after))
+            response = await execute_query(query.order("updated_at").order("id").limit(page_size))
+            rows = response.data or []
+            self._add_rows(rows)
+            self.synced += len(rows)
+            for row in rows:
+                updated_at = datetime.fromisoformat(row["updated_at"])
+                if self._since is None or updated_at > self._since:
+                    self._since = updated_at
+            if len(rows) < page_size:
+                return
+            after = (rows[-1]["updated_at"], rows[-1]["id"])
+
+    def stats(self) -> Dict[str, Any]:
+        """Load state and index size for monitoring"""
+        return {
+            "running": self.is_running,
+            "ready": self.ready,
+            "loaded": self.loaded,
+            "synced": self.synced,
+            "failed": self.failed,
+            "load_seconds": self.load_seconds,
+            **nutrition_index.stats(),
+        }
+
+
+# Started and stopped by the application lifespan
+nutrition_index_sync = NutritionIndexSync()
@@ -0,0 +1,20 @@
+"""Product feature models"""
+
+from pydantic import BaseModel
+from typing import List
+from app.entities.product.models import Product
+
+
+class ProductListData(BaseModel):
+    """A page of products"""
+    products: List[Product]
+    limit: int
+    offset: int
+    has_more: bool
+
+
+class ProductAlternativesData(BaseModel):
+    """Healthier products similar to a given one, nearest first"""
+    product_id: str
+    alternatives: List[Product]
+    index_ready: bool  # False while the index is still loading at startup
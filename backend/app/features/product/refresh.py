@@ -0,0 +1,241 @@
+"""Stale-while-revalidate refresh of stored products from Open Food Facts"""
+
+import asyncio
+import json
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, Optional, Set
+from app.core.config import settings
+from app.core.database import get_supabase_client, execute_query
+from app.entities.allergen.matcher import ALLERGEN_SOURCE_FIELDS, compute_allergen_mask
+from app.entities.product.models import Product
+from app.entities.product.cache import cache_product, invalidate_product
+from app.entities.product.nutrition_index import nutrition_index
+from app.external.openfoodfacts import OpenFoodFactsClient
+from app.shared.ratelimit import RateLimiter
+
+# Fields taken from OFF on refresh. Empty upstream values never overwrite
+# stored data, so manual additions survive an incomplete OFF record, and
+# fields listed in a product's corrected_fields are never taken from OFF.
+REFRESHABLE_FIELDS = (
+    "name",
+    "brand",
+    "category",
+    "manufacturer",
+    "country_of_sale",
+    "ingredients_raw",
+    "ingredients_parsed",
+    "nutrition",
+    "allergens",
+    "images",
+    "health_score",
+    "nutriscore_grade",
+)
+
+
+# Times a refresh re-reads and re-diffs a row that changed (e.g. an approved
+# correction) between its read and the conditional write, before giving up
+REFRESH_WRITE_ATTEMPTS = 3
+
+
+def is_stale(product: Product, now: Optional[datetime] = None) -> bool:
+    """Check whether an OFF-sourced product is past the freshness threshold"""
+    if product.source != "openfoodfacts" or not product.id:
+        return False
+    if product.last_fetched_at is None:
+        return True
+    now = now or datetime.now(timezone.utc)
+    last_fetched_at = product.last_fetched_at
+    if last_fetched_at.tzinfo is None:
+        last_fetched_at = last_fetched_at.replace(tzinfo=timezone.utc)
+    return now - last_fetched_at > timedelta(hours=settings.PRODUCT_REFRESH_AFTER_HOURS)
+
+
+def diff_product_fields(stored: Product, fetched: Product) -> Dict[str, Any]:
+    """
+    Compare a stored product with a fresh OFF copy field by field
+
+    Returns only the fields whose upstream value changed, ready to be used
+    as an update payload. Fields an admin corrected are left out.
+    """
+    stored_data = stored.model_dump(mode="json")
+    fetched_data = fetched.model_dump(mode="json")
+    corrected = set(stored.corrected_fields or ())
+    changes = {}
+    for field in REFRESHABLE_FIELDS:
+        if field in corrected:
+            continue
+        new_value = fetched_data.get(field)
+        if new_value in (None, "", []):
+            continue
+        if json.dumps(new_value, sort_keys=True) != json.dumps(stored_data.get(field), sort_keys=True):
+            changes[field] = new_value
+    return changes
+
+
+async def _get_stored_row(product_id: str) -> Optional[Dict[str, Any]]:
+    """Read the current row of a product from Supabase"""
+    response = await execute_query(
+        get_supabase_client().table("products").select("*").eq("id", product_id)
+    )
+    return response.data[0] if response.data else None
+
+
+async def _update_unchanged_row(row: Dict[str, Any], changes: Dict[str, Any]) -> bool:
+    """
+    Write changes only if the row is still as read
+
+    The products trigger bumps updated_at on every write, so matching the
+    value read makes the update a no-op when anything (a correction, another
+    refresh) was written in between. Returns True if the row was updated.
+    """
+    query = get_supabase_client().table("products").update(changes).eq("id", row["id"])
+    if row.get("updated_at"):
+        query = query.eq("updated_at", row["updated_at"])
+    else:
+        query = query.is_("updated_at", "null")
+    response = await execute_query(query)
+    return bool(response.data)
+
+
+class ProductRefresher:
+    """
+    Background re-fetch of stale products
+
+    Lookups serve the stored copy immediately and call schedule(); a single
+    worker re-fetches queued products from OFF at OFF_REFRESH_RATE_PER_SECOND
+    and writes back only the fields that changed. Only product IDs are
+    queued: the row is re-read right before diffing, so corrections approved
+    while a product waits in the queue are respected.
+    """
+
+    def __init__(self):
+        self.off_client = OpenFoodFactsClient()
+        # Replaced on every start() so each run gets a queue on its own loop
+        self._queue: asyncio.Queue = asyncio.Queue(maxsize=settings.PRODUCT_REFRESH_QUEUE_SIZE)
+        self._task: Optional[asyncio.Task] = None
+        self._pending: Set[str] = set()
+        self.scheduled = 0
+        self.refreshed = 0
+        self.changed = 0
+        self.conflicts = 0
+        self.failed = 0
+
+    @property
+    def is_running(self) -> bool:
+        return self._task is not None and not self._task.done()
+
+    def start(self) -> None:
+        """Start the refresh worker (called from the app lifespan)"""
+        if self.is_running:
+            return
+        self._queue = asyncio.Queue(maxsize=settings.PRODUCT_REFRESH_QUEUE_SIZE)
+        self._task = asyncio.create_task(self._run(), name="product-refresh")
+
+    async def stop(self) -> None:
+        """Stop the worker; queued refreshes are dropped and retried on a later lookup"""
+        task = self._task
+        if task is None or task.done():
+            return
+        task.cancel()
+        try:
+            await task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+        self._pending.clear()
+
+    def schedule(self, product: Product) -> bool:
+        """Queue a stale product for refresh without waiting; returns True if queued"""
+        if not self.is_running or not is_stale(product) or not product.id or product.id in self._pending:
+            return False
+        try:
+            self._queue.put_nowait(product.id)
+        except asyncio.QueueFull:
+            return False
+        self._pending.add(product.id)
+        self.scheduled += 1
+        return True
+
+    async def _run(self) -> None:
+        limiter = RateLimiter(rate=settings.OFF_REFRESH_RATE_PER_SECOND)
+        while True:
+            product_id = await self._queue.get()
+            try:
+                await limiter.acquire()
+                await self.refresh(product_id)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                self.failed += 1
+                print(f"Error refreshing product {product_id}: {e}")
+            finally:
+                self._pending.discard(product_id)
+
+    async def refresh(self, product_id: str) -> Optional[Product]:
+        """
+        Re-fetch one product from OFF and store the fields that changed
+
+        The stored row (including corrected_fields) is read from the database
+        first, never taken from a cached copy, and the write only applies if
+        the row is unchanged since that read. If a correction lands while OFF
+        is being fetched, the row is re-read and diffed again.
+
+        Returns the updated product, or None if the product no longer needs a
+        refresh, OFF could not be reached or the row kept changing (the
+        product stays stale and is retried on a later lookup).
+        """
+        row = await _get_stored_row(product_id)
+        if not row or not is_stale(Product(**row)):
+            return None
+
+        fetched, is_missing = await self.off_client.lookup_barcode(row["barcode"])
+        if not fetched and not is_missing:
+            self.failed += 1
+            return None
+
+        for _ in range(REFRESH_WRITE_ATTEMPTS):
+            product = Product(**row)
+            changes = diff_product_fields(product, fetched) if fetched else {}
+            if changes.keys() & set(ALLERGEN_SOURCE_FIELDS):
+                # Recompute from the merged product so corrected allergen data counts
+                allergen_mask = compute_allergen_mask(Product(**{**product.model_dump(mode="json"), **changes}))
+                if allergen_mask != product.allergen_mask:
+                    changes["allergen_mask"] = allergen_mask
+            now = datetime.now(timezone.utc)
+            if await _update_unchanged_row(row, {**changes, "last_fetched_at": now.isoformat()}):
+                break
+
+            self.conflicts += 1
+            row = await _get_stored_row(product_id)
+            if not row or not is_stale(Product(**row)):
+                return None
+        else:
+            return None
+
+        updated = Product(**{
+            **product.model_dump(mode="json"),
+            **changes,
+            "last_fetched_at": now
+        })
+        await invalidate_product(product_id=product.id, barcode=product.barcode)
+        await cache_product(updated)
+        nutrition_index.upsert(updated)
+        self.refreshed += 1
+        if changes:
+            self.changed += 1
+        return updated
+
+    def stats(self) -> Dict[str, Any]:
+        """Queue depth and refresh counters for monitoring"""
+        return {
+            "running": self.is_running,
+            "queue_depth": self._queue.qsize(),
+            "scheduled": self.scheduled,
+            "refreshed": self.refreshed,
+            "changed": self.changed,
+            "conflicts": self.conflicts,
+            "failed": self.failed,
+        }
+
+
+product_refresher = ProductRefresher()
@@ -1,9 +1,82 @@
 """Product feature service for product lookup and management"""
 
-from typing import Optional
-from app.core.database import get_supabase_client
+import asyncio
+from datetime import datetime, timezone
+from typing import Dict, List, Optional, Tuple
+from app.core.config import settings
+from app.core.database import get_supabase_client, execute_query
 from app.entities.product.models import Product
+from app.entities.product.barcode import normalize_barcode
+from app.entities.product.cache import (
+    cache_product,
+    forget_missing,
+    get_cached_product_by_barcode,
+    get_cached_product_by_id,
+    invalidate_product,
+    is_known_missing,
+    remember_missing,
+)
+from app.entities.product.nutrition_index import nutrition_index
 from app.external.openfoodfacts import OpenFoodFactsClient
+from app.features.product.refresh import product_refresher
+from app.shared.batching import BatchWriter
+from app.shared.singleflight import SingleFlight
+
+# Shared by every ProductService instance so concurrent requests for the same
+# barcode coalesce into one DB read, one OFF fetch and one insert
+product_fetches = SingleFlight()
+
+# Per-barcode statuses reported by batch lookups
+LOOKUP_FOUND = "found"
+LOOKUP_NOT_FOUND = "not_found"
+LOOKUP_ERROR = "error"
+
+
+async def _flush_new_products(products: List[Product]) -> None:
+    """
+    Persist a write-behind batch with one upsert on the normalized barcode
+    
+    The database assigns the IDs. Inserted products are re-cached with
+    theirs; products that lost a race to a concurrent insert are dropped
+    from the cache so the stored row and its ID are served from now on.
+    """
+    unique = {product.barcode_normalized: product for product in products}
+    response = await execute_query(
+        get_supabase_client().table("products").upsert(
+            [product.model_dump(mode="json", exclude_none=True) for product in unique.values()],
+            on_conflict="barcode_normalized",
+            ignore_duplicates=True,
+            default_to_null=False
+        )
+    )
+    ids = {row["barcode_normalized"]: row["id"] for row in response.data or []}
+    for product in unique.values():
+        if product.barcode_normalized in ids:
+            product.id = ids[product.barcode_normalized]
+            await cache_product(product)
+            nutrition_index.upsert(product)
+        else:
+            await invalidate_product(barcode=product.barcode)
+
+
+async def _drop_unsaved_products(products: List[Product]) -> None:
+    """Forget cached copies of products that could not be persisted"""
+    for product in products:
+        await invalidate_product(barcode=product.barcode)
+
+
+# Newly fetched OFF products are returned to the caller right away and written
+# in batches by a background worker started from the application lifespan
+product_writer: BatchWriter[Product] = BatchWriter(
+    name="product-write-behind",
+    flush=_flush_new_products,
+    max_batch_size=settings.PRODUCT_WRITE_BATCH_SIZE,
+    flush_interval=settings.PRODUCT_WRITE_FLUSH_INTERVAL_SECONDS,
+    max_queue_size=settings.PRODUCT_WRITE_QUEUE_SIZE,
+    max_retries=settings.PRODUCT_WRITE_MAX_RETRIES,
+    retry_backoff=settings.PRODUCT_WRITE_RETRY_BACKOFF_SECONDS,
+    on_failure=_drop_unsaved_products,
+)
 
 
 class ProductService:
@@ -23,32 +96,218 @@ class ProductService:
         Lookup product by barcode/QR code
         
         Query order:
-        1. Supabase products table
-        2. Open Food Facts API
-        3. Store in Supabase if found
+        1. Product cache (in-process LRU, then Redis)
+        2. Supabase products table
+        3. Negative cache of barcodes unknown to OFF
+        4. Open Food Facts API
+        5. Store in Supabase if found, before returning
+        
+        The negative cache only gates OFF requests. Products inserted by any
+        writer (importer, admin, another worker) are found in step 2 even
+        while their barcode is still in the negative cache.
+        
+        Clients open, favorite and record a scanned product by its ID, so a
+        newly fetched product is inserted synchronously (not through the
+        write-behind queue) and always returned with a committed ID.
+        
+        Stored OFF products past PRODUCT_REFRESH_AFTER_HOURS are served as-is
+        and re-fetched in the background (stale-while-revalidate).
+        
+        Every step is keyed by the normalized barcode, so UPC-A, EAN-13 and
+        GTIN-14 forms of a code resolve to the same product. Concurrent cache
+        misses for the same barcode share steps 2-5.
+        """
+        code = normalize_barcode(code)
+        product = await get_cached_product_by_barcode(code)
+        if product:
+            product_refresher.schedule(product)
+            return product
+        
+        product = await product_fetches.do(
+            code,
+            lambda: self._fetch_and_store_product(code)
+        )
+        # Coalesced callers share one result; give each its own copy
+        return product.model_copy(deep=True) if product else None
+    
+    async def lookup_products(self, codes: List[str]) -> Dict[str, Tuple[Optional[Product], str]]:
+        """
+        Lookup many barcodes in one pass
+        
+        Cache hits are resolved first. All remaining barcodes are read with a
+        single `in` query; DB misses outside their negative-cache window are
+        fetched from Open Food Facts concurrently (bounded by
+        OFF_BATCH_CONCURRENCY) and new products are queued for the
+        write-behind worker; they carry no ID until the batch is committed.
+        
+        Args:
+            codes: Barcodes to resolve (duplicates are resolved once)
+            
+        Returns:
+            Dict mapping each normalized barcode to (product, status), where
+            status is "found", "not_found" or "error" (upstream lookup failed)
+        """
+        codes = list(dict.fromkeys(normalize_barcode(code) for code in codes))
+        results: Dict[str, Tuple[Optional[Product], str]] = {}
+        
+        cached = await asyncio.gather(*[get_cached_product_by_barcode(code) for code in codes])
+        pending = []
+        for code, product in zip(codes, cached):
+            if product:
+                product_refresher.schedule(product)
+                results[code] = (product, LOOKUP_FOUND)
+            else:
+                pending.append(code)
+        
+        if not pending:
+            return {code: results[code] for code in codes}
+        
+        for product in await self._get_products_from_db(pending):
+            await cache_product(product)
+            product_refresher.schedule(product)
+            results[product.barcode_normalized or normalize_barcode(product.barcode)] = (product, LOOKUP_FOUND)
+        
+        db_misses = [code for code in pending if code not in results]
+        known_missing = await asyncio.gather(*[is_known_missing(code) for code in db_misses])
+        misses = []
+        for code, is_missing in zip(db_misses, known_missing):
+            if is_missing:
+                results[code] = (None, LOOKUP_NOT_FOUND)
+            else:
+                misses.append(code)
+        
+        semaphore = asyncio.Semaphore(settings.OFF_BATCH_CONCURRENCY)
+        
+        async def fetch(code: str) -> Tuple[Optional[Product], bool]:
+            async with semaphore:
+                result: Tuple[Optional[Product], bool] = await self.off_client.lookup_barcode(code)
+            return result
+        
+        fetched = await asyncio.gather(*[fetch(code) for code in misses])
+        new_products = []
+        for code, (product, is_missing) in zip(misses, fetched):
+            if product:
+                new_products.append(product)
+                results[code] = (product, LOOKUP_FOUND)
+            elif is_missing:
+                await remember_missing(code)
+                results[code] = (None, LOOKUP_NOT_FOUND)
+            else:
+                results[code] = (None, LOOKUP_ERROR)
+        
+        if new_products:
+            await self._store_new_products(new_products)
+        
+        return {code: results[code] for code in codes}
+    
+    async def list_products(
+        self,
+        category: Optional[str] = None,
+        exclude_allergen_mask: int = 0,
+        limit: int = 20,
+        offset: int = 0
+    ) -> Tuple[List[Product], bool]:
+        """
+        List products by name, optionally only those safe for an allergy mask
+        
+        The allergen filter runs inside Postgres through the
+        products_safe_for() function, which keeps rows whose allergen_mask
+        shares no bit with the given mask. Products without a computed mask
+        are treated as unsafe whenever a mask is given.
+        
+        Returns:
+            Tuple of (products, has_more)
         """
-        # First, try Supabase
+        query = self.supabase.rpc(
+            "products_safe_for",
+            {"p_allergen_mask": exclude_allergen_mask}
+        ).select("*")
+        if category:
+            query = query.eq("category", category)
+        
+        # Fetch one extra row to know whether another page exists
+        response = await execute_query(
+            query.order("name").order("id").range(offset, offset + limit)
+        )
+        rows = response.data or []
+        return [Product(**row) for row in rows[:limit]], len(rows) > limit
+    
+    async def find_alternatives(
+        self,
+        product: Product,
+        exclude_allergen_mask: int = 0,
+        limit: int = 10
+    ) -> List[Product]:
+        """
+        Products in the same category with similar nutrition and a better
+        Nutri-Score, nearest first
+        
+        Neighbours come from the in-memory nutrition index; only their rows
+        are read from the database.
+        """
+        if not product.id:
+            return []
+        
+        # Index products that were stored before this worker saw them
+        if product.id not in nutrition_index:
+            nutrition_index.upsert(product)
+        neighbours = nutrition_index.nearest(
+            product.id,
+            limit=limit,
+            exclude_allergen_mask=exclude_allergen_mask
+        )
+        if not neighbours:
+            return []
+        
+        ids = [product_id for product_id, _ in neighbours]
+        response = await execute_query(
+            self.supabase.table("products").select("*").in_("id", ids)
+        )
+        rows = {row["id"]: row for row in response.data or []}
+        # Rows deleted since they were indexed are skipped
+        return [Product(**rows[product_id]) for product_id in ids if product_id in rows]
+    
+    async def get_product_by_id(self, product_id: str) -> Optional[Product]:
+        """Get product by ID from the cache, falling back to the database"""
+        product = await get_cached_product_by_id(product_id)
+        if product:
+            product_refresher.schedule(product)
+            return product
+        
+        product = await self._get_product_from_db_by_id(product_id)
+        if product:
+            await cache_product(product)
+            product_refresher.schedule(product)
+        return product
+    
+    async def _fetch_and_store_product(self, code: str) -> Optional[Product]:
+        """Resolve a cache miss from Supabase, then Open Food Facts"""
         product = await self._get_product_from_db(code)
         if product:
+            await cache_product(product)
+            product_refresher.schedule(product)
             return product
         
+        if await is_known_missing(code):
+            return None
+        
         # Fallback to Open Food Facts
-        product = await self.off_client.get_product_by_barcode(code)
+        product, is_missing = await self.off_client.lookup_barcode(code)
         if product:
-            # Store in database for future lookups
-            await self._save_product_to_db(product)
-            return product
+            # Store in database so the caller gets the committed ID
+            stored = await self._store_new_products([product], wait=True)
+            return stored[0]
         
+        if is_missing:
+            await remember_missing(code)
         return None
     
-    async def get_product_by_id(self, product_id: str) -> Optional[Product]:
-        """Get product by ID from database"""
-        return await self._get_product_from_db_by_id(product_id)
-    
     async def _get_product_from_db(self, barcode: str) -> Optional[Product]:
-        """Get product from Supabase by barcode"""
+        """Get product from Supabase by normalized barcode"""
         try:
-            response = self.supabase.table("products").select("*").eq("barcode", barcode).execute()
+            response = await execute_query(
+                self.supabase.table("products").select("*").eq("barcode_normalized", barcode)
+            )
             if response.data and len(response.data) > 0:
                 return Product(**response.data[0])
             return None
@@ -56,10 +315,23 @@ class ProductService:
             print(f"Error fetching product from DB: {e}")
             return None
     
+    async def _get_products_from_db(self, barcodes: List[str]) -> List[Product]:
+        """Get every product matching the given normalized barcodes in one query"""
+        try:
+            response = await execute_query(
+                self.supabase.table("products").select("*").in_("barcode_normalized", barcodes)
+            )
+            return [Product(**row) for row in response.data or []]
+        except Exception as e:
+            print(f"Error fetching products from DB: {e}")
+            return []
+    
     async def _get_product_from_db_by_id(self, product_id: str) -> Optional[Product]:
         """Get product from Supabase by ID"""
         try:
-            response = self.supabase.table("products").select("*").eq("id", product_id).execute()
+            response = await execute_query(
+                self.supabase.table("products").select("*").eq("id", product_id)
+            )
             if response.data and len(response.data) > 0:
                 return Product(**response.data[0])
             return None
@@ -67,13 +339,87 @@ class ProductService:
             print(f"Error fetching product from DB: {e}")
             return None
     
-    async def _save_product_to_db(self, product: Product) -> bool:
-        """Save product to Supabase"""
+    async def _store_new_products(self, products: List[Product], wait: bool = False) -> List[Product]:
+        """
+        Persist newly fetched products
+        
+        Products are cached by barcode first. With wait, they are inserted
+        now and the stored versions are returned with their committed IDs.
+        Otherwise they are queued for the write-behind worker and returned
+        without an ID, so nothing (a favorite, a scan) can reference a
+        product that may never be stored; the flush re-caches them with
+        their ID. If the worker is not running or its queue is full they are
+        written synchronously instead.
+        """
+        for product in products:
+            product.barcode_normalized = normalize_barcode(product.barcode)
+            product.last_fetched_at = product.last_fetched_at or datetime.now(timezone.utc)
+            await cache_product(product)
+            await forget_missing(product.barcode)
+        
+        if wait:
+            return await self._save_products_to_db(products)
+        
+        # Queue copies so per-request changes (e.g. warnings) are never persisted
+        unqueued = [
+            product for product in products
+            if not product_writer.submit(product.model_copy(deep=True))
+        ]
+        if unqueued:
+            await self._save_products_to_db(unqueued)
+        return products
+    
+    async def _save_products_to_db(self, products: List[Product]) -> List[Product]:
+        """
+        Bulk insert products on the normalized barcode
+        
+        Same insert-only semantics as the write-behind flush: an existing row
+        is never overwritten. Inserted products get their ID and are
+        re-cached. Barcodes that already had a row (a concurrent insert won
+        the race) are re-read, and the stored row is cached and returned in
+        place of the fetched copy.
+        
+        Returns:
+            The stored products in input order; products that could not be
+            saved are returned without an ID
+        """
         try:
-            product_dict = product.model_dump(exclude_none=True)
-            self.supabase.table("products").insert(product_dict).execute()
-            return True
+            response = await execute_query(
+                self.supabase.table("products").upsert(
+                    [product.model_dump(mode="json", exclude_none=True) for product in products],
+                    on_conflict="barcode_normalized",
+                    ignore_duplicates=True,
+                    default_to_null=False
+                )
+            )
         except Exception as e:
-            print(f"Error saving product to DB: {e}")
-            return False
-
+            print(f"Error saving products to DB: {e}")
+            return products
+        
+        ids = {row["barcode_normalized"]: row.get("id") for row in response.data or []}
+        conflicts = [
+            product.barcode_normalized for product in products
+            if product.barcode_normalized and not ids.get(product.barcode_normalized)
+        ]
+        existing: Dict[str, Product] = {}
+        if conflicts:
+            existing = {
+                product.barcode_normalized: product
+                for product in await self._get_products_from_db(conflicts)
+            }
+        
+        stored = []
+        for product in products:
+            if ids.get(product.barcode_normalized):
+                product.id = ids[product.barcode_normalized]
+                await cache_product(product)
+                nutrition_index.upsert(product)
+                stored.append(product)
+            elif product.barcode_normalized in existing:
+                stored_product = existing[product.barcode_normalized]
+                await cache_product(stored_product)
+                stored.append(stored_product)
+            else:
+                await invalidate_product(barcode=product.barcode)
+                stored.append(product)
+        return stored
@@ -0,0 +1,91 @@
+"""Scan history reads with keyset pagination"""
+
+from typing import Any, Dict, List, Optional, Tuple
+from app.core.config import settings
+from app.core.database import get_supabase_client, execute_query
+from app.features.scan.snapshots import resolve_snapshot
+from app.shared.cache import TwoTierCache
+from app.shared.pagination import decode_timestamp_cursor, encode_cursor, keyset_after_desc
+
+# Approximate per-user totals, only computed when a client asks for them
+scan_count_cache = TwoTierCache(
+    namespace="scan-count",
+    maxsize=settings.COUNT_CACHE_MAXSIZE,
+    l1_ttl=settings.COUNT_CACHE_TTL_SECONDS,
+    l2_ttl=settings.COUNT_CACHE_TTL_SECONDS,
+)
+
+
+class ScanHistoryService:
+    """Service for reading a user's scan history"""
+    
+    def __init__(self):
+        self.supabase = get_supabase_client()
+    
+    async def get_history(
+        self,
+        user_id: str,
+        limit: int = 20,
+        cursor: Optional[str] = None,
+        page: int = 1
+    ) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+        """
+        Get one page of scans, most recent first
+        
+        Pages are keyed on (scanned_at, id) and read through the
+        idx_scans_user_scanned_at index, so every page costs the same however
+        deep it is. page > 1 without a cursor still skips rows with OFFSET
+        for older clients. Shared snapshots are joined in the same request.
+        
+        Returns:
+            Tuple of (scan rows, next_cursor); next_cursor is None on the last
+            page. Each row's result_snapshot holds its snapshot, inline or shared.
+        
+        Raises:
+            ValueError: If the cursor is malformed
+        """
+        query = (
+            self.supabase.table("scans")
+            .select("id, barcode, product_id, result_snapshot, scanned_at, scan_snapshots(snapshot)")
+            .eq("user_id", user_id)
+        )
+        offset = 0
+        if cursor:
+            scanned_at, scan_id = decode_timestamp_cursor(cursor)
+            query = query.or_(keyset_after_desc("scanned_at", scanned_at, scan_id))
+        else:
+            offset = (page - 1) * limit
+        
+        # Fetch one extra row to know whether another page exists
+        response = await execute_query(
+            query.order("scanned_at", desc=True)
+            .order("id", desc=True)
+            .range(offset, offset + limit)
+        )
+        rows = response.data or []
+        page_rows = [
+            {**row, "result_snapshot": resolve_snapshot(row)}
+            for row in rows[:limit]
+        ]
+        next_cursor = None
+        if len(rows) > limit:
+            next_cursor = encode_cursor([page_rows[-1]["scanned_at"], page_rows[-1]["id"]])
+        return page_rows, next_cursor
+    
+    async def count_scans(self, user_id: str) -> int:
+        """
+        Approximate number of scans for a user
+        
+        Uses the planner estimate for large histories and is cached for
+        COUNT_CACHE_TTL_SECONDS, so it may lag recent scans.
+        """
+        total = await scan_count_cache.get(user_id)
+        if total is None:
+            response = await execute_query(
+                self.supabase.table("scans")
+                .select("id", count="estimated", head=True)
+                .eq("user_id", user_id)
+            )
+            total = response.count or 0
+            await scan_count_cache.set(user_id, total)
+        return total
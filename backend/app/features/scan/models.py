@@ -1,7 +1,8 @@
 """Scan feature models"""
 
-from pydantic import BaseModel
-from typing import Optional
+from pydantic import BaseModel, Field
+from typing import Optional, List
+from app.entities.product.models import Product
 
 
 class ScanRequest(BaseModel):
@@ -10,3 +11,24 @@ class ScanRequest(BaseModel):
     type: Optional[str] = None
     country: Optional[str] = None
 
+
+class BatchScanRequest(BaseModel):
+    """Batch scan request model"""
+    codes: List[str] = Field(..., min_length=1, max_length=200)
+    country: Optional[str] = None
+
+
+class BatchScanItem(BaseModel):
+    """Result for a single barcode in a batch scan"""
+    code: str
+    normalized_code: str
+    status: str  # found, not_found, error
+    product: Optional[Product] = None
+
+
+class BatchScanData(BaseModel):
+    """Batch scan response data"""
+    results: List[BatchScanItem]
+    found_count: int
+    not_found_count: int
+    error_count: int
@@ -0,0 +1,127 @@
+"""Buffered recording of authenticated scans into the scans table"""
+
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Tuple
+from postgrest.exceptions import APIError
+from postgrest.types import ReturnMethod
+from app.core.config import settings
+from app.core.database import get_supabase_client, execute_query
+from app.entities.product.barcode import normalize_barcode
+from app.entities.product.models import Product
+from app.features.scan.snapshots import reference_snapshots
+from app.shared.batching import BatchWriter
+
+# Left out of snapshots: per-user warnings, and bookkeeping timestamps that
+# change on every refresh and would defeat snapshot deduplication
+SNAPSHOT_EXCLUDE = {"warnings", "last_fetched_at", "created_at", "updated_at"}
+
+# Scans dropped because the buffer was full, and rows the database rejected
+_scan_counters = {"dropped": 0, "skipped": 0}
+
+
+def build_scan_record(user_id: str, code: str, product: Product) -> Dict[str, Any]:
+    """
+    A scans row for one successful scan
+    
+    scanned_at is taken now, not when the buffered row is written. The
+    snapshot leaves out SNAPSHOT_EXCLUDE; it is moved to scan_snapshots
+    when the row is inserted. product_id is None for products that are
+    still waiting to be stored; it is resolved by barcode at insert time.
+    """
+    return {
+        "user_id": user_id,
+        "barcode": code.strip(),
+        "product_id": product.id,
+        "result_snapshot": product.model_dump(mode="json", exclude=SNAPSHOT_EXCLUDE),
+        "scanned_at": datetime.now(timezone.utc).isoformat(),
+    }
+
+
+async def _resolve_product_ids(records: List[Dict[str, Any]]) -> None:
+    """Fill in product_id by normalized barcode; products not stored yet stay NULL"""
+    codes = {
+        record["barcode"]: normalize_barcode(record["barcode"])
+        for record in records
+        if not record.get("product_id")
+    }
+    if not codes:
+        return
+    response = await execute_query(
+        get_supabase_client().table("products")
+        .select("id, barcode_normalized")
+        .in_("barcode_normalized", list(set(codes.values())))
+    )
+    product_ids = {row["barcode_normalized"]: row["id"] for row in response.data or []}
+    for record in records:
+        if not record.get("product_id"):
+            record["product_id"] = product_ids.get(codes[record["barcode"]])
+
+
+async def _insert_rows(records: List[Dict[str, Any]]) -> None:
+    """
+    Insert scans rows, splitting the batch to isolate rows the database rejects
+    
+    A rejected row (e.g. a product deleted since the scan) is logged and
+    skipped instead of failing the other users' scans in its batch.
+    Connection errors propagate so the batch is retried as a whole.
+    """
+    try:
+        await execute_query(
+            get_supabase_client().table("scans").insert(records, returning=ReturnMethod.minimal)
+        )
+    except APIError as e:
+        if len(records) == 1:
+            _scan_counters["skipped"] += 1
+            print(f"Skipping scan of {records[0]['barcode']} rejected by the database: {e.message}")
+            return
+        middle = len(records) // 2
+        await _insert_rows(records[:middle])
+        await _insert_rows(records[middle:])
+
+
+async def _insert_scans(records: List[Dict[str, Any]]) -> None:
+    """Store the batch's distinct snapshots, then write the scans with one insert"""
+    records = await reference_snapshots(records)
+    await _resolve_product_ids(records)
+    await _insert_rows(records)
+
+
+# Scan responses only enqueue; a background worker started from the
+# application lifespan inserts the rows in batches
+scan_writer: BatchWriter[Dict[str, Any]] = BatchWriter(
+    name="scan-history",
+    flush=_insert_scans,
+    max_batch_size=settings.SCAN_WRITE_BATCH_SIZE,
+    flush_interval=settings.SCAN_WRITE_FLUSH_INTERVAL_SECONDS,
+    max_queue_size=settings.SCAN_WRITE_QUEUE_SIZE,
+    max_retries=settings.SCAN_WRITE_MAX_RETRIES,
+    retry_backoff=settings.SCAN_WRITE_RETRY_BACKOFF_SECONDS,
+)
+
+
+async def record_scans(user_id: str, scans: List[Tuple[str, Product]]) -> None:
+    """
+    Record (code, product) scans for a user without waiting on the database
+    
+    When the buffer is full the rows are dropped and counted rather than
+    written inside the request; scan history is best effort. Without a
+    running writer (e.g. in scripts) the rows are inserted directly. Errors
+    are logged and never fail the scan.
+    """
+    records = [build_scan_record(user_id, code, product) for code, product in scans]
+    if not scan_writer.is_running:
+        try:
+            await _insert_scans(records)
+        except Exception as e:
+            print(f"Error recording scans: {e}")
+        return
+    
+    dropped = sum(1 for record in records if not scan_writer.submit(record))
+    if dropped:
+        _scan_counters["dropped"] += dropped
+        print(f"Scan history buffer full, dropped {dropped} scans")
+
+
+def scan_recorder_stats() -> Dict[str, Any]:
+    """Scan writer counters plus scans dropped and rows skipped"""
+    return {**scan_writer.stats(), **_scan_counters}
@@ -1,8 +1,11 @@
 """Scan feature service"""
 
-from typing import Optional
+from typing import Optional, List
 from app.entities.product.models import Product
+from app.entities.product.barcode import normalize_barcode
 from app.features.product.service import ProductService
+from app.features.scan.models import BatchScanItem
+from app.features.scan.recorder import record_scans
 
 
 class ScanService:
@@ -30,4 +33,34 @@ class ScanService:
             code_type=code_type,
             country=country
         )
-
+    
+    async def record_scan(self, user_id: str, code: str, product: Product) -> None:
+        """Add a successful scan to the user's history (buffered)"""
+        await record_scans(user_id, [(code, product)])
+    
+    async def record_batch_scan(self, user_id: str, items: List[BatchScanItem]) -> None:
+        """Add every found product of a batch scan to the user's history (buffered)"""
+        scans = [(item.code, item.product) for item in items if item.product]
+        if scans:
+            await record_scans(user_id, scans)
+    
+    async def scan_products(self, codes: List[str]) -> List[BatchScanItem]:
+        """
+        Scan many barcodes in one request
+        
+        Returns one item per distinct requested code, in request order, with
+        a found / not_found / error status. Codes that normalize to the same
+        barcode are looked up once.
+        """
+        results = await self.product_service.lookup_products(codes)
+        items = []
+        for code in dict.fromkeys(code.strip() for code in codes):
+            normalized_code = normalize_barcode(code)
+            product, status = results[normalized_code]
+            items.append(BatchScanItem(
+                code=code,
+                normalized_code=normalized_code,
+                status=status,
+                product=product.model_copy(deep=True) if product else None
+            ))
+        return items
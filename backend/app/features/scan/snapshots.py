@@ -0,0 +1,77 @@
+"""Content-addressed storage of scan result snapshots"""
+
+import hashlib
+import json
+from typing import Any, Dict, List
+from postgrest.types import ReturnMethod
+from app.core.database import get_supabase_client, execute_query
+from app.shared.cache import LRUCache
+
+# Hashes this process has already written; their snapshots are not re-sent
+KNOWN_SNAPSHOTS_MAXSIZE = 50000
+known_snapshots = LRUCache(maxsize=KNOWN_SNAPSHOTS_MAXSIZE)
+
+
+def canonical_json(snapshot: Dict[str, Any]) -> str:
+    """Serialization that is identical for equal snapshots"""
+    return json.dumps(snapshot, sort_keys=True, separators=(",", ":"), ensure_ascii=False)
+
+
+def snapshot_hash(snapshot: Dict[str, Any]) -> str:
+    """Key of a snapshot in scan_snapshots: SHA-256 of its canonical JSON"""
+    return hashlib.sha256(canonical_json(snapshot).encode("utf-8")).hexdigest()
+
+
+async def store_snapshots(snapshots: Dict[str, Dict[str, Any]]) -> None:
+    """
+    Write {hash: snapshot} pairs not yet in scan_snapshots
+
+    Rows that already exist are left alone, so concurrent writers of the
+    same snapshot do not conflict.
+    """
+    unknown: List[Dict[str, Any]] = [
+        {"hash": key, "snapshot": snapshot}
+        for key, snapshot in snapshots.items()
+        if key not in known_snapshots
+    ]
+    if not unknown:
+        return
+    await execute_query(
+        get_supabase_client().table("scan_snapshots").upsert(
+            unknown,
+            on_conflict="hash",
+            ignore_duplicates=True,
+            returning=ReturnMethod.minimal
+        )
+    )
+    for row in unknown:
+        known_snapshots.set(row["hash"], True)
+
+
+async def reference_snapshots(records: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """
+    Move the result_snapshot of scans rows into scan_snapshots
+
+    Returns:
+        Copies of the records with a snapshot_hash in place of the snapshot,
+        ready to insert once this returns
+    """
+    snapshots = {}
+    referenced = []
+    for record in records:
+        record = dict(record)
+        snapshot = record.pop("result_snapshot", None)
+        if snapshot is not None:
+            key = snapshot_hash(snapshot)
+            snapshots[key] = snapshot
+            record["snapshot_hash"] = key
+        referenced.append(record)
+    await store_snapshots(snapshots)
+    return referenced
+
+
+def resolve_snapshot(row: Dict[str, Any]) -> Any:
+    """Snapshot of a scans row read with the scan_snapshots(snapshot) embed"""
+    if row.get("result_snapshot") is not None:
+        return row["result_snapshot"]
+    return (row.get("scan_snapshots") or {}).get("snapshot")
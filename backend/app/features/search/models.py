@@ -0,0 +1,28 @@
+"""Search feature models"""
+
+from pydantic import BaseModel, Field
+from typing import List, Optional
+
+
+class ProductSearchResult(BaseModel):
+    """Columns a search result card needs"""
+    id: str
+    barcode: str
+    name: str
+    brand: Optional[str] = None
+    category: Optional[str] = None
+    image: Optional[str] = None
+    health_score: Optional[float] = None
+    allergen_mask: Optional[int] = None
+    warnings: Optional[List[str]] = None
+    # Matched against the user's allergies; not sent to clients
+    allergens: Optional[List[str]] = Field(default=None, exclude=True)
+    ingredients_parsed: Optional[List[str]] = Field(default=None, exclude=True)
+    ingredients_raw: Optional[str] = Field(default=None, exclude=True)
+
+
+class ProductSearchData(BaseModel):
+    """A page of search results"""
+    results: List[ProductSearchResult]
+    next_cursor: Optional[str] = None
+    has_more: bool
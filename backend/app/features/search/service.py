@@ -0,0 +1,113 @@
+"""Search feature service for ranked product name search"""
+
+import json
+import re
+from typing import Any, Dict, List, Optional, Tuple
+from app.core.config import settings
+from app.core.database import get_supabase_client, execute_query
+from app.features.search.models import ProductSearchResult
+from app.shared.cache import TwoTierCache
+from app.shared.pagination import decode_cursor, encode_cursor
+
+# Hot queries ("milk", "chocolate") are served from here for a short while;
+# entries simply expire, so new and corrected products appear within a TTL
+search_cache = TwoTierCache(
+    namespace="search",
+    maxsize=settings.SEARCH_CACHE_MAXSIZE,
+    l1_ttl=settings.SEARCH_CACHE_TTL_SECONDS,
+    l2_ttl=settings.SEARCH_CACHE_TTL_SECONDS,
+)
+
+_SPACES = re.compile(r"\s+")
+
+
+def normalize_query(query: str) -> str:
+    """Collapse whitespace and case; full-text matching ignores both"""
+    return _SPACES.sub(" ", query.strip().lower())
+
+
+def encode_search_cursor(rank: float, product_id: str) -> str:
+    """Cursor for the page after the (rank, id) of the last result"""
+    return encode_cursor([rank, product_id])
+
+
+def decode_search_cursor(cursor: str) -> Tuple[float, str]:
+    """
+    Decode a cursor from encode_search_cursor()
+    
+    Raises:
+        ValueError: If the cursor is malformed
+    """
+    rank, product_id = decode_cursor(cursor, 2)
+    try:
+        return float(rank), str(product_id)
+    except (TypeError, ValueError) as e:
+        raise ValueError("Invalid cursor") from e
+
+
+class SearchService:
+    """Service for product search"""
+    
+    def __init__(self):
+        self.supabase = get_supabase_client()
+    
+    async def search_products(
+        self,
+        query: str,
+        brand: Optional[str] = None,
+        category: Optional[str] = None,
+        exclude_allergen_mask: int = 0,
+        limit: int = 20,
+        cursor: Optional[str] = None
+    ) -> Tuple[List[ProductSearchResult], Optional[str]]:
+        """
+        Search product names, best matches first
+        
+        Runs search_products() in Postgres, which matches through the GIN
+        index on product names and pages by (rank, id) instead of OFFSET.
+        
+        Args:
+            query: Search text (websearch syntax: quotes, OR, -word)
+            brand: Exact brand to filter on
+            category: Exact category to filter on
+            exclude_allergen_mask: Drop products sharing any of these allergen bits
+            limit: Results per page
+            cursor: next_cursor from the previous page
+        
+        Returns:
+            Tuple of (results, next_cursor); next_cursor is None on the last page
+        
+        Raises:
+            ValueError: If the cursor is malformed
+        """
+        after_rank, after_id = decode_search_cursor(cursor) if cursor else (None, None)
+        params = {
+            "p_query": normalize_query(query),
+            "p_brand": brand,
+            "p_category": category,
+            "p_allergen_mask": exclude_allergen_mask,
+            "p_after_rank": after_rank,
+            "p_after_id": after_id,
+            # One extra row tells whether another page exists
+            "p_limit": limit + 1,
+        }
+        
+        key = json.dumps(params, sort_keys=True)
+        rows: Optional[List[Dict[str, Any]]] = await search_cache.get(key)
+        if rows is None:
+            response = await execute_query(self.supabase.rpc("search_products", params))
+            rows = response.data or []
+            await search_cache.set(key, rows)
+        
+        page = rows[:limit]
+        results = [
+            ProductSearchResult(
+                **{field: value for field, value in row.items() if field not in ("images", "rank")},
+                image=row["images"][0] if row.get("images") else None
+            )
+            for row in page
+        ]
+        next_cursor = None
+        if len(rows) > limit:
+            next_cursor = encode_search_cursor(page[-1]["rank"], page[-1]["id"])
+        return results, next_cursor
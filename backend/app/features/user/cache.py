@@ -0,0 +1,40 @@
+"""Cache of users_meta rows read on every authenticated scan"""
+
+from typing import Any, Dict, Optional
+from app.core.config import settings
+from app.shared.cache import CacheVersion, TwoTierCache
+
+# Keyed by user ID. An empty dict records that the user has no users_meta row
+# yet. Writes invalidate the entry on every worker through Redis pub/sub, and
+# a row read before a write is never cached after its invalidation.
+user_meta_cache = TwoTierCache(
+    namespace="user-meta",
+    maxsize=settings.USER_PROFILE_CACHE_MAXSIZE,
+    l1_ttl=settings.USER_PROFILE_CACHE_L1_TTL_SECONDS,
+    l2_ttl=settings.USER_PROFILE_CACHE_L2_TTL_SECONDS,
+    broadcast_invalidations=True,
+)
+
+
+async def get_cached_user_meta(user_id: str) -> Optional[Dict[str, Any]]:
+    """Get a cached users_meta row ({} if the user has none), or None on a miss"""
+    return await user_meta_cache.get(user_id)
+
+
+async def user_meta_version(user_id: str) -> CacheVersion:
+    """Version of a user's entry; read it before loading the row from the DB"""
+    return await user_meta_cache.version(user_id)
+
+
+async def cache_user_meta(
+    user_id: str,
+    user_meta: Optional[Dict[str, Any]],
+    version: CacheVersion
+) -> None:
+    """Cache a users_meta row (or the fact that there is none) unless it was invalidated since version"""
+    await user_meta_cache.set_if_unchanged(user_id, user_meta or {}, version)
+
+
+async def invalidate_user_meta(user_id: str) -> None:
+    """Drop a user's cached row everywhere after it was written"""
+    await user_meta_cache.delete(user_id)
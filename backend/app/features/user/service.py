@@ -1,8 +1,14 @@
 """User feature service for user preferences and profile management"""
 
 from typing import Optional, Dict, List
-from app.core.database import get_supabase_client
+from app.core.database import get_supabase_client, execute_query
 from app.features.user.models import UserPreferencesRequest, UserProfile
+from app.features.user.cache import (
+    cache_user_meta,
+    get_cached_user_meta,
+    invalidate_user_meta,
+    user_meta_version,
+)
 
 
 class UserService:
@@ -20,6 +26,11 @@ class UserService:
         """
         Get user profile with preferences from users_meta table
         
+        The users_meta row is cached per user and invalidated whenever
+        preferences are written, so repeated scans skip the DB round trip.
+        A row read while a write is invalidating the entry is returned but
+        not cached.
+        
         Args:
             user_id: Supabase Auth user ID
             email: User email (from JWT token)
@@ -29,12 +40,19 @@ class UserService:
             UserProfile if found, None otherwise
         """
         try:
-            # Fetch user metadata from users_meta table
-            response = self.supabase.table("users_meta").select("*").eq("user_id", user_id).execute()
-            
-            user_meta = None
-            if response.data and len(response.data) > 0:
-                user_meta = response.data[0]
+            user_meta = await get_cached_user_meta(user_id)
+            if user_meta is None:
+                # Taken before the read, so a preference write and its
+                # invalidation landing during the read keep this row uncached
+                version = await user_meta_version(user_id)
+                # Fetch user metadata from users_meta table
+                response = await execute_query(
+                    self.supabase.table("users_meta").select("*").eq("user_id", user_id)
+                )
+                
+                if response.data and len(response.data) > 0:
+                    user_meta = response.data[0]
+                await cache_user_meta(user_id, user_meta, version)
             
             # Combine auth user data (from JWT) with metadata from users_meta
             return UserProfile(
@@ -69,7 +87,9 @@ class UserService:
         """
         try:
             # Check if users_meta record exists
-            existing_response = self.supabase.table("users_meta").select("*").eq("user_id", user_id).execute()
+            existing_response = await execute_query(
+                self.supabase.table("users_meta").select("*").eq("user_id", user_id)
+            )
             
             update_data = {}
             if preferences.allergies is not None:
@@ -81,11 +101,10 @@ class UserService:
             
             if existing_response.data and len(existing_response.data) > 0:
                 # Update existing record
-                response = (
+                response = await execute_query(
                     self.supabase.table("users_meta")
                     .update(update_data)
                     .eq("user_id", user_id)
-                    .execute()
                 )
             else:
                 # Create new record
@@ -93,8 +112,11 @@ class UserService:
                     "user_id": user_id,
                     **update_data
                 }
-                response = self.supabase.table("users_meta").insert(create_data).execute()
+                response = await execute_query(
+                    self.supabase.table("users_meta").insert(create_data)
+                )
             
+            await invalidate_user_meta(user_id)
             return True
             
         except Exception as e:
@@ -118,7 +140,9 @@ class UserService:
         """
         try:
             # Check if record already exists
-            existing_response = self.supabase.table("users_meta").select("*").eq("user_id", user_id).execute()
+            existing_response = await execute_query(
+                self.supabase.table("users_meta").select("*").eq("user_id", user_id)
+            )
             
             if existing_response.data and len(existing_response.data) > 0:
                 return True  # Already exists
@@ -134,7 +158,8 @@ class UserService:
                 if preferences.preferences is not None:
                     create_data["preferences"] = preferences.preferences
             
-            response = self.supabase.table("users_meta").insert(create_data).execute()
+            response = await execute_query(self.supabase.table("users_meta").insert(create_data))
+            await invalidate_user_meta(user_id)
             return True
             
         except Exception as e:
@@ -0,0 +1 @@
+"""Offline jobs run from the command line (python -m app.jobs.<name>)"""
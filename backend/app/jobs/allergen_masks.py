@@ -0,0 +1,82 @@
+"""
+Compute products.allergen_mask for stored products
+
+Run after applying migration 011, and with --all after changing allergen
+aliases so stored masks pick up the new matches.
+
+Usage:
+    python -m app.jobs.allergen_masks
+    python -m app.jobs.allergen_masks --all
+"""
+
+import argparse
+import asyncio
+import json
+from typing import Any, Dict, List, Optional
+from app.core.database import get_supabase_client
+from app.entities.allergen.matcher import compute_allergen_mask
+from app.entities.product.models import Product
+from app.features.allergen.service import reload_allergen_matcher
+from app.jobs.batches import fetch_page, forget_cached_products, run_batches, update_rows
+
+# Columns the mask is computed from, plus the fields a Product requires
+SELECT_COLUMNS = "id, barcode, name, allergens, ingredients_parsed, ingredients_raw, allergen_mask"
+
+
+def fetch_products(after_id: Optional[str], batch_size: int, recompute_all: bool) -> List[Dict[str, Any]]:
+    """Read the next page of products in ID order"""
+    query = get_supabase_client().table("products").select(SELECT_COLUMNS)
+    if not recompute_all:
+        query = query.is_("allergen_mask", "null")
+    return fetch_page(query, after_id, batch_size)
+
+
+def mask_changes(rows: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """Compute masks for a page of product rows and return the changed ones"""
+    changes = []
+    for row in rows:
+        mask = compute_allergen_mask(Product(**row))
+        if mask != row.get("allergen_mask"):
+            changes.append({"id": row["id"], "allergen_mask": mask})
+    return changes
+
+
+def backfill_allergen_masks(batch_size: int = 1000, recompute_all: bool = False) -> Dict[str, Any]:
+    """
+    Page through products by ID and write masks that are missing or changed
+
+    Cached copies of updated products are dropped after each page, so
+    allergen warnings agree with the stored masks right away.
+
+    Returns:
+        Counters: products scanned, masks updated, rows/sec
+    """
+    def process(rows: List[Dict[str, Any]]) -> Dict[str, int]:
+        changes = mask_changes(rows)
+        if changes:
+            update_rows("products", changes)
+            changed_ids = {change["id"] for change in changes}
+            forget_cached_products([row for row in rows if row["id"] in changed_ids])
+        return {"updated": len(changes)}
+
+    return run_batches(
+        "allergen_masks",
+        lambda after_id, size: fetch_products(after_id, size, recompute_all),
+        process,
+        batch_size=batch_size
+    )
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="Compute allergen bitmasks for stored products")
+    parser.add_argument("--all", action="store_true", help="Recompute every product, not only missing masks")
+    parser.add_argument("--batch-size", type=int, default=1000)
+    args = parser.parse_args(argv)
+
+    # Match with the same aliases the API uses
+    asyncio.run(reload_allergen_matcher(force=True))
+    print(json.dumps(backfill_allergen_masks(batch_size=args.batch_size, recompute_all=args.all)))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,120 @@
+"""
+Shared loop for jobs that page through a table by ID and write back changes
+
+A job supplies a page fetcher and a page processor; run_batches() pages by
+keyset on id, sums the processor's counters and prints progress in rows/sec.
+Changes are written with update_rows(), which touches only the changed
+columns instead of upserting whole rows; forget_cached_products() then
+drops the cached copies of the changed products so the API serves the new
+values instead of waiting for the product cache TTL.
+"""
+
+import asyncio
+import json
+import time
+from typing import Any, Callable, Dict, List, Optional
+from app.core.database import get_supabase_client
+from app.core.redis import close_redis_client
+from app.entities.product.cache import invalidate_products
+
+# IDs per UPDATE ... WHERE id IN (...) request, to keep the URL short
+UPDATE_CHUNK_SIZE = 200
+
+Rows = List[Dict[str, Any]]
+
+
+def fetch_page(query: Any, after_id: Optional[str], batch_size: int) -> Rows:
+    """Read the page of a filtered select that follows after_id, in ID order"""
+    if after_id:
+        query = query.gt("id", after_id)
+    return query.order("id").limit(batch_size).execute().data or []
+
+
+def update_rows(table: str, rows: Rows) -> None:
+    """
+    Write column-only changes to rows identified by id
+
+    Each row holds "id" plus the columns to set. Rows with the same values
+    share one update, so a page of mostly equal changes costs a few requests.
+    """
+    payloads: Dict[str, Dict[str, Any]] = {}
+    ids: Dict[str, List[str]] = {}
+    for row in rows:
+        payload = {column: value for column, value in row.items() if column != "id"}
+        key = json.dumps(payload, sort_keys=True)
+        payloads[key] = payload
+        ids.setdefault(key, []).append(row["id"])
+
+    client = get_supabase_client()
+    for key, row_ids in ids.items():
+        for i in range(0, len(row_ids), UPDATE_CHUNK_SIZE):
+            client.table(table).update(payloads[key]).in_("id", row_ids[i:i + UPDATE_CHUNK_SIZE]).execute()
+
+
+async def _invalidate_products(rows: Rows) -> None:
+    try:
+        await invalidate_products(
+            product_ids=[row["id"] for row in rows],
+            barcodes=[row["barcode"] for row in rows if row.get("barcode")]
+        )
+    finally:
+        # The async client is bound to this event loop; the next page runs in a new one
+        await close_redis_client()
+
+
+def forget_cached_products(rows: Rows) -> None:
+    """
+    Drop changed products from the product cache on every worker
+
+    Each row holds the product's "id" and "barcode". All keys of a page go
+    out in one Redis DEL and one invalidation broadcast.
+    """
+    if rows:
+        asyncio.run(_invalidate_products(rows))
+
+
+def run_batches(
+    name: str,
+    fetch: Callable[[Optional[str], int], Rows],
+    process: Callable[[Rows], Dict[str, int]],
+    batch_size: int = 1000,
+    pause: float = 0.0
+) -> Dict[str, Any]:
+    """
+    Page through rows by ID until fetch returns an empty page
+
+    Args:
+        name: Job name printed with each progress line
+        fetch: Reads the page after an ID (None for the first page)
+        process: Handles one page and returns counters to add to the totals
+        batch_size: Rows per page
+        pause: Seconds to sleep between pages, to limit load on the database
+
+    Returns:
+        Rows scanned, the summed counters, seconds and rows/sec
+    """
+    totals: Dict[str, int] = {"scanned": 0}
+    after_id = None
+    started = time.monotonic()
+
+    while True:
+        rows = fetch(after_id, batch_size)
+        if not rows:
+            break
+        after_id = rows[-1]["id"]
+        totals["scanned"] += len(rows)
+        for counter, value in process(rows).items():
+            totals[counter] = totals.get(counter, 0) + value
+
+        elapsed = time.monotonic() - started
+        counters = ", ".join(f"{value} {counter}" for counter, value in totals.items())
+        print(f"{name}: {counters} ({totals['scanned'] / elapsed if elapsed else 0:.0f} rows/s)")
+        if pause:
+            time.sleep(pause)
+
+    elapsed = time.monotonic() - started
+    return {
+        **totals,
+        "seconds": round(elapsed, 2),
+        "rows_per_second": round(totals["scanned"] / elapsed, 1) if elapsed else 0.0,
+    }
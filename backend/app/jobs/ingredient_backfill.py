@@ -0,0 +1,166 @@
+"""
+Parse products.ingredients_raw into ingredients_parsed for stored products
+
+Pages through the catalog by ID and parses each page's distinct ingredient
+strings across a process pool. Every worker builds its own parser from the
+alias table, so each worker memoizes separately. Allergen masks are
+recomputed from the new lists and written in the same column update, and
+the cached copies of changed products are dropped.
+
+By default only products without ingredients_parsed are filled in. --all
+reparses every product with label text and overwrites existing lists,
+including the structured lists imported from Open Food Facts, but never a
+list an admin corrected.
+
+Usage:
+    python -m app.jobs.ingredient_backfill
+    python -m app.jobs.ingredient_backfill --all --workers 8
+"""
+
+import argparse
+import asyncio
+import json
+import os
+from concurrent.futures import Executor, ProcessPoolExecutor
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+from app.core.database import get_supabase_client
+from app.entities.allergen.matcher import compute_allergen_mask
+from app.entities.ingredient.parser import (
+    IngredientParser,
+    get_active_ingredient_parser,
+    set_active_ingredient_parser,
+)
+from app.entities.product.models import Product
+from app.features.allergen.service import (
+    ingredient_aliases,
+    install_alias_rows,
+    load_alias_rows,
+)
+from app.jobs.batches import fetch_page, forget_cached_products, run_batches, update_rows
+
+# Columns the parse and mask need, the fields a Product requires, and the
+# admin corrections that must not be overwritten
+SELECT_COLUMNS = (
+    "id, barcode, name, allergens, ingredients_parsed, ingredients_raw, allergen_mask, corrected_fields"
+)
+
+# Distinct strings sent to a worker per task
+PARSE_CHUNK_SIZE = 200
+
+
+def _init_worker(aliases: List[Tuple[str, str]]) -> None:
+    set_active_ingredient_parser(IngredientParser(aliases))
+
+
+def _parse_chunk(texts: List[str]) -> List[List[str]]:
+    parser = get_active_ingredient_parser()
+    return [parser.parse(text) for text in texts]
+
+
+def parse_distinct(texts: List[str], executor: Optional[Executor]) -> Dict[str, List[str]]:
+    """Parse each distinct string once, in chunks across the pool"""
+    distinct = list(dict.fromkeys(texts))
+    chunks = [distinct[i:i + PARSE_CHUNK_SIZE] for i in range(0, len(distinct), PARSE_CHUNK_SIZE)]
+    results: Iterable[List[List[str]]]
+    if executor is None:
+        results = map(_parse_chunk, chunks)
+    else:
+        results = executor.map(_parse_chunk, chunks)
+    parsed: Dict[str, List[str]] = {}
+    for chunk, chunk_results in zip(chunks, results):
+        parsed.update(zip(chunk, chunk_results))
+    return parsed
+
+
+def fetch_products(after_id: Optional[str], batch_size: int, reparse_all: bool) -> List[Dict[str, Any]]:
+    """Read the next page of products that have label text, in ID order"""
+    query = (
+        get_supabase_client().table("products").select(SELECT_COLUMNS)
+        .not_.is_("ingredients_raw", "null")
+        .neq("ingredients_raw", "")
+    )
+    if not reparse_all:
+        query = query.is_("ingredients_parsed", "null")
+    return fetch_page(query, after_id, batch_size)
+
+
+def ingredient_changes(rows: List[Dict[str, Any]], parsed: Dict[str, List[str]]) -> List[Dict[str, Any]]:
+    """
+    Update payloads for the rows whose parsed list changed
+
+    Rows whose ingredients_parsed was corrected by an admin are skipped.
+    """
+    changes = []
+    for row in rows:
+        if "ingredients_parsed" in (row.get("corrected_fields") or ()):
+            continue
+        ingredients = parsed[row["ingredients_raw"]] or None
+        if ingredients == row.get("ingredients_parsed"):
+            continue
+        mask = compute_allergen_mask(Product(**{**row, "ingredients_parsed": ingredients}))
+        changes.append({"id": row["id"], "ingredients_parsed": ingredients, "allergen_mask": mask})
+    return changes
+
+
+def backfill_ingredients(
+    batch_size: int = 1000,
+    reparse_all: bool = False,
+    executor: Optional[Executor] = None
+) -> Dict[str, Any]:
+    """
+    Parse ingredients_raw for each page of products and write changed lists
+
+    Args:
+        batch_size: Products read per page
+        reparse_all: Reparse products that already have ingredients_parsed,
+            replacing their lists (Open Food Facts ones included); lists
+            corrected by an admin are always kept
+        executor: Pool for parsing; parses in this process when None
+
+    Returns:
+        Counters: products scanned, distinct strings parsed, rows updated, rows/sec
+    """
+    def process(rows: List[Dict[str, Any]]) -> Dict[str, int]:
+        parsed = parse_distinct([row["ingredients_raw"] for row in rows], executor)
+        changes = ingredient_changes(rows, parsed)
+        if changes:
+            update_rows("products", changes)
+            changed_ids = {change["id"] for change in changes}
+            forget_cached_products([row for row in rows if row["id"] in changed_ids])
+        return {"distinct_strings": len(parsed), "updated": len(changes)}
+
+    return run_batches(
+        "ingredient_backfill",
+        lambda after_id, size: fetch_products(after_id, size, reparse_all),
+        process,
+        batch_size=batch_size
+    )
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="Parse raw ingredient text for stored products")
+    parser.add_argument(
+        "--all",
+        action="store_true",
+        help="Reparse every product, overwriting existing lists (including Open Food Facts ones)"
+    )
+    parser.add_argument("--batch-size", type=int, default=1000)
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1, help="Parser processes (1 parses in-process)")
+    args = parser.parse_args(argv)
+
+    # Masks are recomputed with the same aliases the API uses; the rows are
+    # read once for the matcher, this process's parser and the pool workers
+    rows = asyncio.run(load_alias_rows())
+    install_alias_rows(rows)
+    aliases = ingredient_aliases(rows)
+
+    if args.workers <= 1:
+        result = backfill_ingredients(batch_size=args.batch_size, reparse_all=args.all)
+    else:
+        with ProcessPoolExecutor(args.workers, initializer=_init_worker, initargs=(aliases,)) as executor:
+            result = backfill_ingredients(batch_size=args.batch_size, reparse_all=args.all, executor=executor)
+    print(json.dumps(result))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,150 @@
+"""
+Compute products.health_score and nutriscore_grade from stored nutrition
+
+Pages through products by ID and scores each page in one vectorized pass.
+By default only missing values are filled in; --all recomputes every
+product with nutrition data, replacing scores copied from Open Food Facts.
+
+Usage:
+    python -m app.jobs.nutriscores
+    python -m app.jobs.nutriscores --all
+    python -m app.jobs.nutriscores --benchmark 1000000
+"""
+
+import argparse
+import json
+import math
+import time
+from typing import Any, Dict, List, Optional
+import numpy as np
+from app.core.database import get_supabase_client
+from app.entities.product.models import NutritionFacts
+from app.entities.product.nutriscore import (
+    compute_nutriscore,
+    compute_nutriscores,
+    facts_to_columns,
+)
+from app.jobs.batches import fetch_page, forget_cached_products, run_batches, update_rows
+
+# Columns the score is computed from and compared against, plus the
+# barcode the product is cached under
+SELECT_COLUMNS = "id, barcode, nutrition, health_score, nutriscore_grade"
+
+
+def fetch_products(after_id: Optional[str], batch_size: int, recompute_all: bool) -> List[Dict[str, Any]]:
+    """Read the next page of products with nutrition data, in ID order"""
+    query = (
+        get_supabase_client().table("products").select(SELECT_COLUMNS)
+        .not_.is_("nutrition", "null")
+    )
+    if not recompute_all:
+        query = query.or_("health_score.is.null,nutriscore_grade.is.null")
+    return fetch_page(query, after_id, batch_size)
+
+
+def _per_100g(row: Dict[str, Any]) -> Optional[NutritionFacts]:
+    per_100g = (row.get("nutrition") or {}).get("per_100g")
+    return NutritionFacts(**per_100g) if per_100g else None
+
+
+def score_rows(rows: List[Dict[str, Any]], recompute_all: bool = False) -> List[Dict[str, Any]]:
+    """
+    Score a page of product rows and return update payloads for the changed ones
+
+    Without recompute_all, existing health_score and nutriscore_grade values
+    are kept and only missing ones are filled in.
+    """
+    scores, grades = compute_nutriscores(facts_to_columns(_per_100g(row) for row in rows))
+    changes = []
+    for row, score, grade in zip(rows, scores.tolist(), grades.tolist()):
+        if math.isnan(score):
+            continue
+        health_score = score if recompute_all or row.get("health_score") is None else row["health_score"]
+        nutriscore_grade = grade if recompute_all or not row.get("nutriscore_grade") else row["nutriscore_grade"]
+        if health_score == row.get("health_score") and nutriscore_grade == row.get("nutriscore_grade"):
+            continue
+        changes.append({
+            "id": row["id"],
+            "health_score": health_score,
+            "nutriscore_grade": nutriscore_grade,
+        })
+    return changes
+
+
+def backfill_nutriscores(batch_size: int = 1000, recompute_all: bool = False) -> Dict[str, Any]:
+    """
+    Page through products by ID and write scores that are missing or changed
+
+    Cached copies of updated products are dropped after each page.
+
+    Returns:
+        Counters: products scanned, scores updated, rows/sec
+    """
+    def process(rows: List[Dict[str, Any]]) -> Dict[str, int]:
+        changes = score_rows(rows, recompute_all)
+        if changes:
+            update_rows("products", changes)
+            changed_ids = {change["id"] for change in changes}
+            forget_cached_products([row for row in rows if row["id"] in changed_ids])
+        return {"updated": len(changes)}
+
+    return run_batches(
+        "nutriscores",
+        lambda after_id, size: fetch_products(after_id, size, recompute_all),
+        process,
+        batch_size=batch_size
+    )
+
+
+def benchmark(rows: int, seed: int = 0) -> Dict[str, Any]:
+    """Time the scalar and the vectorized calculator on synthetic nutrition facts"""
+    rng = np.random.default_rng(seed)
+    columns = np.column_stack([
+        rng.uniform(0, 4000, rows),   # energy_kj
+        rng.uniform(0, 60, rows),     # sugars
+        rng.uniform(0, 15, rows),     # saturated_fat
+        rng.uniform(0, 1200, rows),   # sodium_mg
+        rng.uniform(0, 8, rows),      # fiber
+        rng.uniform(0, 12, rows),     # proteins
+    ])
+    facts = [
+        NutritionFacts(energy_kj=e, sugars=s, saturated_fat=f, sodium=na / 1000, fiber=fi, proteins=p)
+        for e, s, f, na, fi, p in columns.tolist()
+    ]
+
+    started = time.perf_counter()
+    for item in facts:
+        compute_nutriscore(item)
+    scalar_seconds = time.perf_counter() - started
+
+    started = time.perf_counter()
+    compute_nutriscores(facts_to_columns(facts))
+    batch_seconds = time.perf_counter() - started
+
+    started = time.perf_counter()
+    compute_nutriscores(columns)
+    array_seconds = time.perf_counter() - started
+
+    return {
+        "rows": rows,
+        "scalar_rows_per_second": round(rows / scalar_seconds),
+        "batch_rows_per_second": round(rows / batch_seconds),
+        "batch_from_arrays_rows_per_second": round(rows / array_seconds),
+    }
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="Compute Nutri-Scores for stored products")
+    parser.add_argument("--all", action="store_true", help="Recompute every product, replacing existing scores")
+    parser.add_argument("--batch-size", type=int, default=1000)
+    parser.add_argument("--benchmark", type=int, metavar="ROWS", help="Only time the calculator on synthetic rows")
+    args = parser.parse_args(argv)
+
+    if args.benchmark:
+        print(json.dumps(benchmark(args.benchmark)))
+        return
+    print(json.dumps(backfill_nutriscores(batch_size=args.batch_size, recompute_all=args.all)))
+
+
+if __name__ == "__main__":
+    main()
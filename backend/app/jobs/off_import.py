@@ -0,0 +1,460 @@
+"""
+Bulk import of Open Food Facts data dumps into the products table
+
+Streams a JSONL or tab-separated CSV export (optionally gzipped) one line at a
+time, maps each record with the same parser as live lookups and writes
+products in large batches. Progress is checkpointed after every batch so an
+interrupted import resumes where it stopped.
+
+Usage:
+    python -m app.jobs.off_import openfoodfacts-products.jsonl.gz
+    python -m app.jobs.off_import en.openfoodfacts.org.products.csv.gz --copy
+
+With --update-existing, stored products are overwritten except for the
+fields an admin corrected (products.corrected_fields), and their cached
+copies are dropped so the API serves the imported data.
+"""
+
+import argparse
+import asyncio
+import csv
+import gzip
+import io
+import json
+import os
+import sys
+import time
+from datetime import datetime, timezone
+from typing import Any, Callable, Dict, Iterator, List, Optional, TextIO, Tuple
+from app.core.config import settings
+from app.core.database import get_supabase_client
+from app.core.redis import close_redis_client
+from app.entities.product.barcode import normalize_barcode
+from app.entities.allergen.matcher import ALLERGEN_SOURCE_FIELDS, compute_allergen_mask
+from app.entities.product.cache import forget_missing, invalidate_products
+from app.entities.product.models import Product
+from app.external.openfoodfacts import OpenFoodFactsClient
+from app.features.allergen.service import reload_allergen_matcher
+
+FORMAT_JSONL = "jsonl"
+FORMAT_CSV = "csv"
+
+# Columns written by the COPY path, in staging table order
+COPY_COLUMNS = (
+    "barcode",
+    "barcode_normalized",
+    "name",
+    "brand",
+    "category",
+    "manufacturer",
+    "country_of_sale",
+    "ingredients_raw",
+    "ingredients_parsed",
+    "nutrition",
+    "allergens",
+    "allergen_mask",
+    "images",
+    "health_score",
+    "nutriscore_grade",
+    "source",
+    "last_fetched_at",
+)
+
+# Barcodes per request when reading the corrections of a batch, to keep the URL short
+CORRECTIONS_CHUNK_SIZE = 200
+
+_parser = OpenFoodFactsClient()
+
+
+def detect_format(path: str) -> str:
+    """Guess the dump format from its file name (.csv/.tsv vs JSONL)"""
+    name = path[:-3] if path.endswith(".gz") else path
+    return FORMAT_CSV if name.endswith((".csv", ".tsv")) else FORMAT_JSONL
+
+
+def open_dump(path: str) -> TextIO:
+    """Open a dump for streaming text reads, decompressing gzip on the fly"""
+    if path.endswith(".gz"):
+        return gzip.open(path, "rt", encoding="utf-8", newline="")
+    return open(path, "r", encoding="utf-8", newline="")
+
+
+def csv_row_to_off_product(row: Dict[str, str]) -> Dict[str, Any]:
+    """
+    Reshape a CSV export row into the API's product payload
+
+    The CSV export flattens nutriments into `<nutrient>_100g` columns; they
+    are gathered back into a `nutriments` dict so one parser handles both.
+    """
+    product: Dict[str, Any] = {key: value for key, value in row.items() if value}
+    nutriments = {
+        key: value for key, value in product.items()
+        if key.endswith("_100g")
+    }
+    if nutriments:
+        product["nutriments"] = nutriments
+    return product
+
+
+def iter_dump_records(stream: TextIO, dump_format: str) -> Iterator[Tuple[int, Dict[str, Any]]]:
+    """
+    Yield (line_number, raw product dict) pairs from an open dump
+
+    Lines that cannot be decoded are yielded as empty dicts so line numbers
+    stay aligned with the file for checkpointing.
+    """
+    if dump_format == FORMAT_CSV:
+        csv.field_size_limit(sys.maxsize)
+        reader = csv.DictReader(stream, delimiter="\t", quoting=csv.QUOTE_NONE)
+        for line_number, row in enumerate(reader, start=1):
+            yield line_number, csv_row_to_off_product(row)
+        return
+
+    for line_number, line in enumerate(stream, start=1):
+        try:
+            record = json.loads(line)
+        except json.JSONDecodeError:
+            record = {}
+        yield line_number, record if isinstance(record, dict) else {}
+
+
+def parse_dump_record(record: Dict[str, Any], fetched_at: datetime) -> Optional[Product]:
+    """Map one dump record to a Product, or None if it has no usable barcode"""
+    code = str(record.get("code") or "").strip()
+    if not code:
+        return None
+    try:
+        product = _parser._parse_off_product(record, code)
+    except (ValueError, TypeError, AttributeError):
+        return None
+    product.last_fetched_at = fetched_at
+    return product
+
+
+def load_checkpoint(path: str, source: str) -> int:
+    """Return the last imported line for this dump, or 0 to start over"""
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            checkpoint = json.load(f)
+    except (OSError, ValueError):
+        return 0
+    if checkpoint.get("source") != source:
+        return 0
+    return int(checkpoint.get("line", 0))
+
+
+def save_checkpoint(path: str, source: str, line: int, imported: int) -> None:
+    """Atomically record progress after a batch is written"""
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump({"source": source, "line": line, "imported": imported}, f)
+    os.replace(tmp_path, path)
+
+
+def keep_corrected_fields(products: List[Product], stored_rows: Dict[str, Dict[str, Any]]) -> None:
+    """
+    Put the stored values of admin-corrected fields back into imported products
+
+    Products are replaced in the list. stored_rows maps normalized barcodes to their current products rows.
+    The allergen mask is recomputed when a field it is derived from was
+    corrected, so it matches the merged product.
+    """
+    for index, product in enumerate(products):
+        row = stored_rows.get(product.barcode_normalized or normalize_barcode(product.barcode))
+        corrected = set(row.get("corrected_fields") or ()) if row else set()
+        if not row or not corrected:
+            continue
+        merged = Product(**{
+            **product.model_dump(mode="json"),
+            **{field: row.get(field) for field in corrected if field in Product.model_fields},
+            "corrected_fields": sorted(corrected),
+        })
+        if corrected & set(ALLERGEN_SOURCE_FIELDS):
+            merged.allergen_mask = compute_allergen_mask(merged)
+        products[index] = merged
+
+
+def load_corrected_rows(barcodes: List[str]) -> Dict[str, Dict[str, Any]]:
+    """Read the stored rows of the given barcodes that have admin corrections"""
+    rows: Dict[str, Dict[str, Any]] = {}
+    for i in range(0, len(barcodes), CORRECTIONS_CHUNK_SIZE):
+        response = (
+            get_supabase_client().table("products").select("*")
+            .in_("barcode_normalized", barcodes[i:i + CORRECTIONS_CHUNK_SIZE])
+            .not_.is_("corrected_fields", "null")
+            .execute()
+        )
+        rows.update((row["barcode_normalized"], row) for row in response.data or [] if row.get("corrected_fields"))
+    return rows
+
+
+def upsert_products(products: List[Product], update_existing: bool = False) -> List[Dict[str, Any]]:
+    """
+    Write a batch through the Supabase REST API as one upsert
+
+    Returns the written rows' id and barcode. When updating existing rows,
+    corrected fields are written back with their stored values.
+    """
+    if update_existing:
+        keep_corrected_fields(products, load_corrected_rows([
+            product.barcode_normalized or normalize_barcode(product.barcode) for product in products
+        ]))
+    response = get_supabase_client().table("products").upsert(
+        [product.model_dump(mode="json", exclude_none=True) for product in products],
+        on_conflict="barcode_normalized",
+        ignore_duplicates=not update_existing,
+        default_to_null=False
+    ).execute()
+    return [{"id": row["id"], "barcode": row["barcode"]} for row in response.data or []]
+
+
+async def _clear_imported(barcodes: List[str], updated: List[Dict[str, Any]]) -> None:
+    try:
+        await forget_missing(*barcodes)
+        await invalidate_products(
+            product_ids=[row["id"] for row in updated],
+            barcodes=[row["barcode"] for row in updated]
+        )
+    finally:
+        # The async client is bound to this event loop; the next batch runs in a new one
+        await close_redis_client()
+
+
+def forget_imported(products: List[Product], updated: Optional[List[Dict[str, Any]]] = None) -> None:
+    """
+    Clear the negative-cache entries of imported barcodes (one Redis DEL per batch)
+
+    Lookups read the DB first, so imported products are served either way;
+    this also resets the miss backoff of barcodes OFF once reported unknown.
+    Rows overwritten by --update-existing (id and barcode) are dropped from
+    the product cache on every worker.
+    """
+    asyncio.run(_clear_imported([
+        product.barcode_normalized or normalize_barcode(product.barcode) for product in products
+    ], updated or []))
+
+
+class CopyWriter:
+    """
+    Write batches with COPY into a staging table over a direct connection
+
+    Each batch is copied into a temporary table and merged into products
+    with one INSERT ... ON CONFLICT, which is much faster than REST upserts
+    for millions of rows. When updating existing rows, columns listed in a
+    row's corrected_fields keep their stored value. Requires DATABASE_URL.
+    """
+
+    def __init__(self, dsn: str, update_existing: bool = False):
+        import psycopg2
+
+        self.connection = psycopg2.connect(dsn)
+        self.update_existing = update_existing
+        with self.connection.cursor() as cursor:
+            cursor.execute(
+                "CREATE TEMP TABLE products_import "
+                "(LIKE products INCLUDING DEFAULTS) ON COMMIT DELETE ROWS"
+            )
+        self.connection.commit()
+
+    def __call__(self, products: List[Product]) -> List[Dict[str, Any]]:
+        """Write a batch; returns the id and barcode of every inserted or updated row"""
+        if self.update_existing:
+            keep_corrected_fields(products, self._corrected_rows(products))
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        for product in products:
+            writer.writerow(self._copy_row(product))
+        buffer.seek(0)
+
+        columns = ", ".join(COPY_COLUMNS)
+        if self.update_existing:
+            # Re-checked in SQL so a correction approved during the import is kept
+            updates = ", ".join(
+                f"{column} = CASE WHEN products.corrected_fields @> ARRAY['{column}'] "
+                f"THEN products.{column} ELSE EXCLUDED.{column} END"
+                for column in COPY_COLUMNS if column not in ("barcode", "barcode_normalized")
+            )
+            on_conflict = f"DO UPDATE SET {updates}"
+        else:
+            on_conflict = "DO NOTHING"
+
+        try:
+            with self.connection.cursor() as cursor:
+                cursor.copy_expert(
+                    f"COPY products_import ({columns}) FROM STDIN WITH (FORMAT csv, NULL '\\N')",
+                    buffer
+                )
+                cursor.execute(
+                    f"INSERT INTO products ({columns}) SELECT {columns} FROM products_import "
+                    f"ON CONFLICT (barcode_normalized) {on_conflict} RETURNING id, barcode"
+                )
+                written = [{"id": str(row_id), "barcode": barcode} for row_id, barcode in cursor.fetchall()]
+            self.connection.commit()
+        except Exception:
+            self.connection.rollback()
+            raise
+        return written
+
+    def _corrected_rows(self, products: List[Product]) -> Dict[str, Dict[str, Any]]:
+        barcodes = [product.barcode_normalized or normalize_barcode(product.barcode) for product in products]
+        with self.connection.cursor() as cursor:
+            cursor.execute(
+                "SELECT to_jsonb(products) FROM products "
+                "WHERE barcode_normalized = ANY(%s) AND cardinality(corrected_fields) > 0",
+                (barcodes,)
+            )
+            return {row["barcode_normalized"]: row for (row,) in cursor.fetchall()}
+
+    def close(self) -> None:
+        self.connection.close()
+
+    @staticmethod
+    def _copy_row(product: Product) -> List[str]:
+        data = product.model_dump(mode="json")
+        row = []
+        for column in COPY_COLUMNS:
+            value = data.get(column)
+            if value is None:
+                row.append("\\N")
+            elif column in ("allergens", "images"):
+                row.append(_pg_text_array(value))
+            elif column in ("ingredients_parsed", "nutrition"):
+                row.append(json.dumps(value))
+            else:
+                row.append(str(value))
+        return row
+
+
+def _pg_text_array(values: List[str]) -> str:
+    """Format a list as a Postgres TEXT[] literal"""
+    quoted = (
+        '"' + value.replace("\\", "\\\\").replace('"', '\\"') + '"'
+        for value in values
+    )
+    return "{" + ",".join(quoted) + "}"
+
+
+def import_dump(
+    path: str,
+    write_batch: Callable[[List[Product]], None],
+    batch_size: Optional[int] = None,
+    checkpoint_path: Optional[str] = None,
+    dump_format: Optional[str] = None,
+    limit: Optional[int] = None,
+) -> Dict[str, Any]:
+    """
+    Stream a dump into the products table
+
+    Memory use is bounded by one batch. Records sharing a normalized barcode
+    within a batch are collapsed to the last one, since a single upsert
+    cannot touch the same row twice.
+
+    Args:
+        path: JSONL or CSV dump, optionally gzipped
+        write_batch: Called with each batch of products (REST upsert or COPY)
+        batch_size: Products per write (defaults to OFF_IMPORT_BATCH_SIZE)
+        checkpoint_path: Progress file; an existing one for the same dump is resumed
+        dump_format: "jsonl" or "csv" (guessed from the file name by default)
+        limit: Stop after this many input lines (for trial runs)
+
+    Returns:
+        Counters: lines read, products imported, records skipped, rows/sec
+    """
+    batch_size = batch_size or settings.OFF_IMPORT_BATCH_SIZE
+    dump_format = dump_format or detect_format(path)
+    source = os.path.abspath(path)
+    resume_from = load_checkpoint(checkpoint_path, source) if checkpoint_path else 0
+    fetched_at = datetime.now(timezone.utc)
+
+    imported = 0
+    skipped = 0
+    last_line = resume_from
+    batch: Dict[str, Product] = {}
+    started = time.monotonic()
+
+    def flush(line: int) -> None:
+        nonlocal imported
+        if batch:
+            write_batch(list(batch.values()))
+            imported += len(batch)
+            batch.clear()
+        if checkpoint_path:
+            save_checkpoint(checkpoint_path, source, line, imported)
+        elapsed = time.monotonic() - started
+        print(f"off_import: line {line}, {imported} products ({imported / elapsed if elapsed else 0:.0f} rows/s)")
+
+    with open_dump(path) as stream:
+        for line_number, record in iter_dump_records(stream, dump_format):
+            if line_number <= resume_from:
+                continue
+            if limit and line_number > resume_from + limit:
+                break
+            last_line = line_number
+
+            product = parse_dump_record(record, fetched_at)
+            if product is None:
+                skipped += 1
+                continue
+            batch[product.barcode_normalized or normalize_barcode(product.barcode)] = product
+
+            if len(batch) >= batch_size:
+                flush(line_number)
+
+    if last_line > resume_from:
+        flush(last_line)
+
+    elapsed = time.monotonic() - started
+    return {
+        "lines": last_line - resume_from,
+        "resumed_from": resume_from,
+        "imported": imported,
+        "skipped": skipped,
+        "seconds": round(elapsed, 2),
+        "rows_per_second": round(imported / elapsed, 1) if elapsed else 0.0,
+    }
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="Import an Open Food Facts dump into products")
+    parser.add_argument("dump", help="Path to the JSONL or CSV export (.gz supported)")
+    parser.add_argument("--format", choices=[FORMAT_JSONL, FORMAT_CSV], help="Override format detection")
+    parser.add_argument("--batch-size", type=int, default=settings.OFF_IMPORT_BATCH_SIZE)
+    parser.add_argument("--checkpoint", help="Progress file (default: <dump>.checkpoint)")
+    parser.add_argument("--copy", action="store_true", help="Use COPY over DATABASE_URL instead of REST upserts")
+    parser.add_argument("--update-existing", action="store_true", help="Overwrite products already in the table, except admin-corrected fields")
+    parser.add_argument("--limit", type=int, help="Stop after this many input lines")
+    args = parser.parse_args(argv)
+
+    if args.copy and not settings.DATABASE_URL:
+        parser.error("--copy requires DATABASE_URL")
+
+    # Compute allergen masks with the same aliases the API uses
+    asyncio.run(reload_allergen_matcher(force=True))
+
+    copy_writer = CopyWriter(settings.DATABASE_URL, update_existing=args.update_existing) if args.copy else None
+
+    def write_batch(products: List[Product]) -> None:
+        if copy_writer is not None:
+            written = copy_writer(products)
+        else:
+            written = upsert_products(products, update_existing=args.update_existing)
+        # Only overwritten rows can have cached copies
+        forget_imported(products, written if args.update_existing else None)
+
+    try:
+        result = import_dump(
+            args.dump,
+            write_batch,
+            batch_size=args.batch_size,
+            checkpoint_path=args.checkpoint or f"{args.dump}.checkpoint",
+            dump_format=args.format,
+            limit=args.limit,
+        )
+    finally:
+        if copy_writer is not None:
+            copy_writer.close()
+    print(json.dumps(result))
+
+
+if __name__ == "__main__":
+    main()
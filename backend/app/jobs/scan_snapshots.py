@@ -0,0 +1,70 @@
+"""
+Move inline scans.result_snapshot copies into the shared scan_snapshots table
+
+Pages through scans that still hold an inline snapshot, in ID order. Each
+chunk stores its distinct snapshots once, then points the scans at them and
+clears the inline copy with one update per distinct snapshot. Converted rows drop out of the
+idx_scans_inline_snapshot index, so an interrupted run resumes by rerunning.
+
+Usage:
+    python -m app.jobs.scan_snapshots
+    python -m app.jobs.scan_snapshots --batch-size 500 --pause 0.5
+"""
+
+import argparse
+import asyncio
+import json
+from typing import Any, Dict, List, Optional
+from app.core.database import get_supabase_client
+from app.features.scan.snapshots import reference_snapshots
+from app.jobs.batches import fetch_page, run_batches, update_rows
+
+
+def fetch_scans(after_id: Optional[str], batch_size: int) -> List[Dict[str, Any]]:
+    """Read the next chunk of scans with an inline snapshot, in ID order"""
+    query = (
+        get_supabase_client().table("scans").select("id, result_snapshot")
+        .not_.is_("result_snapshot", "null")
+    )
+    return fetch_page(query, after_id, batch_size)
+
+
+def migrate_chunk(rows: List[Dict[str, Any]]) -> Dict[str, int]:
+    """
+    Convert one chunk of scans
+
+    Returns:
+        Counters: distinct snapshots in the chunk
+    """
+    referenced = asyncio.run(reference_snapshots(rows))
+    update_rows("scans", [
+        {"id": row["id"], "snapshot_hash": row["snapshot_hash"], "result_snapshot": None}
+        for row in referenced
+    ])
+    return {"snapshots": len({row["snapshot_hash"] for row in referenced})}
+
+
+def migrate_scan_snapshots(batch_size: int = 1000, pause: float = 0.0) -> Dict[str, Any]:
+    """
+    Page through scans by ID and move inline snapshots to scan_snapshots
+
+    Args:
+        batch_size: Scans per chunk
+        pause: Seconds to sleep between chunks, to limit load on the database
+
+    Returns:
+        Counters: scans converted, distinct snapshots per chunk summed, rows/sec
+    """
+    return run_batches("scan_snapshots", fetch_scans, migrate_chunk, batch_size=batch_size, pause=pause)
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="Deduplicate inline scan snapshots into scan_snapshots")
+    parser.add_argument("--batch-size", type=int, default=1000)
+    parser.add_argument("--pause", type=float, default=0.0, help="Seconds to sleep between chunks")
+    args = parser.parse_args(argv)
+    print(json.dumps(migrate_scan_snapshots(batch_size=args.batch_size, pause=args.pause)))
+
+
+if __name__ == "__main__":
+    main()
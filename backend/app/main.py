@@ -1,9 +1,45 @@
 """FastAPI application entry point"""
 
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from app.core.config import settings
+from app.core.auth import token_cache_stats
+from app.core.database import shutdown_db_executor
+from app.core.redis import close_redis_client
+from app.external.openfoodfacts import init_off_http_client, close_off_http_client
 from app.api.v1.router import api_router
+from app.shared.cache import cache_invalidations
+from app.entities.product.cache import product_cache, negative_cache
+from app.features.product.service import product_fetches, product_writer
+from app.features.product.refresh import product_refresher
+from app.features.product.alternatives import nutrition_index_sync
+from app.features.allergen.service import allergen_matcher_stats
+from app.features.user.cache import user_meta_cache
+from app.features.favorites.cache import favorite_ids_cache
+from app.features.search.service import search_cache
+from app.features.scan.recorder import scan_recorder_stats, scan_writer
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Manage shared resources for the lifetime of the application"""
+    await init_off_http_client()
+    product_writer.start()
+    scan_writer.start()
+    product_refresher.start()
+    nutrition_index_sync.start()
+    cache_invalidations.start()
+    yield
+    await cache_invalidations.stop()
+    await nutrition_index_sync.stop()
+    await product_refresher.stop()
+    await product_writer.stop()
+    await scan_writer.stop()
+    await close_off_http_client()
+    await close_redis_client()
+    shutdown_db_executor()
+
 
 app = FastAPI(
     title="BiteCheck API",
@@ -11,6 +47,7 @@ app = FastAPI(
     version="1.0.0",
     docs_url="/docs",
     redoc_url="/redoc",
+    lifespan=lifespan,
 )
 
 # CORS middleware
@@ -44,3 +81,22 @@ async def health_check():
         "service": "bitecheck-api"
     }
 
+
+@app.get("/health/stats")
+async def health_stats():
+    """Cache and background worker counters for monitoring"""
+    return {
+        "product_cache": product_cache.stats(),
+        "negative_cache": negative_cache.stats(),
+        "product_fetches": product_fetches.stats(),
+        "product_writer": product_writer.stats(),
+        "scan_writer": scan_recorder_stats(),
+        "product_refresher": product_refresher.stats(),
+        "nutrition_index": nutrition_index_sync.stats(),
+        "allergen_matcher": allergen_matcher_stats(),
+        "user_meta_cache": user_meta_cache.stats(),
+        "favorite_ids_cache": favorite_ids_cache.stats(),
+        "search_cache": search_cache.stats(),
+        "cache_invalidations": cache_invalidations.stats(),
+        "auth_tokens": token_cache_stats(),
+    }
@@ -2,7 +2,7 @@
 
 from typing import Optional, Dict, Any
 from uuid import UUID
-from app.core.database import get_supabase_client
+from app.core.database import get_supabase_client, execute_query
 
 
 async def log_admin_action(
@@ -39,7 +39,7 @@ async def log_admin_action(
     }
     
     try:
-        supabase.table("admin_audit").insert(audit_data).execute()
+        await execute_query(supabase.table("admin_audit").insert(audit_data))
     except Exception as e:
         # Log the error but don't fail the main operation
         print(f"Failed to log audit entry: {e}")
@@ -0,0 +1,161 @@
+"""Background batch writer for write-behind persistence"""
+
+import asyncio
+import time
+from typing import Any, Awaitable, Callable, Dict, Generic, List, Optional, Tuple, TypeVar
+
+T = TypeVar("T")
+
+_STOP = object()
+
+
+class BatchWriter(Generic[T]):
+    """
+    Buffer items in a bounded queue and persist them in batches
+
+    A background task flushes whenever max_batch_size items are waiting or
+    flush_interval seconds have passed since the first item of the batch.
+    Failed flushes are retried with exponential backoff; batches that still
+    fail are handed to on_failure. stop() drains everything still queued.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        flush: Callable[[List[T]], Awaitable[None]],
+        max_batch_size: int = 100,
+        flush_interval: float = 0.5,
+        max_queue_size: int = 5000,
+        max_retries: int = 5,
+        retry_backoff: float = 0.5,
+        on_failure: Optional[Callable[[List[T]], Awaitable[None]]] = None,
+    ):
+        self.name = name
+        self._flush = flush
+        self.max_batch_size = max_batch_size
+        self.flush_interval = flush_interval
+        self.max_queue_size = max_queue_size
+        self.max_retries = max_retries
+        self.retry_backoff = retry_backoff
+        self._on_failure = on_failure
+        # Replaced on every start() so each run gets a queue on its own loop
+        self._queue: asyncio.Queue = asyncio.Queue(maxsize=max_queue_size)
+        self._task: Optional[asyncio.Task] = None
+        self.submitted = 0
+        self.rejected = 0
+        self.flushed = 0
+        self.retries = 0
+        self.failed = 0
+        self.last_flush_seconds = 0.0
+        self.last_write_delay_seconds = 0.0
+
+    @property
+    def is_running(self) -> bool:
+        return self._task is not None and not self._task.done()
+
+    def start(self) -> None:
+        """Start the background flush task (called from the app lifespan)"""
+        if self.is_running:
+            return
+        self._queue = asyncio.Queue(maxsize=self.max_queue_size)
+        self._task = asyncio.create_task(self._run(), name=self.name)
+
+    async def stop(self) -> None:
+        """Flush everything still queued and stop the background task"""
+        task = self._task
+        if task is None or task.done():
+            return
+        await self._queue.put(_STOP)
+        await task
+        self._task = None
+
+    def submit(self, item: T) -> bool:
+        """
+        Queue an item without waiting
+
+        Returns False when the writer is not running or the queue is full, so
+        the caller can fall back to writing synchronously.
+        """
+        if not self.is_running:
+            return False
+        try:
+            self._queue.put_nowait((time.monotonic(), item))
+        except asyncio.QueueFull:
+            self.rejected += 1
+            return False
+        self.submitted += 1
+        return True
+
+    async def _run(self) -> None:
+        stopping = False
+        while not stopping:
+            batch, stopping = await self._next_batch()
+            if batch:
+                await self._flush_with_retry(batch)
+        # Drain whatever was queued behind the stop marker
+        while not self._queue.empty():
+            batch = []
+            while len(batch) < self.max_batch_size and not self._queue.empty():
+                entry = self._queue.get_nowait()
+                if entry is not _STOP:
+                    batch.append(entry)
+            if batch:
+                await self._flush_with_retry(batch)
+
+    async def _next_batch(self) -> Tuple[List[Tuple[float, T]], bool]:
+        entry = await self._queue.get()
+        if entry is _STOP:
+            return [], True
+
+        batch = [entry]
+        deadline = time.monotonic() + self.flush_interval
+        while len(batch) < self.max_batch_size:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                entry = await asyncio.wait_for(self._queue.get(), remaining)
+            except asyncio.TimeoutError:
+                break
+            if entry is _STOP:
+                return batch, True
+            batch.append(entry)
+        return batch, False
+
+    async def _flush_with_retry(self, batch: List[Tuple[float, T]]) -> None:
+        items = [item for _, item in batch]
+        for attempt in range(self.max_retries + 1):
+            started = time.monotonic()
+            try:
+                await self._flush(items)
+            except Exception as e:
+                if attempt == self.max_retries:
+                    self.failed += len(items)
+                    print(f"{self.name}: dropping batch of {len(items)} after {attempt + 1} attempts: {e}")
+                    if self._on_failure:
+                        await self._on_failure(items)
+                    return
+                self.retries += 1
+                print(f"{self.name}: flush failed, retrying: {e}")
+                await asyncio.sleep(self.retry_backoff * 2 ** attempt)
+                continue
+
+            finished = time.monotonic()
+            self.flushed += len(items)
+            self.last_flush_seconds = finished - started
+            self.last_write_delay_seconds = finished - batch[0][0]
+            return
+
+    def stats(self) -> Dict[str, Any]:
+        """Queue depth, throughput and latency counters for monitoring"""
+        return {
+            "running": self.is_running,
+            "queue_depth": self._queue.qsize(),
+            "submitted": self.submitted,
+            "rejected": self.rejected,
+            "flushed": self.flushed,
+            "retries": self.retries,
+            "failed": self.failed,
+            "last_flush_ms": round(self.last_flush_seconds * 1000, 2),
+            "last_write_delay_ms": round(self.last_write_delay_seconds * 1000, 2),
+        }
@@ -0,0 +1,336 @@
+"""In-process LRU and two-tier (LRU + Redis) caching utilities"""
+
+import asyncio
+import json
+import time
+from collections import OrderedDict
+from itertools import count
+from typing import Any, Callable, Dict, Hashable, Optional, Tuple
+from app.core.config import settings
+from app.core.redis import get_redis_client, mark_redis_unavailable
+
+
+class LRUCache:
+    """
+    Bounded in-process LRU cache with per-entry expiry
+
+    Values are returned as stored; callers that hand cached objects to code
+    that may mutate them should store immutable or copyable data.
+    """
+
+    def __init__(self, maxsize: int, ttl: Optional[float] = None):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data: "OrderedDict[Hashable, tuple]" = OrderedDict()
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        """Return the cached value or None if missing or expired"""
+        entry = self._data.get(key)
+        if entry is None:
+            return None
+        expires_at, value = entry
+        if expires_at is not None and expires_at <= time.monotonic():
+            del self._data[key]
+            return None
+        self._data.move_to_end(key)
+        return value
+
+    def set(self, key: Hashable, value: Any, ttl: Optional[float] = None) -> None:
+        """Store a value, evicting the least recently used entry when full"""
+        ttl = self.ttl if ttl is None else ttl
+        expires_at = time.monotonic() + ttl if ttl is not None else None
+        self._data[key] = (expires_at, value)
+        self._data.move_to_end(key)
+        while len(self._data) > self.maxsize:
+            self._data.popitem(last=False)
+
+    def delete(self, key: Hashable) -> None:
+        """Remove a key if present"""
+        self._data.pop(key, None)
+
+    def clear(self) -> None:
+        """Remove all entries"""
+        self._data.clear()
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def __contains__(self, key: Hashable) -> bool:
+        return self.get(key) is not None
+
+
+# Sets a value only while the key's version counter still holds the value
+# read before loading it (an empty string if the counter did not exist)
+_SET_IF_VERSION = """
+if (redis.call('GET', KEYS[2]) or '') == ARGV[1] then
+    redis.call('SET', KEYS[1], ARGV[2], 'EX', ARGV[3])
+    return 1
+end
+return 0
+"""
+
+# Token returned by TwoTierCache.version(): (local version, Redis version or
+# None if Redis could not be read)
+CacheVersion = Tuple[int, Optional[str]]
+
+
+class TwoTierCache:
+    """
+    Read-through cache with an in-process LRU (L1) in front of Redis (L2)
+
+    L1 absorbs repeated lookups inside a worker; L2 is shared by all workers.
+    Values must be JSON-serializable. When Redis is disabled or unreachable
+    the cache transparently degrades to L1 only.
+
+    With broadcast_invalidations, delete() also publishes the keys so every
+    worker drops its L1 copy (see CacheInvalidationListener).
+
+    Values loaded from a database can be stored with version() and
+    set_if_unchanged(): every delete() bumps a per-key version, so a value
+    read before a concurrent write and its invalidation is never cached.
+    """
+
+    def __init__(
+        self,
+        namespace: str,
+        maxsize: int,
+        l1_ttl: float,
+        l2_ttl: float,
+        serialize: Callable[[Any], str] = json.dumps,
+        deserialize: Callable[[str], Any] = json.loads,
+        broadcast_invalidations: bool = False,
+    ):
+        self.namespace = namespace
+        self.l1 = LRUCache(maxsize=maxsize, ttl=l1_ttl)
+        self.l2_ttl = l2_ttl
+        self._serialize = serialize
+        self._deserialize = deserialize
+        self.broadcast_invalidations = broadcast_invalidations
+        # Per-key delete counters of this worker, drawn from one increasing
+        # sequence so an evicted counter never comes back with an old value
+        self._versions = LRUCache(maxsize=maxsize)
+        self._version_sequence = count(1)
+        self.l1_hits = 0
+        self.l2_hits = 0
+        self.misses = 0
+        if broadcast_invalidations:
+            cache_invalidations.register(self)
+
+    def _redis_key(self, key: str) -> str:
+        return f"bitecheck:{self.namespace}:{key}"
+
+    def _redis_version_key(self, key: str) -> str:
+        return f"bitecheck:{self.namespace}:version:{key}"
+
+    @property
+    def invalidation_channel(self) -> str:
+        return f"bitecheck:invalidate:{self.namespace}"
+
+    async def get(self, key: str) -> Optional[Any]:
+        """Return the cached value from L1, then L2, or None on a miss"""
+        value = self.l1.get(key)
+        if value is not None:
+            self.l1_hits += 1
+            return value
+
+        redis = get_redis_client()
+        if redis is not None:
+            try:
+                raw = await redis.get(self._redis_key(key))
+            except Exception as e:
+                mark_redis_unavailable(e)
+                raw = None
+            if raw is not None:
+                value = self._deserialize(raw)
+                self.l1.set(key, value)
+                self.l2_hits += 1
+                return value
+
+        self.misses += 1
+        return None
+
+    async def set(self, key: str, value: Any, ttl: Optional[float] = None) -> None:
+        """Store a value in both tiers; ttl overrides the tier defaults"""
+        self.l1.set(key, value, ttl=ttl)
+
+        redis = get_redis_client()
+        if redis is None:
+            return
+        try:
+            await redis.set(
+                self._redis_key(key),
+                self._serialize(value),
+                ex=max(1, int(ttl if ttl is not None else self.l2_ttl)),
+            )
+        except Exception as e:
+            mark_redis_unavailable(e)
+
+    async def version(self, key: str) -> CacheVersion:
+        """Read a key's version; call before loading the value to cache"""
+        local = self._versions.get(key) or 0
+        redis = get_redis_client()
+        if redis is None:
+            return local, None
+        try:
+            return local, await redis.get(self._redis_version_key(key)) or ""
+        except Exception as e:
+            mark_redis_unavailable(e)
+            return local, None
+
+    async def set_if_unchanged(self, key: str, value: Any, version: CacheVersion) -> bool:
+        """
+        Store a value unless the key was deleted since version() was read
+
+        Returns False (and caches nothing) if it was, or if Redis is up but
+        could not be read when the version was taken.
+        """
+        local, remote = version
+        if (self._versions.get(key) or 0) != local:
+            return False
+
+        redis = get_redis_client()
+        if redis is not None:
+            if remote is None:
+                return False
+            try:
+                stored = await redis.eval(
+                    _SET_IF_VERSION,
+                    2,
+                    self._redis_key(key),
+                    self._redis_version_key(key),
+                    remote,
+                    self._serialize(value),
+                    max(1, int(self.l2_ttl)),
+                )
+            except Exception as e:
+                mark_redis_unavailable(e)
+                stored = 1
+            if not stored:
+                return False
+
+        # A local delete may have run while Redis was being updated
+        if (self._versions.get(key) or 0) != local:
+            return False
+        self.l1.set(key, value)
+        return True
+
+    def forget_local(self, key: str) -> None:
+        """Drop a key from L1 and bump its local version"""
+        self.l1.delete(key)
+        self._versions.set(key, next(self._version_sequence))
+
+    async def delete(self, *keys: str) -> None:
+        """Invalidate keys in both tiers"""
+        for key in keys:
+            self.forget_local(key)
+
+        redis = get_redis_client()
+        if redis is None or not keys:
+            return
+        try:
+            await redis.delete(*[self._redis_key(key) for key in keys])
+            for key in keys:
+                version_key = self._redis_version_key(key)
+                await redis.incr(version_key)
+                await redis.expire(version_key, max(1, int(self.l2_ttl)))
+            if self.broadcast_invalidations:
+                await redis.publish(self.invalidation_channel, json.dumps(list(keys)))
+        except Exception as e:
+            mark_redis_unavailable(e)
+
+    def stats(self) -> Dict[str, Any]:
+        """Hit and miss counters for monitoring"""
+        lookups = self.l1_hits + self.l2_hits + self.misses
+        return {
+            "l1_size": len(self.l1),
+            "l1_hits": self.l1_hits,
+            "l2_hits": self.l2_hits,
+            "misses": self.misses,
+            "hit_rate": round((self.l1_hits + self.l2_hits) / lookups, 4) if lookups else 0.0,
+        }
+
+
+class CacheInvalidationListener:
+    """
+    Drop L1 entries invalidated by other workers
+
+    Subscribes to the invalidation channel of every TwoTierCache created with
+    broadcast_invalidations. Whenever the subscription is (re)established the
+    registered L1 tiers are cleared, since messages may have been missed.
+    """
+
+    def __init__(self):
+        self._caches: Dict[str, TwoTierCache] = {}
+        self._task: Optional[asyncio.Task] = None
+        self.received = 0
+
+    def register(self, cache: TwoTierCache) -> None:
+        self._caches[cache.invalidation_channel] = cache
+
+    @property
+    def is_running(self) -> bool:
+        return self._task is not None and not self._task.done()
+
+    def start(self) -> None:
+        """Start listening (called from the app lifespan)"""
+        if self.is_running or not self._caches:
+            return
+        self._task = asyncio.create_task(self._run(), name="cache-invalidations")
+
+    async def stop(self) -> None:
+        """Stop listening"""
+        task = self._task
+        if task is None or task.done():
+            return
+        task.cancel()
+        try:
+            await task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+
+    def handle(self, channel: str, data: str) -> None:
+        """Apply one invalidation message"""
+        cache = self._caches.get(channel)
+        if cache is None:
+            return
+        for key in json.loads(data):
+            cache.forget_local(key)
+        self.received += 1
+
+    async def _run(self) -> None:
+        while True:
+            redis = get_redis_client()
+            if redis is None:
+                await asyncio.sleep(settings.REDIS_RETRY_SECONDS)
+                continue
+            pubsub = redis.pubsub()
+            try:
+                await pubsub.subscribe(*self._caches)
+                for cache in self._caches.values():
+                    cache.l1.clear()
+                while True:
+                    message = await pubsub.get_message(ignore_subscribe_messages=True, timeout=1.0)
+                    if message and message["type"] == "message":
+                        self.handle(message["channel"], message["data"])
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                mark_redis_unavailable(e)
+            finally:
+                try:
+                    await pubsub.close()
+                except Exception:
+                    pass
+
+    def stats(self) -> Dict[str, Any]:
+        """Subscription state and message counter for monitoring"""
+        return {
+            "running": self.is_running,
+            "channels": len(self._caches),
+            "received": self.received,
+        }
+
+
+# Shared by every broadcasting cache; started from the application lifespan
+cache_invalidations = CacheInvalidationListener()
@@ -0,0 +1,67 @@
+"""Opaque cursors for keyset (seek) pagination"""
+
+import base64
+import json
+from datetime import datetime
+from typing import Any, List, Sequence, Tuple
+from uuid import UUID
+
+
+def encode_cursor(values: Sequence[Any]) -> str:
+    """Encode the sort key of the last row on a page"""
+    raw = json.dumps(list(values), separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str, size: int) -> List[Any]:
+    """
+    Decode a cursor from encode_cursor() holding `size` values
+    
+    Raises:
+        ValueError: If the cursor is malformed
+    """
+    try:
+        values = json.loads(base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)))
+    except ValueError as e:
+        raise ValueError("Invalid cursor") from e
+    if not isinstance(values, list) or len(values) != size:
+        raise ValueError("Invalid cursor")
+    return values
+
+
+def decode_timestamp_cursor(cursor: str) -> Tuple[str, str]:
+    """
+    Decode a (timestamp, id) cursor into values safe to put in a filter
+    
+    Cursors come from clients, so the timestamp must parse as an ISO
+    datetime and the ID as a UUID before keyset_after_desc() quotes them
+    into a PostgREST filter.
+    
+    Raises:
+        ValueError: If the cursor is malformed
+    """
+    timestamp, row_id = decode_cursor(cursor, 2)
+    if not isinstance(timestamp, str) or not isinstance(row_id, str):
+        raise ValueError("Invalid cursor")
+    try:
+        return datetime.fromisoformat(timestamp).isoformat(), str(UUID(row_id))
+    except ValueError as e:
+        raise ValueError("Invalid cursor") from e
+
+
+def keyset_after_desc(column: str, value: Any, row_id: Any) -> str:
+    """
+    PostgREST or() filter for rows after (value, id) in descending order
+    
+    Pair with .order(column, desc=True).order("id", desc=True).
+    """
+    return f'{column}.lt."{value}",and({column}.eq."{value}",id.lt.{row_id})'
+
+
+def keyset_after_asc(column: str, value: Any, row_id: Any) -> str:
+    """
+    PostgREST or() filter for rows after (value, id) in ascending order
+    
+    Pair with .order(column).order("id").
+    """
+    return f'{column}.gt."{value}",and({column}.eq."{value}",id.gt.{row_id})'
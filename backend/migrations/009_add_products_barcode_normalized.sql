@@ -0,0 +1,92 @@
+-- Migration: Add normalized barcode column to products
+-- Description: Canonical GTIN lookup key so UPC-A, EAN-13 and GTIN-14 forms of one product share a single row
+
+-- Canonicalize a barcode (mirrors app/entities/product/barcode.py normalize_barcode)
+CREATE OR REPLACE FUNCTION normalize_barcode(code TEXT)
+RETURNS TEXT AS $$
+DECLARE
+    digits TEXT := regexp_replace(btrim(code), '[\s-]', '', 'g');
+    padded TEXT;
+    total INT := 0;
+BEGIN
+    IF digits !~ '^[0-9]+$' OR length(digits) NOT IN (8, 12, 13, 14) THEN
+        RETURN btrim(code);
+    END IF;
+
+    padded := lpad(digits, 14, '0');
+
+    -- GS1 check digit: weights 3, 1, 3, ... from the rightmost data digit
+    FOR i IN 1..13 LOOP
+        total := total + substr(padded, i, 1)::INT * CASE WHEN i % 2 = 1 THEN 3 ELSE 1 END;
+    END LOOP;
+    IF (10 - total % 10) % 10 <> substr(padded, 14, 1)::INT THEN
+        RETURN btrim(code);
+    END IF;
+
+    IF left(padded, 6) = '000000' THEN
+        RETURN right(padded, 8);
+    END IF;
+    IF left(padded, 1) = '0' THEN
+        RETURN right(padded, 13);
+    END IF;
+    RETURN padded;
+END;
+$$ LANGUAGE plpgsql IMMUTABLE SET search_path = '';
+
+-- Add column and backfill existing rows
+ALTER TABLE products ADD COLUMN IF NOT EXISTS barcode_normalized TEXT;
+
+UPDATE products SET barcode_normalized = normalize_barcode(barcode)
+WHERE barcode_normalized IS DISTINCT FROM normalize_barcode(barcode);
+
+-- Merge rows that share a normalized barcode into the oldest one
+CREATE TEMP TABLE product_duplicates AS
+SELECT id, keep_id FROM (
+    SELECT
+        id,
+        FIRST_VALUE(id) OVER (PARTITION BY barcode_normalized ORDER BY created_at, id) AS keep_id
+    FROM products
+) ranked
+WHERE id <> keep_id;
+
+UPDATE scans s SET product_id = d.keep_id
+FROM product_duplicates d WHERE s.product_id = d.id;
+
+UPDATE corrections c SET product_id = d.keep_id
+FROM product_duplicates d WHERE c.product_id = d.id;
+
+-- Drop favorites that would collide with one the user already has on the kept row
+DELETE FROM favorites f
+USING product_duplicates d
+WHERE f.product_id = d.id
+  AND EXISTS (
+      SELECT 1 FROM favorites k WHERE k.user_id = f.user_id AND k.product_id = d.keep_id
+  );
+
+UPDATE favorites f SET product_id = d.keep_id
+FROM product_duplicates d WHERE f.product_id = d.id;
+
+DELETE FROM products p USING product_duplicates d WHERE p.id = d.id;
+
+DROP TABLE product_duplicates;
+
+-- Unique index used by lookups and as the upsert conflict target
+CREATE UNIQUE INDEX IF NOT EXISTS idx_products_barcode_normalized ON products(barcode_normalized);
+
+-- Keep the column in sync for every writer
+CREATE OR REPLACE FUNCTION set_barcode_normalized()
+RETURNS TRIGGER AS $$
+BEGIN
+    NEW.barcode_normalized = public.normalize_barcode(NEW.barcode);
+    RETURN NEW;
+END;
+$$ LANGUAGE plpgsql SET search_path = '';
+
+DROP TRIGGER IF EXISTS set_products_barcode_normalized ON products;
+CREATE TRIGGER set_products_barcode_normalized BEFORE INSERT OR UPDATE OF barcode ON products
+    FOR EACH ROW EXECUTE FUNCTION set_barcode_normalized();
+
+ALTER TABLE products ALTER COLUMN barcode_normalized SET NOT NULL;
+
+-- Add comments
+COMMENT ON COLUMN products.barcode_normalized IS 'Canonical GTIN (EAN-13, GTIN-14 or GTIN-8) used as the lookup key; set by trigger';
@@ -0,0 +1,15 @@
+-- Migration: Track when products were last fetched from their source
+-- Description: Lets the API refresh stale Open Food Facts data in the background (stale-while-revalidate)
+
+ALTER TABLE products ADD COLUMN IF NOT EXISTS last_fetched_at TIMESTAMPTZ;
+
+-- Existing OFF rows were fetched when they were last written
+UPDATE products SET last_fetched_at = COALESCE(updated_at, created_at)
+WHERE source = 'openfoodfacts' AND last_fetched_at IS NULL;
+
+-- Find the stalest OFF products first
+CREATE INDEX IF NOT EXISTS idx_products_last_fetched_at ON products(last_fetched_at)
+    WHERE source = 'openfoodfacts';
+
+-- Add comments
+COMMENT ON COLUMN products.last_fetched_at IS 'Last successful fetch from the upstream source; NULL for manually entered products';
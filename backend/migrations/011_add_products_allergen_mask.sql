@@ -0,0 +1,26 @@
+-- Migration: Add allergen bitmask to products
+-- Description: Canonical allergen categories as bits so "safe for this user" is one AND evaluated in Postgres
+
+-- Bit order mirrors ALLERGEN_BITS in app/entities/allergen/matcher.py:
+-- milk 1, eggs 2, peanuts 4, nuts 8, gluten 16, soybeans 32, fish 64,
+-- crustaceans 128, molluscs 256, sesame-seeds 512, mustard 1024,
+-- celery 2048, lupin 4096, sulphites 8192.
+-- NULL means not computed yet; fill it with: python -m app.jobs.allergen_masks
+ALTER TABLE products ADD COLUMN IF NOT EXISTS allergen_mask INTEGER;
+
+-- Category listings read the mask from the index instead of the heap
+CREATE INDEX IF NOT EXISTS idx_products_category_allergen_mask ON products(category, allergen_mask);
+
+-- Products sharing no allergen bit with p_allergen_mask (0 returns everything).
+-- Plain SQL without SET options so the planner inlines it and PostgREST
+-- filters, ordering and ranges on the result still use the table's indexes.
+CREATE OR REPLACE FUNCTION products_safe_for(p_allergen_mask INTEGER)
+RETURNS SETOF products AS $$
+    SELECT * FROM public.products
+    WHERE p_allergen_mask = 0
+       OR (allergen_mask IS NOT NULL AND allergen_mask & p_allergen_mask = 0);
+$$ LANGUAGE sql STABLE;
+
+-- Add comments
+COMMENT ON COLUMN products.allergen_mask IS 'Bitmask of canonical allergen categories detected in allergens and ingredients; NULL until computed';
+COMMENT ON FUNCTION products_safe_for(INTEGER) IS 'Products whose allergen_mask shares no bit with the given user allergy mask';
@@ -0,0 +1,47 @@
+-- Migration: Add product search function
+-- Description: Ranked full-text search over product names with keyset pagination
+
+-- Matches against to_tsvector('english', name), the exact expression of
+-- idx_products_name, so the GIN index finds candidate rows. Results are
+-- ordered by rank, then id; the next page starts after the last (rank, id)
+-- pair instead of skipping rows with OFFSET. Only the columns a result card
+-- needs are returned. The allergen filter reuses products_safe_for().
+CREATE OR REPLACE FUNCTION search_products(
+    p_query TEXT,
+    p_brand TEXT DEFAULT NULL,
+    p_category TEXT DEFAULT NULL,
+    p_allergen_mask INTEGER DEFAULT 0,
+    p_after_rank REAL DEFAULT NULL,
+    p_after_id UUID DEFAULT NULL,
+    p_limit INTEGER DEFAULT 20
+)
+RETURNS TABLE (
+    id UUID,
+    barcode TEXT,
+    name TEXT,
+    brand TEXT,
+    category TEXT,
+    images TEXT[],
+    health_score NUMERIC,
+    allergen_mask INTEGER,
+    rank REAL
+) AS $$
+    SELECT * FROM (
+        SELECT p.id, p.barcode, p.name, p.brand, p.category, p.images,
+               p.health_score, p.allergen_mask,
+               ts_rank(to_tsvector('english', p.name), q.query) AS rank
+        FROM public.products_safe_for(p_allergen_mask) AS p,
+             websearch_to_tsquery('english', p_query) AS q(query)
+        WHERE to_tsvector('english', p.name) @@ q.query
+          AND (p_brand IS NULL OR p.brand = p_brand)
+          AND (p_category IS NULL OR p.category = p_category)
+    ) AS matches
+    WHERE p_after_rank IS NULL
+       OR matches.rank < p_after_rank
+       OR (matches.rank = p_after_rank AND matches.id > p_after_id)
+    ORDER BY matches.rank DESC, matches.id
+    LIMIT p_limit;
+$$ LANGUAGE sql STABLE;
+
+-- Add comments
+COMMENT ON FUNCTION search_products(TEXT, TEXT, TEXT, INTEGER, REAL, UUID, INTEGER) IS 'Ranked name search using idx_products_name; pages by (rank, id) keyset';
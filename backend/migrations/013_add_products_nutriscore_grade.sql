@@ -0,0 +1,13 @@
+-- Migration: Record nutriscore_grade and index updated_at on products
+-- Description: Columns read by the in-memory healthier-alternatives index
+
+-- Product lookups and imports already write nutriscore_grade; create it on
+-- databases set up from these files alone
+ALTER TABLE products ADD COLUMN IF NOT EXISTS nutriscore_grade TEXT
+    CHECK (nutriscore_grade IN ('A', 'B', 'C', 'D', 'E'));
+
+-- Each API worker re-reads rows changed since its last sync
+CREATE INDEX IF NOT EXISTS idx_products_updated_at ON products(updated_at);
+
+-- Add comments
+COMMENT ON COLUMN products.nutriscore_grade IS 'Nutri-Score grade A-E';
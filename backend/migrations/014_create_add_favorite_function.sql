@@ -0,0 +1,46 @@
+-- Migration: Add idempotent add_favorite function
+-- Description: Adds a favorite and returns it with its product card in one call
+
+-- Inserts on the (user_id, product_id) unique key and, if the row already
+-- existed, returns that row instead. The statement's snapshot predates its
+-- own insert, so exactly one of the two branches produces a row (none only if
+-- a concurrent add of the same pair commits mid-statement). nutri_score
+-- mirrors products.nutriscore_grade, as in the favorites list.
+CREATE OR REPLACE FUNCTION add_favorite(p_user_id UUID, p_product_id UUID)
+RETURNS TABLE (
+    id UUID,
+    product_id UUID,
+    created_at TIMESTAMPTZ,
+    created BOOLEAN,
+    product JSONB
+) AS $$
+    WITH inserted AS (
+        INSERT INTO public.favorites (user_id, product_id)
+        VALUES (p_user_id, p_product_id)
+        ON CONFLICT (user_id, product_id) DO NOTHING
+        RETURNING favorites.id, favorites.product_id, favorites.created_at
+    ),
+    favorite AS (
+        SELECT inserted.id, inserted.product_id, inserted.created_at, TRUE AS created
+        FROM inserted
+        UNION ALL
+        SELECT f.id, f.product_id, f.created_at, FALSE AS created
+        FROM public.favorites AS f
+        WHERE f.user_id = p_user_id AND f.product_id = p_product_id
+    )
+    SELECT fav.id, fav.product_id, fav.created_at, fav.created,
+           CASE WHEN p.id IS NULL THEN NULL ELSE jsonb_build_object(
+               'id', p.id,
+               'barcode', p.barcode,
+               'name', p.name,
+               'brand', p.brand,
+               'images', p.images,
+               'health_score', p.health_score,
+               'nutri_score', p.nutriscore_grade
+           ) END AS product
+    FROM favorite AS fav
+    LEFT JOIN public.products AS p ON p.id = fav.product_id;
+$$ LANGUAGE sql VOLATILE;
+
+-- Add comments
+COMMENT ON FUNCTION add_favorite(UUID, UUID) IS 'Idempotent favorite insert returning the row and its product card';
@@ -0,0 +1,33 @@
+-- Migration: Create scan_snapshots table
+-- Description: Stores each distinct scan result snapshot once, keyed by content hash
+
+-- hash is the SHA-256 of the snapshot's canonical JSON (sorted keys, no
+-- whitespace), so rescans of an unchanged product share one row
+CREATE TABLE IF NOT EXISTS scan_snapshots (
+    hash TEXT PRIMARY KEY,
+    snapshot JSONB NOT NULL,
+    created_at TIMESTAMPTZ DEFAULT NOW()
+);
+
+-- New scans reference a snapshot instead of copying it into result_snapshot
+ALTER TABLE scans ADD COLUMN IF NOT EXISTS snapshot_hash TEXT REFERENCES scan_snapshots(hash);
+
+-- Lets the scan_snapshots job find rows that still hold an inline copy
+CREATE INDEX IF NOT EXISTS idx_scans_inline_snapshot ON scans(id) WHERE result_snapshot IS NOT NULL;
+
+-- Enable Row Level Security
+ALTER TABLE scan_snapshots ENABLE ROW LEVEL SECURITY;
+
+-- Drop existing policies if they exist. Snapshots are read only through the
+-- backend with the service role; hashes reveal what a user scanned, so there
+-- is no public SELECT policy.
+DROP POLICY IF EXISTS "Scan snapshots are viewable by everyone" ON scan_snapshots;
+DROP POLICY IF EXISTS "Service role can manage all scan snapshots" ON scan_snapshots;
+
+-- Policy: Service role can manage all scan snapshots
+CREATE POLICY "Service role can manage all scan snapshots" ON scan_snapshots
+    FOR ALL USING (auth.role() = 'service_role');
+
+-- Add comments
+COMMENT ON TABLE scan_snapshots IS 'Deduplicated product snapshots referenced by scans';
+COMMENT ON COLUMN scans.snapshot_hash IS 'scan_snapshots row holding this scan''s product snapshot';
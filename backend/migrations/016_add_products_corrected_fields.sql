@@ -0,0 +1,26 @@
+-- Migration: Record which product fields were corrected by an admin
+-- Description: Background refreshes from Open Food Facts skip these fields
+
+-- Field names as in the products table. Approving a correction adds its
+-- field plus the fields derived from it (see CORRECTION_DERIVED_FIELDS in
+-- app/features/correction/admin_service.py).
+ALTER TABLE products ADD COLUMN IF NOT EXISTS corrected_fields TEXT[];
+
+-- Protect corrections approved before this migration
+UPDATE products AS p
+SET corrected_fields = c.fields
+FROM (
+    SELECT product_id, array_agg(DISTINCT field ORDER BY field) AS fields
+    FROM corrections,
+         LATERAL unnest(CASE field_name
+             WHEN 'ingredients_raw' THEN ARRAY['ingredients_raw', 'ingredients_parsed']
+             WHEN 'nutrition' THEN ARRAY['nutrition', 'health_score', 'nutriscore_grade']
+             ELSE ARRAY[field_name]
+         END) AS field
+    WHERE status = 'approved' AND product_id IS NOT NULL
+    GROUP BY product_id
+) AS c
+WHERE p.id = c.product_id;
+
+-- Add comments
+COMMENT ON COLUMN products.corrected_fields IS 'Fields set by approved corrections; never overwritten by OFF refreshes';
@@ -0,0 +1,52 @@
+-- Migration: Return allergen sources from search_products
+-- Description: Adds allergens and ingredient columns to search results for allergy warnings
+
+-- The allergen_mask filter only covers canonical allergen categories. Users
+-- with other allergies (e.g. "Kiwi") are matched against these columns in
+-- the API, so search results need them too. The return type changes, so the
+-- function is dropped and recreated; otherwise it is unchanged from 012.
+DROP FUNCTION IF EXISTS search_products(TEXT, TEXT, TEXT, INTEGER, REAL, UUID, INTEGER);
+
+CREATE FUNCTION search_products(
+    p_query TEXT,
+    p_brand TEXT DEFAULT NULL,
+    p_category TEXT DEFAULT NULL,
+    p_allergen_mask INTEGER DEFAULT 0,
+    p_after_rank REAL DEFAULT NULL,
+    p_after_id UUID DEFAULT NULL,
+    p_limit INTEGER DEFAULT 20
+)
+RETURNS TABLE (
+    id UUID,
+    barcode TEXT,
+    name TEXT,
+    brand TEXT,
+    category TEXT,
+    images TEXT[],
+    health_score NUMERIC,
+    allergen_mask INTEGER,
+    allergens TEXT[],
+    ingredients_parsed JSONB,
+    ingredients_raw TEXT,
+    rank REAL
+) AS $$
+    SELECT * FROM (
+        SELECT p.id, p.barcode, p.name, p.brand, p.category, p.images,
+               p.health_score, p.allergen_mask,
+               p.allergens, p.ingredients_parsed, p.ingredients_raw,
+               ts_rank(to_tsvector('english', p.name), q.query) AS rank
+        FROM public.products_safe_for(p_allergen_mask) AS p,
+             websearch_to_tsquery('english', p_query) AS q(query)
+        WHERE to_tsvector('english', p.name) @@ q.query
+          AND (p_brand IS NULL OR p.brand = p_brand)
+          AND (p_category IS NULL OR p.category = p_category)
+    ) AS matches
+    WHERE p_after_rank IS NULL
+       OR matches.rank < p_after_rank
+       OR (matches.rank = p_after_rank AND matches.id > p_after_id)
+    ORDER BY matches.rank DESC, matches.id
+    LIMIT p_limit;
+$$ LANGUAGE sql STABLE;
+
+-- Add comments
+COMMENT ON FUNCTION search_products(TEXT, TEXT, TEXT, INTEGER, REAL, UUID, INTEGER) IS 'Ranked name search using idx_products_name; pages by (rank, id) keyset';
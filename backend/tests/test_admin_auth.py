@@ -0,0 +1,49 @@
+"""Tests for admin token verification and the allowlist"""
+
+import time
+import pytest
+from fastapi import HTTPException
+from jose import jwt
+from app.core import admin_auth
+from app.core.config import settings
+
+
+def bearer(sub: str) -> str:
+    token = jwt.encode(
+        {"sub": sub, "exp": int(time.time()) + 600},
+        settings.SUPABASE_ANON_KEY,
+        algorithm="HS256"
+    )
+    return f"Bearer {token}"
+
+
+@pytest.fixture(autouse=True)
+def admin_allowlist(monkeypatch):
+    monkeypatch.setenv("ADMIN_USER_IDS", "admin-1, admin-2")
+    admin_auth.reload_admin_user_ids()
+    yield
+    monkeypatch.delenv("ADMIN_USER_IDS")
+    admin_auth.reload_admin_user_ids()
+
+
+async def test_admin_token_is_verified_locally():
+    assert admin_auth.get_admin_user_ids() == frozenset({"admin-1", "admin-2"})
+    assert await admin_auth.verify_admin_user(bearer("admin-1")) == "admin-1"
+
+
+async def test_non_admin_is_forbidden():
+    with pytest.raises(HTTPException) as exc_info:
+        await admin_auth.verify_admin_user(bearer("user-1"))
+    assert exc_info.value.status_code == 403
+
+
+async def test_reload_revokes_cached_decisions(monkeypatch):
+    authorization = bearer("admin-2")
+    assert await admin_auth.verify_admin_user(authorization) == "admin-2"
+
+    monkeypatch.setenv("ADMIN_USER_IDS", "admin-1")
+    admin_auth.reload_admin_user_ids()
+
+    with pytest.raises(HTTPException) as exc_info:
+        await admin_auth.verify_admin_user(authorization)
+    assert exc_info.value.status_code == 403
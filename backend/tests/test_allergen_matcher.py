@@ -0,0 +1,72 @@
+"""Tests for the compiled allergen matcher"""
+
+from app.entities.allergen.matcher import AllergenMatcher, tokenize
+from app.entities.product.models import Product
+
+matcher = AllergenMatcher.from_defaults([("arachide", "peanuts"), ("vanillin", None)])
+
+
+def make_product(**fields) -> Product:
+    return Product(barcode="123", name="Test", **fields)
+
+
+def test_tokenize_strips_tag_prefix_and_plurals():
+    assert tokenize("en:Peanuts") == ["peanut"]
+    assert tokenize("Skimmed-milk powder") == ["skimmed", "milk", "powder"]
+
+
+def test_detects_aliases_in_raw_ingredients():
+    product = make_product(ingredients_raw="Sugar, sodium caseinate, emulsifier (soya lecithin)")
+    assert set(matcher.detect(product)) == {"milk", "soybeans"}
+
+
+def test_longest_phrase_wins_and_free_is_ignored():
+    product = make_product(ingredients_raw="Cocoa butter, peanut butter, gluten-free oats flakes")
+    detected = matcher.detect(product)
+    assert "milk" not in detected
+    assert detected["peanuts"] == ["peanut butter"]
+    assert detected["gluten"] == ["oat"]
+
+
+def test_find_warnings_resolves_user_allergies():
+    product = make_product(
+        allergens=["en:milk"],
+        ingredients_parsed=["arachide"],
+        ingredients_raw="Whey, arachide, kiwi"
+    )
+    warnings = matcher.find_warnings(product, ["Dairy", "Peanuts", "Kiwi", "Eggs"])
+    assert warnings == ["Dairy", "Peanuts", "Kiwi"]
+
+
+def test_nut_does_not_match_inside_peanut():
+    product = make_product(allergens=["en:peanuts"])
+    assert matcher.find_warnings(product, ["tree nuts"]) == []
+
+
+def test_compiled_allergies_are_memoized():
+    allergies = ["Milk", "kiwi"]
+    compiled = matcher.compile_allergies(allergies)
+    assert compiled == (("Milk", "milk", ("milk",)), ("kiwi", None, ("kiwi",)))
+    assert matcher.compile_allergies(list(allergies)) is compiled
+
+
+def test_allergen_masks_share_bits():
+    from app.entities.allergen.matcher import categories_to_mask
+
+    product = make_product(ingredients_raw="Wheat flour, sugar, whey powder")
+    product_mask = matcher.product_mask(product)
+    assert product_mask == categories_to_mask(["gluten", "milk"])
+    assert product_mask & matcher.allergy_mask(["Dairy"])
+    assert not product_mask & matcher.allergy_mask(["Peanuts", "Kiwi"])
+    assert matcher.mask_warnings(product_mask, ["Dairy", "Peanuts", "Kiwi"]) == ["Dairy"]
+    assert matcher.mask_warnings(None, ["Dairy"]) == []
+
+
+def test_extra_aliases_never_remap_default_phrases():
+    from app.entities.allergen.matcher import categories_to_mask
+
+    overlapping = AllergenMatcher.from_defaults([("groundnut", "peanut"), ("peanut", "peanut")])
+    product = make_product(ingredients_raw="Sugar, peanuts")
+    assert overlapping.find_warnings(product, ["Peanuts"]) == ["Peanuts"]
+    assert overlapping.product_mask(product) == categories_to_mask(["peanuts"])
+    assert overlapping.resolve("groundnut") == "peanuts"
@@ -0,0 +1,76 @@
+"""Tests for running product and allergy lookups side by side"""
+
+import asyncio
+import pytest
+from app.api.v1 import allergy_warnings
+
+
+@pytest.fixture
+def slow_allergies(monkeypatch):
+    calls = {"started": 0, "finished": 0}
+
+    async def get_user_with_allergies(authorization):
+        calls["started"] += 1
+        calls["task"] = asyncio.current_task()
+        await asyncio.sleep(0.05)
+        calls["finished"] += 1
+        return {"id": "u1"}, ["milk"]
+
+    monkeypatch.setattr(allergy_warnings, "get_user_with_allergies", get_user_with_allergies)
+    return calls
+
+
+async def slow_lookup(result, delay=0.05):
+    await asyncio.sleep(delay)
+    return result
+
+
+async def test_lookups_run_concurrently(monkeypatch):
+    # Each side waits for the other to start, so running them one after the
+    # other times out instead of passing
+    product_started = asyncio.Event()
+    allergies_started = asyncio.Event()
+
+    async def get_user_with_allergies(authorization):
+        allergies_started.set()
+        await asyncio.wait_for(product_started.wait(), timeout=1)
+        return {"id": "u1"}, ["milk"]
+
+    async def lookup():
+        product_started.set()
+        await asyncio.wait_for(allergies_started.wait(), timeout=1)
+        return "product"
+
+    monkeypatch.setattr(allergy_warnings, "get_user_with_allergies", get_user_with_allergies)
+    product, allergies = await allergy_warnings.with_user_allergies(lookup(), "Bearer t")
+    assert (product, allergies) == ("product", ["milk"])
+
+
+async def test_failed_lookup_cancels_allergy_fetch(slow_allergies):
+    async def failing_lookup():
+        await asyncio.sleep(0)
+        raise RuntimeError("db down")
+
+    with pytest.raises(RuntimeError):
+        await allergy_warnings.with_user_allergies(failing_lookup(), "Bearer t")
+    # The allergy task is already cancelled and awaited when the error surfaces
+    assert slow_allergies["task"].cancelled()
+    await asyncio.sleep(0.06)
+    assert slow_allergies["finished"] == 0
+
+
+async def test_anonymous_request_skips_allergy_fetch(slow_allergies):
+    assert await allergy_warnings.with_user_allergies(slow_lookup(None, 0), None) == (None, None)
+    assert slow_allergies["started"] == 0
+
+
+async def test_user_is_returned_with_the_lookup(slow_allergies):
+    result = await allergy_warnings.with_user(slow_lookup("product"), "Bearer t")
+    assert result == ("product", {"id": "u1"}, ["milk"])
+    assert slow_allergies["started"] == 1
+
+
+async def test_empty_lookup_awaits_the_cancelled_allergy_fetch(slow_allergies):
+    assert await allergy_warnings.with_user(slow_lookup(None, 0), "Bearer t") == (None, None, None)
+    assert slow_allergies["task"].cancelled()
+    assert slow_allergies["finished"] == 0
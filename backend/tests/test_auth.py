@@ -0,0 +1,57 @@
+"""Tests for JWT verification and the verified-token cache"""
+
+import time
+import pytest
+from fastapi import HTTPException
+from fastapi.security import HTTPAuthorizationCredentials
+from jose import jwt
+from app.core import auth
+from app.core.config import settings
+
+
+def make_credentials(key: str, **claims) -> HTTPAuthorizationCredentials:
+    payload = {"sub": "user-1", "email": "a@example.com", "exp": int(time.time()) + 600, **claims}
+    return HTTPAuthorizationCredentials(
+        scheme="Bearer",
+        credentials=jwt.encode(payload, key, algorithm="HS256")
+    )
+
+
+async def test_verified_token_is_served_from_cache():
+    credentials = make_credentials(settings.SUPABASE_ANON_KEY, sub="cached-user")
+    before = auth.token_cache_stats()
+
+    first = await auth.get_current_user(credentials)
+    second = await auth.get_current_user(credentials)
+
+    after = auth.token_cache_stats()
+    assert first == second
+    assert first["id"] == "cached-user"
+    assert after["misses"] - before["misses"] == 1
+    assert after["hits"] - before["hits"] == 1
+
+
+async def test_service_role_token_is_accepted():
+    user = await auth.get_current_user(make_credentials(settings.SUPABASE_KEY, sub="service-user"))
+    assert user["id"] == "service-user"
+
+
+async def test_rejected_token_is_cached():
+    credentials = make_credentials("not-a-supabase-key")
+    before = auth.token_cache_stats()
+
+    for _ in range(2):
+        with pytest.raises(HTTPException) as exc_info:
+            await auth.get_current_user(credentials)
+        assert exc_info.value.detail == "Invalid authentication token"
+
+    after = auth.token_cache_stats()
+    assert after["rejects"] - before["rejects"] == 1
+    assert after["cached_rejects"] - before["cached_rejects"] == 1
+
+
+async def test_expired_token_is_rejected():
+    credentials = make_credentials(settings.SUPABASE_ANON_KEY, exp=int(time.time()) - 10)
+    with pytest.raises(HTTPException) as exc_info:
+        await auth.get_current_user(credentials)
+    assert exc_info.value.detail == "Token has expired"
@@ -0,0 +1,31 @@
+from app.entities.product.barcode import is_valid_gtin, normalize_barcode
+
+
+def test_upc_ean_and_gtin14_forms_share_one_key():
+    """Verify UPC-A, EAN-13 and GTIN-14 forms normalize to the same EAN-13"""
+    assert normalize_barcode("036000291452") == "0036000291452"
+    assert normalize_barcode("0036000291452") == "0036000291452"
+    assert normalize_barcode("00036000291452") == "0036000291452"
+    assert normalize_barcode(" 0-36000-29145-2 ") == "0036000291452"
+
+
+def test_ean8_and_gtin14_with_indicator_are_preserved():
+    """Verify GTIN-8 keeps 8 digits and packaging indicators keep 14"""
+    assert normalize_barcode("96385074") == "96385074"
+    assert normalize_barcode("00000096385074") == "96385074"
+    assert normalize_barcode("10036000291459") == "10036000291459"
+
+
+def test_invalid_codes_are_only_stripped():
+    """Verify bad check digits and non-GTIN payloads are kept as exact keys"""
+    assert not is_valid_gtin("3017620422004")
+    assert normalize_barcode("3017620422004") == "3017620422004"
+    assert normalize_barcode(" https://example.com/p/1 ") == "https://example.com/p/1"
+    assert is_valid_gtin("3017620422003")
+
+
+def test_non_ascii_digits_are_not_gtins():
+    """Verify Unicode digits are rejected instead of failing the check digit"""
+    assert not is_valid_gtin("1234567²")
+    assert normalize_barcode("1234567²") == "1234567²"
+    assert normalize_barcode("３０１７６２０４２２００３") == "３０１７６２０４２２００３"
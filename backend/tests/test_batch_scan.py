@@ -0,0 +1,108 @@
+"""Tests for batch barcode lookups"""
+
+import pytest
+from fastapi.testclient import TestClient
+from app.entities.product.models import Product
+from app.features.product import service as product_service
+from app.features.scan.service import ScanService
+from app.main import app
+
+NUTELLA = Product(id="p1", barcode="3017620422003", name="Nutella")
+OREO = Product(id="p2", barcode="7622210449283", name="Oreo")
+KITKAT = Product(barcode="8445290728791", name="KitKat")
+
+
+@pytest.fixture
+def lookups(monkeypatch):
+    """Serve Nutella from cache, Oreo from the DB and KitKat from OFF"""
+    calls = {"db": [], "off": [], "missing_checks": [], "remembered": [], "stored": []}
+
+    async def get_cached_product_by_barcode(code):
+        return NUTELLA.model_copy() if code == NUTELLA.barcode else None
+
+    async def is_known_missing(code):
+        calls["missing_checks"].append(code)
+        return code == "4000000000020"
+
+    async def remember_missing(code):
+        calls["remembered"].append(code)
+
+    async def cache_product(product):
+        pass
+
+    async def get_products_from_db(self, barcodes):
+        calls["db"].append(barcodes)
+        return [OREO.model_copy(update={"barcode_normalized": OREO.barcode})] if OREO.barcode in barcodes else []
+
+    async def lookup_barcode(code):
+        calls["off"].append(code)
+        if code == KITKAT.barcode:
+            return KITKAT.model_copy(), False
+        if code == "5000000000009":
+            return None, False  # upstream error
+        return None, True
+
+    async def store_new_products(self, products):
+        calls["stored"].append([product.barcode for product in products])
+
+    monkeypatch.setattr(product_service, "get_supabase_client", lambda: None)
+    monkeypatch.setattr(product_service, "get_cached_product_by_barcode", get_cached_product_by_barcode)
+    monkeypatch.setattr(product_service, "is_known_missing", is_known_missing)
+    monkeypatch.setattr(product_service, "remember_missing", remember_missing)
+    monkeypatch.setattr(product_service, "cache_product", cache_product)
+    monkeypatch.setattr(product_service.product_refresher, "schedule", lambda product: False)
+    monkeypatch.setattr(product_service.ProductService, "_get_products_from_db", get_products_from_db)
+    monkeypatch.setattr(product_service.ProductService, "_store_new_products", store_new_products)
+    monkeypatch.setattr(product_service.OpenFoodFactsClient, "lookup_barcode", lambda self, code: lookup_barcode(code))
+    return calls
+
+
+async def test_batch_lookup_reports_each_status(lookups):
+    codes = [NUTELLA.barcode, OREO.barcode, KITKAT.barcode, "4000000000020", "4000000000006", "5000000000009"]
+    items = await ScanService().scan_products(codes)
+
+    assert [(item.code, item.status) for item in items] == [
+        (NUTELLA.barcode, "found"),
+        (OREO.barcode, "found"),
+        (KITKAT.barcode, "found"),
+        ("4000000000020", "not_found"),
+        ("4000000000006", "not_found"),
+        ("5000000000009", "error"),
+    ]
+    # One DB query for every uncached barcode, OFF only for DB misses outside
+    # the negative cache
+    assert lookups["db"] == [[OREO.barcode, KITKAT.barcode, "4000000000020", "4000000000006", "5000000000009"]]
+    assert lookups["off"] == [KITKAT.barcode, "4000000000006", "5000000000009"]
+    assert lookups["remembered"] == ["4000000000006"]
+    assert lookups["stored"] == [[KITKAT.barcode]]
+
+
+async def test_batch_lookup_resolves_repeated_codes_once(lookups):
+    items = await ScanService().scan_products([KITKAT.barcode, f" {KITKAT.barcode} ", "0" + KITKAT.barcode])
+
+    assert [(item.code, item.normalized_code) for item in items] == [
+        (KITKAT.barcode, KITKAT.barcode),
+        ("0" + KITKAT.barcode, KITKAT.barcode),
+    ]
+    assert lookups["missing_checks"] == [KITKAT.barcode]
+    assert lookups["off"] == [KITKAT.barcode]
+
+
+async def test_db_rows_win_over_the_negative_cache(lookups, monkeypatch):
+    """A product inserted by another writer is served while its barcode is still cached as missing"""
+    async def is_known_missing(code):
+        return True
+
+    monkeypatch.setattr(product_service, "is_known_missing", is_known_missing)
+    items = await ScanService().scan_products([OREO.barcode, KITKAT.barcode])
+
+    assert [(item.code, item.status) for item in items] == [(OREO.barcode, "found"), (KITKAT.barcode, "not_found")]
+    assert lookups["off"] == []
+
+
+def test_batch_endpoint_rejects_more_than_200_codes():
+    client = TestClient(app)
+    codes = [str(4000000000000 + i) for i in range(201)]
+
+    assert client.post("/api/v1/scan/batch", json={"codes": codes}).status_code == 422
+    assert client.post("/api/v1/scan/batch", json={"codes": []}).status_code == 422
@@ -0,0 +1,68 @@
+import asyncio
+from app.shared.batching import BatchWriter
+
+
+async def test_flushes_when_batch_is_full():
+    """Verify a full batch is flushed without waiting for the interval"""
+    batches = []
+
+    async def flush(items):
+        batches.append(items)
+
+    writer = BatchWriter(name="test", flush=flush, max_batch_size=3, flush_interval=60)
+    writer.start()
+    for i in range(3):
+        assert writer.submit(i)
+    await asyncio.sleep(0.01)
+
+    assert batches == [[0, 1, 2]]
+    await writer.stop()
+
+
+async def test_flushes_after_interval_and_drains_on_stop():
+    """Verify partial batches flush on the interval and stop() drains the queue"""
+    batches = []
+
+    async def flush(items):
+        batches.append(items)
+
+    writer = BatchWriter(name="test", flush=flush, max_batch_size=100, flush_interval=0.01)
+    writer.start()
+    writer.submit("a")
+    await asyncio.sleep(0.05)
+    writer.submit("b")
+    writer.submit("c")
+    await writer.stop()
+
+    assert batches == [["a"], ["b", "c"]]
+    assert writer.stats()["flushed"] == 3
+    assert not writer.submit("d")
+
+
+async def test_retries_failed_flushes():
+    """Verify failed flushes are retried before the batch is given up"""
+    attempts = []
+    dropped = []
+
+    async def flush(items):
+        attempts.append(items)
+        raise RuntimeError("database unavailable")
+
+    async def on_failure(items):
+        dropped.extend(items)
+
+    writer = BatchWriter(
+        name="test",
+        flush=flush,
+        flush_interval=0,
+        max_retries=2,
+        retry_backoff=0,
+        on_failure=on_failure,
+    )
+    writer.start()
+    writer.submit("a")
+    await writer.stop()
+
+    assert len(attempts) == 3
+    assert dropped == ["a"]
+    assert writer.stats()["failed"] == 1
@@ -0,0 +1,151 @@
+import time
+import pytest
+from app.core.config import settings
+from app.shared.cache import LRUCache, TwoTierCache
+from app.entities.product import cache as product_cache
+
+
+@pytest.fixture(autouse=True)
+def no_redis(monkeypatch):
+    """Run cache tests against the in-process tier only"""
+    monkeypatch.setattr(settings, "REDIS_ENABLED", False)
+
+
+def test_lru_cache_evicts_least_recently_used():
+    """Verify the oldest untouched entry is evicted when the cache is full"""
+    cache = LRUCache(maxsize=2)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    cache.get("a")
+    cache.set("c", 3)
+
+    assert cache.get("a") == 1
+    assert cache.get("b") is None
+    assert cache.get("c") == 3
+
+
+def test_lru_cache_expires_entries():
+    """Verify entries are dropped once their TTL has passed"""
+    cache = LRUCache(maxsize=10, ttl=0.01)
+    cache.set("a", 1)
+    cache.set("b", 2, ttl=60)
+    time.sleep(0.02)
+
+    assert cache.get("a") is None
+    assert cache.get("b") == 2
+
+
+async def test_two_tier_cache_counts_hits_and_misses():
+    """Verify read-through counters and explicit invalidation"""
+    cache = TwoTierCache(namespace="test", maxsize=10, l1_ttl=60, l2_ttl=60)
+
+    assert await cache.get("x") is None
+    await cache.set("x", {"name": "Test Product"})
+    assert await cache.get("x") == {"name": "Test Product"}
+
+    await cache.delete("x")
+    assert await cache.get("x") is None
+
+    stats = cache.stats()
+    assert stats["l1_hits"] == 1
+    assert stats["l2_hits"] == 0
+    assert stats["misses"] == 2
+
+
+async def test_negative_cache_backs_off_exponentially(monkeypatch):
+    """Verify repeated misses double the retry window until cleared"""
+    monkeypatch.setattr(settings, "NEGATIVE_CACHE_TTL_SECONDS", 60)
+    monkeypatch.setattr(settings, "NEGATIVE_CACHE_MAX_TTL_SECONDS", 150)
+    barcode = "2000000000015"
+
+    assert not await product_cache.is_known_missing(barcode)
+
+    await product_cache.remember_missing(barcode)
+    first = await product_cache.negative_cache.get(barcode)
+    await product_cache.remember_missing(barcode)
+    second = await product_cache.negative_cache.get(barcode)
+    await product_cache.remember_missing(barcode)
+    third = await product_cache.negative_cache.get(barcode)
+
+    assert await product_cache.is_known_missing(barcode)
+    assert (first["misses"], second["misses"], third["misses"]) == (1, 2, 3)
+    assert 119 < second["retry_after"] - time.time() <= 120
+    assert 149 < third["retry_after"] - time.time() <= 150
+
+    await product_cache.forget_missing(barcode)
+    assert not await product_cache.is_known_missing(barcode)
+
+
+async def test_invalidation_message_drops_l1_entry():
+    """Verify a broadcast invalidation from another worker clears the local copy"""
+    from app.shared.cache import cache_invalidations
+
+    cache = TwoTierCache(
+        namespace="test-broadcast", maxsize=10, l1_ttl=60, l2_ttl=60, broadcast_invalidations=True
+    )
+    await cache.set("user-1", {"allergies": ["milk"]})
+    await cache.set("user-2", {})
+
+    cache_invalidations.handle(cache.invalidation_channel, '["user-1"]')
+
+    assert await cache.get("user-1") is None
+    assert await cache.get("user-2") == {}
+
+
+async def test_product_invalidation_reaches_other_workers():
+    """Verify a product invalidated on another worker is dropped from local L1"""
+    from app.entities.product.models import Product
+    from app.shared.cache import cache_invalidations
+
+    product = Product(id="p1", barcode="3017620422003", name="Nutella")
+    await product_cache.cache_product(product)
+    assert await product_cache.get_cached_product_by_id("p1") is not None
+
+    cache_invalidations.handle(product_cache.product_cache.invalidation_channel, '["id:p1"]')
+
+    assert await product_cache.get_cached_product_by_id("p1") is None
+
+
+async def test_set_if_unchanged_skips_values_read_before_a_delete():
+    """Verify a value loaded before an invalidation (local or broadcast) is not cached"""
+    from app.shared.cache import cache_invalidations
+
+    cache = TwoTierCache(
+        namespace="test-versions", maxsize=10, l1_ttl=60, l2_ttl=60, broadcast_invalidations=True
+    )
+
+    version = await cache.version("user-1")
+    await cache.delete("user-1")
+    assert not await cache.set_if_unchanged("user-1", {"allergies": []}, version)
+    assert await cache.get("user-1") is None
+
+    version = await cache.version("user-1")
+    cache_invalidations.handle(cache.invalidation_channel, '["user-1"]')
+    assert not await cache.set_if_unchanged("user-1", {"allergies": []}, version)
+
+    version = await cache.version("user-1")
+    assert await cache.set_if_unchanged("user-1", {"allergies": ["milk"]}, version)
+    assert await cache.get("user-1") == {"allergies": ["milk"]}
+
+
+async def test_profile_read_during_a_preference_write_is_not_cached(monkeypatch):
+    """Verify a users_meta row read before a write's invalidation is served once but not cached"""
+    from types import SimpleNamespace
+    from app.features.user import service as user_service
+    from app.features.user.cache import get_cached_user_meta, invalidate_user_meta
+
+    async def execute_query(builder):
+        # The user saves new allergies while the old row is being read
+        await invalidate_user_meta("user-1")
+        return SimpleNamespace(data=[{"user_id": "user-1", "allergies": ["milk"]}])
+
+    monkeypatch.setattr(user_service, "execute_query", execute_query)
+    service = user_service.UserService.__new__(user_service.UserService)
+    service.supabase = SimpleNamespace(table=lambda name: SimpleNamespace(
+        select=lambda columns: SimpleNamespace(eq=lambda column, value: None)
+    ))
+
+    profile = await service.get_user_profile("user-1")
+
+    assert profile.allergies == ["milk"]
+    assert await get_cached_user_meta("user-1") is None
@@ -0,0 +1,135 @@
+"""Tests for favorite status lookups served from the per-user favorites cache"""
+
+from types import SimpleNamespace
+from app.features.favorites import service as favorites_service
+from app.features.favorites.cache import favorite_ids_cache, get_cached_favorite_ids
+
+FAVORITES = [{"id": "f1", "product_id": "p1"}, {"id": "f2", "product_id": "p2"}]
+
+
+class FavoritesTable:
+    """Stands in for the favorites table; counts the queries that reach it"""
+
+    def __init__(self):
+        self.queries = 0
+        self.op = None
+
+    def __getattr__(self, name):
+        def call(*args, **kwargs):
+            if name in ("select", "delete", "rpc"):
+                self.op = (name, args)
+            return self
+        return call
+
+
+def make_service(monkeypatch, table):
+    async def execute_query(builder):
+        table.queries += 1
+        name, args = table.op
+        if name == "rpc":
+            product_id = args[1]["p_product_id"]
+            existing = [row["id"] for row in FAVORITES if row["product_id"] == product_id]
+            return SimpleNamespace(data=[{
+                "id": existing[0] if existing else "f3",
+                "product_id": product_id,
+                "created_at": "2026-01-09T10:00:00+00:00",
+                "created": not existing,
+                "product": {"id": product_id, "name": "Hazelnut spread", "nutri_score": "E"},
+            }])
+        if name == "select":
+            return SimpleNamespace(data=list(FAVORITES))
+        return SimpleNamespace(data=[{"id": "f1"}] if name == "delete" else [])
+
+    monkeypatch.setattr(favorites_service, "execute_query", execute_query)
+    service = favorites_service.FavoritesService.__new__(favorites_service.FavoritesService)
+    service.supabase = SimpleNamespace(table=lambda name: table, rpc=table.rpc)
+    return service
+
+
+async def test_bulk_status_reads_favorites_once(monkeypatch):
+    favorite_ids_cache.l1.clear()
+    table = FavoritesTable()
+    service = make_service(monkeypatch, table)
+
+    statuses = await service.get_favorite_statuses("u1", ["p1", "p3"])
+    assert statuses == {"p1": "f1", "p3": None}
+    assert table.queries == 1
+
+    assert await service.is_favorite("u1", "p2") == (True, "f2")
+    assert await service.get_favorite_statuses("u1", ["p2"]) == {"p2": "f2"}
+    assert table.queries == 1
+
+
+async def test_add_and_remove_drop_the_cached_set(monkeypatch):
+    favorite_ids_cache.l1.clear()
+    table = FavoritesTable()
+    service = make_service(monkeypatch, table)
+    await service.get_favorite_ids("u1")
+
+    favorite = await service.add_favorite("u1", "p3")
+    assert (favorite.id, favorite.product.nutri_score) == ("f3", "E")
+    assert await get_cached_favorite_ids("u1") is None
+
+    await service.get_favorite_ids("u1")
+    assert await service.remove_favorite("u1", "p1")
+    assert await get_cached_favorite_ids("u1") is None
+
+    # Each change is followed by a full reload rather than an in-place update
+    # that a concurrent change on another device could overwrite
+    await service.get_favorite_ids("u1")
+    assert table.queries == 5
+
+
+async def test_adding_an_existing_favorite_returns_it(monkeypatch):
+    favorite_ids_cache.l1.clear()
+    table = FavoritesTable()
+    service = make_service(monkeypatch, table)
+
+    await service.get_favorite_ids("u1")
+
+    favorite = await service.add_favorite("u1", "p1")
+    assert (favorite.id, favorite.product_id) == ("f1", "p1")
+    assert favorite.created_at
+    assert await get_cached_favorite_ids("u1") is not None
+    assert table.queries == 2
+
+
+async def test_add_racing_another_add_rereads_the_favorite(monkeypatch):
+    favorite_ids_cache.l1.clear()
+    table = FavoritesTable()
+    service = make_service(monkeypatch, table)
+
+    # add_favorite() returns no row when a concurrent add commits mid-call
+    async def execute_query(builder):
+        table.queries += 1
+        if table.op[0] == "rpc":
+            return SimpleNamespace(data=[])
+        return SimpleNamespace(data=[{
+            **FAVORITES[0],
+            "created_at": "2026-01-09T10:00:00+00:00",
+            "products": {"id": "p1", "name": "Hazelnut spread"},
+        }])
+
+    monkeypatch.setattr(favorites_service, "execute_query", execute_query)
+    favorite = await service.add_favorite("u1", "p1")
+    assert (favorite.id, favorite.product.name) == ("f1", "Hazelnut spread")
+    assert table.queries == 2
+
+
+async def test_map_read_during_a_remove_is_not_cached(monkeypatch):
+    favorite_ids_cache.l1.clear()
+    table = FavoritesTable()
+    service = make_service(monkeypatch, table)
+    read_favorites = favorites_service.execute_query
+
+    async def execute_query(builder):
+        response = await read_favorites(builder)
+        if table.op[0] == "select":
+            # The favorite is removed on another device while the map is read
+            await favorites_service.invalidate_favorite_ids("u1")
+        return response
+
+    monkeypatch.setattr(favorites_service, "execute_query", execute_query)
+
+    assert await service.get_favorite_ids("u1") == {"p1": "f1", "p2": "f2"}
+    assert await get_cached_favorite_ids("u1") is None
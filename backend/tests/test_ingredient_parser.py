@@ -0,0 +1,90 @@
+"""Tests for ingredient list parsing"""
+
+from concurrent.futures import ThreadPoolExecutor
+from app.entities.ingredient import parser as parser_module
+from app.entities.ingredient.parser import IngredientParser
+from app.jobs.ingredient_backfill import ingredient_changes, parse_distinct
+
+ALIASES = [
+    ("hazelnut", "hazelnuts"),
+    ("soya lecithin", "soy lecithin"),
+    ("e322", "soy lecithin"),
+    ("skimmed milk powder", "skim milk powder"),
+]
+
+NUTELLA = (
+    "Ingredients: Sugar, palm oil, HAZELNUTS 13%, chocolate (cocoa mass 20%, sugar, "
+    "emulsifier: soya lecithin [E322]), skimmed milk powder 8.7%, salt."
+)
+
+
+def test_parse_flattens_nested_lists_and_strips_percentages():
+    parser = IngredientParser(ALIASES)
+
+    assert parser.parse(NUTELLA) == [
+        "sugar", "palm oil", "hazelnuts", "chocolate", "cocoa mass",
+        "soy lecithin", "skim milk powder", "salt",
+    ]
+
+
+def test_parse_handles_semicolons_and_unbalanced_brackets():
+    parser = IngredientParser()
+
+    assert parser.parse("water; salt (2%); spices (pepper, paprika") == [
+        "water", "salt", "spices", "pepper", "paprika",
+    ]
+    assert parser.parse("") == []
+    assert parser.parse(None) == []
+
+
+def test_fuzzy_fallback_only_for_close_spellings():
+    parser = IngredientParser(ALIASES)
+
+    assert parser.parse("hazlenut, soya lecitin, oats") == ["hazelnuts", "soy lecithin", "oats"]
+
+
+def test_parse_is_memoized_by_normalized_text():
+    parser = IngredientParser(ALIASES)
+
+    first = parser.parse("Sugar,  Palm Oil")
+    first.append("mutated")
+    assert parser.parse("sugar, palm oil") == ["sugar", "palm oil"]
+    assert parser.stats()["hits"] == 1
+    assert parser.stats()["misses"] == 1
+
+
+def test_fuzzy_name_memo_evicts_least_recently_used(monkeypatch):
+    monkeypatch.setattr(parser_module, "PARSE_CACHE_SIZE", 2)
+    parser = IngredientParser(ALIASES)
+
+    parser.canonicalize("hazlenut")
+    parser.canonicalize("soya lecitin")
+    parser.canonicalize("hazlenut")
+    # A full memo keeps taking new names and drops the least recently used one
+    parser.canonicalize("oats")
+    assert "oats" in parser._name_memo
+    assert "hazlenut" in parser._name_memo
+    assert "soya lecitin" not in parser._name_memo
+
+
+def test_parse_distinct_parses_each_string_once():
+    texts = ["sugar, salt", "water", "sugar, salt"] * 300
+
+    with ThreadPoolExecutor(2) as executor:
+        parsed = parse_distinct(texts, executor)
+
+    assert parsed == {"sugar, salt": ["sugar", "salt"], "water": ["water"]}
+
+
+def test_ingredient_changes_skip_corrected_lists():
+    rows = [
+        {"id": "1", "barcode": "1", "name": "A", "ingredients_raw": "sugar, salt", "ingredients_parsed": ["sugar"]},
+        {
+            "id": "2", "barcode": "2", "name": "B", "ingredients_raw": "sugar, salt",
+            "ingredients_parsed": ["sea salt"], "corrected_fields": ["ingredients_raw", "ingredients_parsed"],
+        },
+    ]
+
+    changes = ingredient_changes(rows, {"sugar, salt": ["sugar", "salt"]})
+
+    assert [(change["id"], change["ingredients_parsed"]) for change in changes] == [("1", ["sugar", "salt"])]
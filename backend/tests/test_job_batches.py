@@ -0,0 +1,68 @@
+"""Tests for the keyset paging and column updates shared by offline jobs"""
+
+from types import SimpleNamespace
+from app.jobs import batches
+
+
+class ProductsTable:
+    """Stands in for a table; records the updates and pages that reach it"""
+
+    def __init__(self):
+        self.updates = []
+
+    def update(self, payload):
+        return SimpleNamespace(
+            in_=lambda column, ids: SimpleNamespace(execute=lambda: self.updates.append((payload, ids)))
+        )
+
+
+def test_update_rows_sends_only_changed_columns_grouped_by_value(monkeypatch):
+    table = ProductsTable()
+    monkeypatch.setattr(batches, "get_supabase_client", lambda: SimpleNamespace(table=lambda name: table))
+    monkeypatch.setattr(batches, "UPDATE_CHUNK_SIZE", 2)
+
+    batches.update_rows("products", [
+        {"id": "1", "allergen_mask": 3},
+        {"id": "2", "allergen_mask": 0},
+        {"id": "3", "allergen_mask": 3},
+        {"id": "4", "allergen_mask": 3},
+    ])
+
+    assert table.updates == [
+        ({"allergen_mask": 3}, ["1", "3"]),
+        ({"allergen_mask": 3}, ["4"]),
+        ({"allergen_mask": 0}, ["2"]),
+    ]
+
+
+def test_run_batches_pages_by_id_and_sums_counters():
+    ids = [str(i) for i in range(1, 6)]
+    requested = []
+
+    def fetch(after_id, batch_size):
+        requested.append(after_id)
+        start = ids.index(after_id) + 1 if after_id else 0
+        return [{"id": row_id} for row_id in ids[start:start + batch_size]]
+
+    result = batches.run_batches("test", fetch, lambda rows: {"updated": len(rows) - 1}, batch_size=2)
+
+    assert requested == [None, "2", "4", "5"]
+    assert (result["scanned"], result["updated"]) == (5, 2)
+
+
+def test_forget_cached_products_invalidates_ids_and_barcodes(monkeypatch):
+    invalidated = []
+
+    async def invalidate_products(product_ids=(), barcodes=()):
+        invalidated.append((product_ids, barcodes))
+
+    async def close_redis_client():
+        pass
+
+    monkeypatch.setattr(batches, "invalidate_products", invalidate_products)
+    monkeypatch.setattr(batches, "close_redis_client", close_redis_client)
+
+    batches.forget_cached_products([])
+    batches.forget_cached_products([{"id": "1", "barcode": "3017620422003"}, {"id": "2", "barcode": None}])
+
+    assert invalidated == [(["1", "2"], ["3017620422003"])]
@@ -19,3 +19,10 @@ def test_health():
     assert response.status_code == 200
     assert response.json()["status"] == "healthy"
 
+
+
+def test_health_stats():
+    """Test monitoring counters endpoint"""
+    response = client.get("/health/stats")
+    assert response.status_code == 200
+    assert "product_cache" in response.json()
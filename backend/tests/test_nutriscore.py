@@ -0,0 +1,96 @@
+"""Tests for the Nutri-Score calculator"""
+
+from datetime import datetime
+from types import SimpleNamespace
+from uuid import uuid4
+import numpy as np
+from app.entities.product.models import Nutrition, NutritionFacts, Product
+from app.entities.product.nutriscore import (
+    apply_nutriscore,
+    compute_nutriscore,
+    compute_nutriscores,
+    facts_to_columns,
+)
+from app.features.correction import admin_service
+from app.features.correction.admin_schemas import CorrectionDetailResponse
+from app.jobs.nutriscores import score_rows
+
+NUTELLA = NutritionFacts(energy_kj=2252, sugars=56.3, saturated_fat=10.6, salt=0.107, fiber=0, proteins=6.3)
+OATS = NutritionFacts(energy_kcal=372, sugars=1, saturated_fat=1.2, sodium=0.006, fiber=10, proteins=13.5)
+
+
+def test_compute_nutriscore_for_known_products():
+    assert compute_nutriscore(NUTELLA) == (26, "E")
+    assert compute_nutriscore(OATS) == (-5, "A")
+    assert compute_nutriscore(NutritionFacts(energy_kcal=100, sugars=1)) is None
+
+
+def test_batch_matches_scalar():
+    rng = np.random.default_rng(1)
+    facts = [
+        NutritionFacts(energy_kj=e, sugars=s, saturated_fat=f, salt=sa, fiber=fi, proteins=p)
+        for e, s, f, sa, fi, p in rng.uniform(0, [4000, 60, 15, 3, 8, 12], size=(500, 6)).tolist()
+    ] + [None, NutritionFacts(fat=3)]
+
+    scores, grades = compute_nutriscores(facts_to_columns(facts))
+
+    for item, score, grade in zip(facts, scores.tolist(), grades.tolist()):
+        expected = compute_nutriscore(item)
+        if expected is None:
+            assert np.isnan(score) and grade == ""
+        else:
+            assert (score, grade) == expected
+
+
+def test_apply_keeps_existing_values_unless_overwritten():
+    product = Product(barcode="1", name="Oats", nutrition=Nutrition(per_100g=OATS), nutriscore_grade="B")
+
+    assert apply_nutriscore(product)
+    assert (product.health_score, product.nutriscore_grade) == (-5.0, "B")
+    assert apply_nutriscore(product, overwrite=True)
+    assert product.nutriscore_grade == "A"
+
+
+def test_score_rows_fills_missing_values_only():
+    rows = [
+        {"id": "1", "barcode": "1", "name": "Nutella", "nutrition": {"per_100g": NUTELLA.model_dump()},
+         "health_score": None, "nutriscore_grade": None},
+        {"id": "2", "barcode": "2", "name": "Oats", "nutrition": {"per_100g": OATS.model_dump()},
+         "health_score": -5, "nutriscore_grade": "A"},
+        {"id": "3", "barcode": "3", "name": "Water", "nutrition": {}, "health_score": None, "nutriscore_grade": None},
+    ]
+
+    assert score_rows(rows) == [
+        {"id": "1", "health_score": 26.0, "nutriscore_grade": "E"},
+    ]
+
+
+async def test_nutrition_correction_clears_scores_it_cannot_recompute(monkeypatch):
+    stored = {"id": "p1", "barcode": "1", "name": "Nutella", "nutrition": {"per_100g": NUTELLA.model_dump()},
+              "health_score": 26.0, "nutriscore_grade": "E"}
+    updates = []
+
+    async def execute_query(builder):
+        return SimpleNamespace(data=[stored])
+
+    async def invalidate_product(product_id=None, barcode=None):
+        pass
+
+    table = SimpleNamespace(
+        select=lambda columns: SimpleNamespace(eq=lambda *args: None),
+        update=lambda data: updates.append(data) or SimpleNamespace(eq=lambda *args: None),
+    )
+    monkeypatch.setattr(admin_service, "execute_query", execute_query)
+    monkeypatch.setattr(admin_service, "invalidate_product", invalidate_product)
+    monkeypatch.setattr(admin_service.nutrition_index, "upsert", lambda product: None)
+    service = admin_service.AdminCorrectionService.__new__(admin_service.AdminCorrectionService)
+    service.supabase = SimpleNamespace(table=lambda name: table)
+
+    # Corrected facts without sugars cannot be scored
+    correction = CorrectionDetailResponse(
+        id=uuid4(), product_id="p1", field_name="nutrition", old_value="{}",
+        new_value='{"per_100g": {"energy_kj": 2252}}', status="approved", submitted_at=datetime.now(),
+    )
+    await service._apply_correction_to_product(correction)
+
+    assert (updates[0]["health_score"], updates[0]["nutriscore_grade"]) == (None, None)
@@ -0,0 +1,117 @@
+"""Tests for the healthier-alternatives nutrition index"""
+
+from datetime import datetime, timezone
+from types import SimpleNamespace
+from app.core.config import settings
+from app.entities.product.models import Nutrition, NutritionFacts, Product
+from app.entities.product.nutrition_index import NutritionIndex, category_key
+from app.features.product import alternatives
+
+
+def make_product(product_id: str, grade: str, sugars: float, category: str = "Spreads, Hazelnut spreads",
+                 allergen_mask: int = 0, **facts) -> Product:
+    per_100g = NutritionFacts(energy_kcal=500, fat=30, sugars=sugars, **facts)
+    return Product(
+        id=product_id,
+        barcode=product_id,
+        name=product_id,
+        category=category,
+        nutrition=Nutrition(per_100g=per_100g),
+        nutriscore_grade=grade,
+        allergen_mask=allergen_mask,
+    )
+
+
+def build_index(*products: Product) -> NutritionIndex:
+    index = NutritionIndex()
+    for product in products:
+        index.upsert(product)
+    return index
+
+
+def test_category_key_uses_most_specific_category():
+    assert category_key("Spreads, Sweet spreads, en:Hazelnut spreads") == "hazelnut spreads"
+    assert category_key(" , ") is None
+
+
+def test_nearest_returns_better_grades_by_distance():
+    index = build_index(
+        make_product("nutella", "E", sugars=56),
+        make_product("close", "C", sugars=50),
+        make_product("far", "B", sugars=10),
+        make_product("worse", "E", sugars=55),
+        make_product("other-category", "A", sugars=56, category="Biscuits"),
+    )
+
+    assert [product_id for product_id, _ in index.nearest("nutella")] == ["close", "far"]
+    assert index.nearest("nutella", limit=1)[0][0] == "close"
+    assert index.nearest("far") == []
+
+
+def test_allergen_mask_excludes_conflicts_and_unknown_masks():
+    index = build_index(
+        make_product("nutella", "E", sugars=56),
+        make_product("milk", "C", sugars=50, allergen_mask=0b1),
+        make_product("unknown", "C", sugars=50, allergen_mask=None),
+        make_product("safe", "D", sugars=40, allergen_mask=0b1000),
+    )
+
+    assert [product_id for product_id, _ in index.nearest("nutella", exclude_allergen_mask=0b1)] == ["safe"]
+
+
+def test_updates_move_and_remove_products():
+    index = build_index(
+        make_product("nutella", "E", sugars=56),
+        make_product("close", "C", sugars=50),
+    )
+
+    index.upsert(make_product("close", "C", sugars=50, category="Biscuits"))
+    assert index.nearest("nutella") == []
+
+    index.upsert(make_product("close", "C", sugars=50))
+    assert [product_id for product_id, _ in index.nearest("nutella")] == ["close"]
+
+    # Corrected to lack nutrition data: no longer comparable
+    index.upsert(Product(id="close", barcode="close", name="close", category="Hazelnut spreads"))
+    assert "close" not in index
+    assert index.stats()["products"] == 1
+
+
+class ProductsQuery:
+    """Stands in for a products select; records the keyset filters it is given"""
+
+    def __init__(self, pages):
+        self.pages = pages
+        self.filters = []
+
+    def __getattr__(self, name):
+        if name == "not_":
+            return self
+
+        def call(*args, **kwargs):
+            if name == "or_":
+                self.filters.append(args[0])
+            return self
+        return call
+
+
+async def test_sync_pages_by_updated_at_and_id(monkeypatch):
+    rows = [
+        {"id": f"p{i}", "barcode": f"p{i}", "name": f"p{i}", "updated_at": "2026-01-09T10:00:00+00:00"}
+        for i in range(3)
+    ]
+    query = ProductsQuery([rows[:2], rows[2:]])
+
+    async def execute_query(builder):
+        return SimpleNamespace(data=query.pages.pop(0))
+
+    monkeypatch.setattr(settings, "NUTRITION_INDEX_PAGE_SIZE", 2)
+    monkeypatch.setattr(alternatives, "execute_query", execute_query)
+    monkeypatch.setattr(alternatives, "get_supabase_client", lambda: query)
+    sync = alternatives.NutritionIndexSync()
+    await sync.sync()
+
+    # Rows sharing one updated_at continue after the last ID, not at an offset
+    assert query.filters == ['updated_at.gt."2026-01-09T10:00:00+00:00",and(updated_at.eq."2026-01-09T10:00:00+00:00",id.gt.p1)']
+    assert sync.synced == 3
+    assert sync._since == datetime(2026, 1, 9, 10, tzinfo=timezone.utc)
@@ -0,0 +1,151 @@
+"""Tests for the Open Food Facts dump importer"""
+
+import gzip
+import shutil
+from pathlib import Path
+import pytest
+from app.entities.allergen.matcher import categories_to_mask
+from app.jobs import off_import
+from app.jobs.off_import import import_dump, load_checkpoint
+
+FIXTURES = Path(__file__).parent / "fixtures"
+
+
+def gzip_fixture(name: str, tmp_path: Path) -> str:
+    target = tmp_path / f"{name}.gz"
+    with open(FIXTURES / name, "rb") as src, gzip.open(target, "wb") as dst:
+        shutil.copyfileobj(src, dst)
+    return str(target)
+
+
+def test_import_jsonl_dump_in_batches(tmp_path):
+    batches = []
+    result = import_dump(
+        gzip_fixture("off_products_sample.jsonl", tmp_path),
+        batches.append,
+        batch_size=2,
+    )
+
+    products = [product for batch in batches for product in batch]
+    assert result["lines"] == 7
+    assert result["skipped"] == 2  # missing code and undecodable line
+    assert all(len(batch) <= 2 for batch in batches)
+    assert {product.barcode_normalized for product in products} == {
+        "3017620422003", "0049000028911", "5449000000996", "7622210449283"
+    }
+    nutella = next(product for product in products if product.name == "Nutella")
+    assert nutella.nutrition.per_100g.fat == 30.9
+    assert nutella.allergens == ["en:milk", "en:nuts"]
+    assert nutella.source == "openfoodfacts"
+    assert nutella.allergen_mask == categories_to_mask(["milk", "nuts"])
+    assert nutella.last_fetched_at is not None
+
+
+def test_import_csv_dump(tmp_path):
+    batches = []
+    result = import_dump(gzip_fixture("off_products_sample.csv", tmp_path), batches.append)
+
+    products = {product.barcode: product for batch in batches for product in batch}
+    assert result["imported"] == 2
+    assert result["skipped"] == 1
+    assert products["3017620422003"].nutrition.per_100g.energy_kcal == 539
+    assert products["3017620422003"].nutriscore_grade == "E"
+    assert products["5449000000996"].allergens is None
+
+
+def test_import_resumes_from_checkpoint(tmp_path):
+    dump = gzip_fixture("off_products_sample.jsonl", tmp_path)
+    checkpoint = str(tmp_path / "import.checkpoint")
+    written = []
+
+    def failing_writer(products):
+        if written:
+            raise RuntimeError("connection lost")
+        written.extend(products)
+
+    with pytest.raises(RuntimeError):
+        import_dump(dump, failing_writer, batch_size=2, checkpoint_path=checkpoint)
+    assert load_checkpoint(checkpoint, str(Path(dump).resolve())) == 3
+
+    result = import_dump(dump, written.extend, batch_size=2, checkpoint_path=checkpoint)
+    assert result["resumed_from"] == 3
+    assert len({product.barcode_normalized for product in written}) == 4
+
+
+def test_import_clears_negative_cache_for_imported_barcodes(tmp_path, monkeypatch):
+    """Verify every written batch is dropped from the negative cache"""
+    written = []
+    forgotten = []
+
+    async def reload_allergen_matcher(force=False):
+        pass
+
+    async def forget_missing(*barcodes):
+        forgotten.extend(barcodes)
+
+    monkeypatch.setattr(off_import, "reload_allergen_matcher", reload_allergen_matcher)
+    monkeypatch.setattr(off_import, "upsert_products", lambda products, update_existing: written.extend(products))
+    monkeypatch.setattr(off_import, "forget_missing", forget_missing)
+
+    dump = gzip_fixture("off_products_sample.jsonl", tmp_path)
+    off_import.main([dump, "--batch-size", "2", "--checkpoint", str(tmp_path / "checkpoint")])
+
+    assert forgotten == [product.barcode_normalized for product in written]
+    assert set(forgotten) == {"3017620422003", "0049000028911", "5449000000996", "7622210449283"}
+
+
+def test_update_existing_keeps_corrected_fields():
+    """Verify corrected fields keep their stored values and the mask follows them"""
+    from app.entities.product.models import Product
+
+    imported = Product(
+        barcode="3017620422003",
+        barcode_normalized="3017620422003",
+        name="Nutella",
+        ingredients_raw="Sugar, palm oil",
+        allergen_mask=0,
+    )
+    untouched = Product(barcode="7622210449283", barcode_normalized="7622210449283", name="Oreo")
+    products = [imported, untouched]
+    off_import.keep_corrected_fields(products, {
+        "3017620422003": {
+            "name": "Nutella Hazelnut Spread",
+            "ingredients_raw": "Sugar, palm oil, hazelnuts 13%",
+            "corrected_fields": ["ingredients_raw", "name"],
+        },
+    })
+
+    assert products[0].name == "Nutella Hazelnut Spread"
+    assert products[0].ingredients_raw == "Sugar, palm oil, hazelnuts 13%"
+    assert products[0].corrected_fields == ["ingredients_raw", "name"]
+    assert products[0].allergen_mask == categories_to_mask(["nuts"])
+    assert products[1] is untouched
+
+
+def test_update_existing_invalidates_cached_products(tmp_path, monkeypatch):
+    """Verify rows overwritten by --update-existing are dropped from the product cache"""
+    invalidated = []
+
+    async def reload_allergen_matcher(force=False):
+        pass
+
+    async def forget_missing(*barcodes):
+        pass
+
+    async def invalidate_products(product_ids=(), barcodes=()):
+        invalidated.extend(zip(product_ids, barcodes))
+
+    def upsert_products(products, update_existing):
+        assert update_existing
+        return [{"id": f"id-{product.barcode}", "barcode": product.barcode} for product in products]
+
+    monkeypatch.setattr(off_import, "reload_allergen_matcher", reload_allergen_matcher)
+    monkeypatch.setattr(off_import, "upsert_products", upsert_products)
+    monkeypatch.setattr(off_import, "forget_missing", forget_missing)
+    monkeypatch.setattr(off_import, "invalidate_products", invalidate_products)
+
+    dump = gzip_fixture("off_products_sample.jsonl", tmp_path)
+    off_import.main([dump, "--update-existing", "--checkpoint", str(tmp_path / "checkpoint")])
+
+    assert len(invalidated) == 4
+    assert all(product_id == f"id-{barcode}" for product_id, barcode in invalidated)
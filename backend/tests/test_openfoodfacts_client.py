@@ -0,0 +1,37 @@
+import httpx
+from app.external.openfoodfacts import OpenFoodFactsClient, create_off_http_client
+
+
+def stand_in_off(request: httpx.Request) -> httpx.Response:
+    """Local stand-in for the Open Food Facts product API"""
+    if request.url.path.endswith("/product/3017620422003.json"):
+        return httpx.Response(200, json={
+            "status": 1,
+            "product": {"product_name": "Nutella", "brands": "Ferrero", "nutriscore_grade": "e"}
+        })
+    if request.url.path.endswith("/product/0000000000000.json"):
+        return httpx.Response(200, json={"status": 0, "status_verbose": "product not found"})
+    return httpx.Response(404)
+
+
+async def test_client_uses_injected_http_client():
+    """Verify lookups go through the injected pooled client"""
+    http_client = create_off_http_client(transport=httpx.MockTransport(stand_in_off))
+    client = OpenFoodFactsClient(http_client=http_client, base_url="http://off.test/api/v0")
+
+    product = await client.get_product_by_barcode("3017620422003")
+    await http_client.aclose()
+
+    assert product is not None
+    assert product.name == "Nutella"
+    assert product.nutriscore_grade == "E"
+
+
+async def test_client_returns_none_for_unknown_barcodes():
+    """Verify 404 and status 0 responses both map to None"""
+    http_client = create_off_http_client(transport=httpx.MockTransport(stand_in_off))
+    client = OpenFoodFactsClient(http_client=http_client, base_url="http://off.test/api/v0")
+
+    assert await client.get_product_by_barcode("0000000000000") is None
+    assert await client.get_product_by_barcode("1234567890128") is None
+    await http_client.aclose()
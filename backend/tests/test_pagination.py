@@ -0,0 +1,77 @@
+"""Tests for keyset pagination of scan history"""
+
+from types import SimpleNamespace
+import pytest
+from app.features.scan import history
+from app.shared.pagination import (
+    decode_cursor,
+    decode_timestamp_cursor,
+    encode_cursor,
+    keyset_after_desc,
+)
+
+ROWS = [
+    {"id": f"00000000-0000-0000-0000-00000000000{i}", "barcode": "1", "product_id": None, "result_snapshot": None,
+     "scanned_at": f"2026-01-0{9 - i}T10:00:00+00:00"}
+    for i in range(3)
+]
+
+
+class RecordingQuery:
+    """Stands in for a PostgREST builder and records the calls made on it"""
+
+    def __init__(self):
+        self.calls = []
+
+    def __getattr__(self, name):
+        def call(*args, **kwargs):
+            self.calls.append((name, args))
+            return self
+        return call
+
+
+def test_cursor_round_trip_and_validation():
+    cursor = encode_cursor(["2026-01-09T10:00:00+00:00", "s0"])
+    assert decode_cursor(cursor, 2) == ["2026-01-09T10:00:00+00:00", "s0"]
+    with pytest.raises(ValueError):
+        decode_cursor(cursor, 3)
+    with pytest.raises(ValueError):
+        decode_cursor("%%%", 2)
+
+
+@pytest.mark.parametrize("values", [
+    ['2026-01-09",id.gt.0', ROWS[0]["id"]],
+    ["2026-01-09T10:00:00+00:00", "s0),id.gt.(0"],
+    [20260109, ROWS[0]["id"]],
+])
+def test_timestamp_cursor_rejects_values_that_are_not_a_datetime_and_uuid(values):
+    with pytest.raises(ValueError):
+        decode_timestamp_cursor(encode_cursor(values))
+
+
+def test_keyset_filter_breaks_ties_on_id():
+    assert keyset_after_desc("scanned_at", "2026-01-09T10:00:00+00:00", "s0") == (
+        'scanned_at.lt."2026-01-09T10:00:00+00:00",'
+        'and(scanned_at.eq."2026-01-09T10:00:00+00:00",id.lt.s0)'
+    )
+
+
+async def test_history_pages_by_cursor_without_offset(monkeypatch):
+    query = RecordingQuery()
+
+    async def execute_query(builder):
+        limit = [args for name, args in builder.calls if name == "range"][-1]
+        return SimpleNamespace(data=ROWS[:limit[1] - limit[0] + 1])
+
+    monkeypatch.setattr(history, "execute_query", execute_query)
+    service = history.ScanHistoryService.__new__(history.ScanHistoryService)
+    service.supabase = SimpleNamespace(table=lambda name: query)
+
+    rows, next_cursor = await service.get_history("u1", limit=2)
+    assert [row["id"] for row in rows] == [ROWS[0]["id"], ROWS[1]["id"]]
+    assert decode_cursor(next_cursor, 2) == [ROWS[1]["scanned_at"], ROWS[1]["id"]]
+
+    query.calls.clear()
+    await service.get_history("u1", limit=2, cursor=next_cursor)
+    assert ("or_", (keyset_after_desc("scanned_at", ROWS[1]["scanned_at"], ROWS[1]["id"]),)) in query.calls
+    assert ("range", (0, 2)) in query.calls
@@ -0,0 +1,221 @@
+"""Tests for stale product detection and field diffing"""
+
+from datetime import datetime, timedelta, timezone
+from types import SimpleNamespace
+import pytest
+from app.core.config import settings
+from app.entities.product.models import Product
+from app.features.product import refresh
+from app.features.product.refresh import ProductRefresher, diff_product_fields, is_stale
+
+
+@pytest.fixture
+def stored_product():
+    """A stored Open Food Facts product"""
+    return Product(
+        id="p1",
+        barcode="3017620422003",
+        name="Nutella",
+        brand="Ferrero",
+        source="openfoodfacts",
+        allergens=["milk"],
+    )
+
+
+@pytest.fixture
+def stored_rows():
+    """Product rows a refresh reads, keyed by ID"""
+    return {}
+
+
+class ProductsQuery:
+    """A select or update on ProductsTable; an update only touches rows matching every filter"""
+
+    def __init__(self, table, payload=None):
+        self.table = table
+        self.payload = payload
+        self.filters = {}
+
+    def eq(self, column, value):
+        self.filters[column] = value
+        return self
+
+    def is_(self, column, value):
+        self.filters[column] = None
+        return self
+
+    def execute(self):
+        rows = [
+            row for row in self.table.rows.values()
+            if all(row.get(column) == value for column, value in self.filters.items())
+        ]
+        if self.payload is not None:
+            for row in rows:
+                row.update(self.payload)
+                # Stands in for the products updated_at trigger
+                row["updated_at"] = datetime.now(timezone.utc).isoformat()
+        return SimpleNamespace(data=rows)
+
+
+class ProductsTable:
+    """Stands in for the products table, recording update payloads"""
+
+    def __init__(self, rows):
+        self.rows = rows
+        self.updates = []
+
+    def select(self, columns):
+        return ProductsQuery(self)
+
+    def update(self, payload):
+        self.updates.append(payload)
+        return ProductsQuery(self, payload)
+
+
+@pytest.fixture
+def refresh_updates(monkeypatch, stored_rows):
+    """Capture the update payloads a refresh writes, without Redis or a DB"""
+    table = ProductsTable(stored_rows)
+
+    async def execute_query(builder):
+        return builder.execute()
+
+    async def invalidate_product(product_id=None, barcode=None):
+        pass
+
+    async def cache_product(product):
+        pass
+
+    monkeypatch.setattr(refresh, "get_supabase_client", lambda: SimpleNamespace(table=lambda name: table))
+    monkeypatch.setattr(refresh, "execute_query", execute_query)
+    monkeypatch.setattr(refresh, "invalidate_product", invalidate_product)
+    monkeypatch.setattr(refresh, "cache_product", cache_product)
+    return table.updates
+
+
+def test_is_stale_uses_refresh_threshold(stored_product):
+    """Verify only products fetched longer ago than the threshold are stale"""
+    now = datetime.now(timezone.utc)
+    threshold = timedelta(hours=settings.PRODUCT_REFRESH_AFTER_HOURS)
+    assert is_stale(stored_product, now)
+    stored_product.last_fetched_at = now - threshold - timedelta(minutes=1)
+    assert is_stale(stored_product, now)
+    stored_product.last_fetched_at = now - timedelta(minutes=1)
+    assert not is_stale(stored_product, now)
+
+
+def test_is_stale_ignores_manual_and_unsaved_products(stored_product):
+    """Verify manual products and products without an ID are never refreshed"""
+    assert not is_stale(stored_product.model_copy(update={"source": "manual"}))
+    assert not is_stale(stored_product.model_copy(update={"id": None}))
+
+
+def test_diff_product_fields_returns_only_changes(stored_product):
+    """Verify empty upstream values are ignored and unchanged fields are skipped"""
+    fetched = stored_product.model_copy(update={"name": "Nutella Hazelnut Spread", "brand": None})
+    assert diff_product_fields(stored_product, fetched) == {"name": "Nutella Hazelnut Spread"}
+
+
+def test_diff_product_fields_skips_corrected_fields(stored_product):
+    """Verify fields set by an approved correction are never taken from OFF"""
+    stored_product.corrected_fields = ["name"]
+    fetched = stored_product.model_copy(update={"name": "Nutella Hazelnut Spread", "brand": "Ferrero SpA"})
+    assert diff_product_fields(stored_product, fetched) == {"brand": "Ferrero SpA"}
+
+
+async def test_refresh_keeps_corrected_fields(stored_product, stored_rows, refresh_updates, monkeypatch):
+    """Verify a refresh of a corrected product writes only uncorrected changes"""
+    stored_product.allergens = ["milk", "peanuts"]
+    stored_product.corrected_fields = ["allergens", "name"]
+    stored_rows["p1"] = stored_product.model_dump(mode="json")
+    fetched = stored_product.model_copy(update={
+        "name": "Nutella Hazelnut Spread",
+        "allergens": ["milk"],
+        "images": ["https://images.openfoodfacts.org/nutella.jpg"],
+    })
+
+    async def lookup_barcode(code):
+        return fetched, False
+
+    refresher = ProductRefresher()
+    monkeypatch.setattr(refresher.off_client, "lookup_barcode", lookup_barcode)
+    updated = await refresher.refresh("p1")
+
+    assert updated.name == "Nutella"
+    assert updated.allergens == ["milk", "peanuts"]
+    assert updated.images == ["https://images.openfoodfacts.org/nutella.jpg"]
+    assert set(refresh_updates[0]) == {"images", "last_fetched_at"}
+
+
+async def test_refresh_respects_correction_made_after_schedule(stored_product, stored_rows, refresh_updates, monkeypatch):
+    """Verify a correction approved while a product is queued is not overwritten"""
+    stored_rows["p1"] = stored_product.model_dump(mode="json")
+    fetched = stored_product.model_copy(update={"name": "Nutella Hazelnut Spread", "brand": "Ferrero SpA"})
+
+    async def lookup_barcode(code):
+        return fetched, False
+
+    # No worker runs, so the queued entry waits until the test refreshes it
+    monkeypatch.setattr(ProductRefresher, "is_running", property(lambda self: True))
+    refresher = ProductRefresher()
+    monkeypatch.setattr(refresher.off_client, "lookup_barcode", lookup_barcode)
+    assert refresher.schedule(stored_product)
+    stored_rows["p1"] = {**stored_rows["p1"], "name": "Nutella Spread", "corrected_fields": ["name"]}
+    updated = await refresher.refresh(refresher._queue.get_nowait())
+
+    assert updated.name == "Nutella Spread"
+    assert updated.brand == "Ferrero SpA"
+    assert set(refresh_updates[0]) == {"brand", "last_fetched_at"}
+
+
+async def test_refresh_recomputes_mask_when_label_text_changes(stored_product, stored_rows, refresh_updates, monkeypatch):
+    """Verify a refreshed ingredients_raw updates the mask unless the text is corrected"""
+    from app.entities.allergen.matcher import categories_to_mask
+
+    stored_product.allergens = []
+    stored_product.ingredients_raw = "Sugar, cocoa"
+    stored_product.allergen_mask = 0
+    fetched = stored_product.model_copy(update={"ingredients_raw": "Sugar, cocoa, peanuts"})
+
+    async def lookup_barcode(code):
+        return fetched, False
+
+    refresher = ProductRefresher()
+    monkeypatch.setattr(refresher.off_client, "lookup_barcode", lookup_barcode)
+
+    stored_rows["p1"] = stored_product.model_dump(mode="json")
+    updated = await refresher.refresh("p1")
+    assert refresh_updates[0]["allergen_mask"] == categories_to_mask(["peanuts"])
+    assert updated.allergen_mask == categories_to_mask(["peanuts"])
+
+    # A corrected label text is kept, and so is the mask derived from it
+    refresh_updates.clear()
+    stored_rows["p1"] = {**stored_product.model_dump(mode="json"), "corrected_fields": ["ingredients_raw", "ingredients_parsed"]}
+    updated = await refresher.refresh("p1")
+    assert set(refresh_updates[0]) == {"last_fetched_at"}
+    assert updated.allergen_mask == 0
+
+
+async def test_refresh_rediffs_when_a_correction_lands_during_the_fetch(stored_product, stored_rows, refresh_updates, monkeypatch):
+    """Verify the write is conditional on the row read and retried after a concurrent correction"""
+    stored_rows["p1"] = stored_product.model_dump(mode="json")
+    fetched = stored_product.model_copy(update={"name": "Nutella Hazelnut Spread", "brand": "Ferrero SpA"})
+
+    async def lookup_barcode(code):
+        # An admin approves a name correction while OFF is being fetched
+        stored_rows["p1"].update({
+            "name": "Nutella Spread",
+            "corrected_fields": ["name"],
+            "updated_at": datetime.now(timezone.utc).isoformat(),
+        })
+        return fetched, False
+
+    refresher = ProductRefresher()
+    monkeypatch.setattr(refresher.off_client, "lookup_barcode", lookup_barcode)
+    updated = await refresher.refresh("p1")
+
+    assert refresher.conflicts == 1
+    assert stored_rows["p1"]["name"] == "Nutella Spread"
+    assert updated.name == "Nutella Spread"
+    assert updated.brand == "Ferrero SpA"
+    assert set(refresh_updates[-1]) == {"brand", "last_fetched_at"}
@@ -0,0 +1,133 @@
+"""Tests for write-behind persistence of newly fetched products"""
+
+from types import SimpleNamespace
+import pytest
+from app.entities.product.models import Product
+from app.features.product import service as product_service
+
+NUTELLA = Product(barcode="3017620422003", barcode_normalized="3017620422003", name="Nutella")
+OREO = Product(barcode="7622210449283", barcode_normalized="7622210449283", name="Oreo")
+
+
+@pytest.fixture
+def product_cache(monkeypatch):
+    """Record cache writes and invalidations instead of touching Redis"""
+    events = []
+
+    async def cache_product(product):
+        events.append(("cache", product.barcode, product.id))
+
+    async def invalidate_product(product_id=None, barcode=None):
+        events.append(("invalidate", barcode, product_id))
+
+    async def forget_missing(barcode):
+        pass
+
+    monkeypatch.setattr(product_service, "cache_product", cache_product)
+    monkeypatch.setattr(product_service, "invalidate_product", invalidate_product)
+    monkeypatch.setattr(product_service, "forget_missing", forget_missing)
+    return events
+
+
+async def test_queued_products_get_their_id_only_once_committed(product_cache, monkeypatch):
+    """A product waiting for the write-behind flush is cached and returned without an ID"""
+    async def execute_query(builder):
+        return SimpleNamespace(data=[{"id": "db-1", "barcode_normalized": NUTELLA.barcode_normalized}])
+
+    monkeypatch.setattr(product_service, "execute_query", execute_query)
+    monkeypatch.setattr(product_service, "get_supabase_client", lambda: SimpleNamespace(
+        table=lambda name: SimpleNamespace(upsert=lambda *args, **kwargs: None)
+    ))
+    monkeypatch.setattr(product_service.product_writer, "submit", lambda product: True)
+
+    service = product_service.ProductService.__new__(product_service.ProductService)
+    products = [NUTELLA.model_copy(), OREO.model_copy()]
+    await service._store_new_products(products)
+    assert [product.id for product in products] == [None, None]
+    assert product_cache == [("cache", NUTELLA.barcode, None), ("cache", OREO.barcode, None)]
+
+    # Oreo lost the insert race to another worker: its cached copy is dropped
+    product_cache.clear()
+    await product_service._flush_new_products(products)
+    assert product_cache == [("cache", NUTELLA.barcode, "db-1"), ("invalidate", OREO.barcode, None)]
+
+
+async def test_sync_fallback_never_overwrites_stored_rows(product_cache, monkeypatch):
+    """Products written synchronously use the same insert-only upsert as the flush"""
+    upserts = []
+
+    async def execute_query(builder):
+        return SimpleNamespace(data=[{"id": "db-1", "barcode_normalized": NUTELLA.barcode_normalized}])
+
+    service = product_service.ProductService.__new__(product_service.ProductService)
+    service.supabase = SimpleNamespace(
+        table=lambda name: SimpleNamespace(upsert=lambda rows, **kwargs: upserts.append(kwargs))
+    )
+    monkeypatch.setattr(product_service, "execute_query", execute_query)
+    monkeypatch.setattr(product_service.product_writer, "submit", lambda product: False)
+
+    products = [NUTELLA.model_copy(), OREO.model_copy()]
+    await service._store_new_products(products)
+    assert upserts[0]["ignore_duplicates"] is True
+    assert [product.id for product in products] == ["db-1", None]
+    # Oreo already had a row, which is served from the DB instead of the OFF copy
+    assert product_cache[-2:] == [("cache", NUTELLA.barcode, "db-1"), ("invalidate", OREO.barcode, None)]
+
+
+async def test_first_scan_returns_a_committed_id(product_cache, monkeypatch):
+    """A product fetched from OFF by a single lookup is stored before it is returned"""
+    async def execute_query(builder):
+        return builder
+
+    async def get_product_from_db(code):
+        return None
+
+    async def is_known_missing(code):
+        return False
+
+    async def get_cached_product_by_barcode(code):
+        return None
+
+    async def lookup_barcode(code):
+        return NUTELLA.model_copy(update={"barcode_normalized": None}), False
+
+    service = product_service.ProductService.__new__(product_service.ProductService)
+    service.supabase = SimpleNamespace(table=lambda name: SimpleNamespace(
+        upsert=lambda rows, **kwargs: SimpleNamespace(
+            data=[{"id": "db-1", "barcode_normalized": row["barcode_normalized"]} for row in rows]
+        )
+    ))
+    service.off_client = SimpleNamespace(lookup_barcode=lookup_barcode)
+    service._get_product_from_db = get_product_from_db
+    monkeypatch.setattr(product_service, "execute_query", execute_query)
+    monkeypatch.setattr(product_service, "is_known_missing", is_known_missing)
+    monkeypatch.setattr(product_service, "get_cached_product_by_barcode", get_cached_product_by_barcode)
+    # Even with the write-behind worker accepting items, the lookup waits for the insert
+    monkeypatch.setattr(product_service.product_writer, "submit", lambda product: True)
+
+    product = await service.lookup_product(NUTELLA.barcode)
+    assert product.id == "db-1"
+    assert product_cache[-1] == ("cache", NUTELLA.barcode, "db-1")
+
+
+async def test_sync_save_returns_the_stored_row_after_losing_a_race(product_cache, monkeypatch):
+    """A product whose barcode was inserted concurrently is replaced by the stored row"""
+    stored = OREO.model_copy(update={"id": "db-2", "name": "Oreo Original"})
+
+    async def get_products_from_db(codes):
+        return [stored] if OREO.barcode_normalized in codes else []
+
+    service = product_service.ProductService.__new__(product_service.ProductService)
+    service.supabase = SimpleNamespace(table=lambda name: SimpleNamespace(
+        upsert=lambda rows, **kwargs: SimpleNamespace(data=[])
+    ))
+    service._get_products_from_db = get_products_from_db
+
+    async def execute_query(builder):
+        return builder
+
+    monkeypatch.setattr(product_service, "execute_query", execute_query)
+    saved = await service._save_products_to_db([OREO.model_copy()])
+
+    assert [(product.id, product.name) for product in saved] == [("db-2", "Oreo Original")]
+    assert product_cache[-1] == ("cache", OREO.barcode, "db-2")
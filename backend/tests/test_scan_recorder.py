@@ -0,0 +1,105 @@
+"""Tests for buffered scan history recording"""
+
+from types import SimpleNamespace
+import pytest
+from postgrest.exceptions import APIError
+from app.entities.product.models import Product
+from app.features.scan import recorder
+from app.shared.batching import BatchWriter
+
+PRODUCT = Product(id="p1", barcode="3017620422003", name="Nutella", warnings=["Milk"])
+
+
+@pytest.fixture
+def inserts(monkeypatch):
+    """Capture inserted batches and give each test a fresh writer"""
+    batches = []
+
+    async def insert_scans(records):
+        batches.append(records)
+
+    monkeypatch.setattr(recorder, "_insert_scans", insert_scans)
+    monkeypatch.setattr(recorder, "_scan_counters", {"dropped": 0, "skipped": 0})
+    monkeypatch.setattr(recorder, "scan_writer", BatchWriter(
+        name="test-scans", flush=insert_scans, max_batch_size=10, flush_interval=60, max_queue_size=2
+    ))
+    return batches
+
+
+def test_scan_record_snapshot_omits_warnings():
+    record = recorder.build_scan_record("u1", " 3017620422003 ", PRODUCT)
+
+    assert record["barcode"] == "3017620422003"
+    assert record["product_id"] == "p1"
+    assert "warnings" not in record["result_snapshot"]
+    assert record["scanned_at"]
+
+
+async def test_scans_are_buffered_and_drained_on_stop(inserts):
+    recorder.scan_writer.start()
+    await recorder.record_scans("u1", [("1", PRODUCT), ("2", PRODUCT)])
+    assert inserts == []
+
+    await recorder.scan_writer.stop()
+    assert [record["barcode"] for record in inserts[0]] == ["1", "2"]
+
+
+async def test_full_buffer_drops_scans_instead_of_writing_inline(inserts):
+    recorder.scan_writer.start()
+    await recorder.record_scans("u1", [("1", PRODUCT), ("2", PRODUCT), ("3", PRODUCT)])
+
+    # Queue holds two rows; the third is dropped, not written in the request
+    assert inserts == []
+    assert recorder.scan_recorder_stats()["dropped"] == 1
+    await recorder.scan_writer.stop()
+    assert [[record["barcode"] for record in batch] for batch in inserts] == [["1", "2"]]
+
+
+@pytest.fixture
+def scans_table(monkeypatch):
+    """Serve products by barcode and insert scans; rows for product "gone" are rejected"""
+    table = SimpleNamespace(inserted=[])
+
+    def insert(records, **kwargs):
+        return ("insert", records)
+
+    def select(columns):
+        return SimpleNamespace(in_=lambda column, codes: ("select", codes))
+
+    async def execute_query(query):
+        name, args = query
+        if name == "select":
+            return SimpleNamespace(data=[
+                {"id": "p1", "barcode_normalized": code} for code in args if code == "3017620422003"
+            ])
+        if any(record["product_id"] == "gone" for record in args):
+            raise APIError({"message": "violates foreign key constraint", "code": "23503"})
+        table.inserted.extend(args)
+
+    monkeypatch.setattr(recorder, "execute_query", execute_query)
+    monkeypatch.setattr(recorder, "get_supabase_client", lambda: SimpleNamespace(
+        table=lambda name: SimpleNamespace(insert=insert, select=select)
+    ))
+    monkeypatch.setattr(recorder, "_scan_counters", {"dropped": 0, "skipped": 0})
+    return table
+
+
+async def test_unsaved_products_are_resolved_by_barcode_at_insert(scans_table):
+    unsaved = PRODUCT.model_copy(update={"id": None})
+    records = [recorder.build_scan_record("u1", code, unsaved) for code in ("3017620422003", "123")]
+
+    await recorder._resolve_product_ids(records)
+    await recorder._insert_rows(records)
+
+    # Stored products get their ID; others are recorded without one
+    assert [record["product_id"] for record in scans_table.inserted] == ["p1", None]
+
+
+async def test_rejected_row_does_not_drop_other_scans_in_the_batch(scans_table):
+    gone = PRODUCT.model_copy(update={"id": "gone"})
+    records = [recorder.build_scan_record(f"u{i}", str(i), gone if i == 2 else PRODUCT) for i in range(4)]
+
+    await recorder._insert_rows(records)
+
+    assert [record["barcode"] for record in scans_table.inserted] == ["0", "1", "3"]
+    assert recorder.scan_recorder_stats()["skipped"] == 1
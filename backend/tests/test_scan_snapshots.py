@@ -0,0 +1,45 @@
+"""Tests for content-addressed scan snapshot storage"""
+
+from types import SimpleNamespace
+from app.entities.product.models import Product
+from app.features.scan import recorder, snapshots
+
+PRODUCT = Product(id="p1", barcode="3017620422003", name="Nutella", warnings=["Milk"])
+
+
+def test_equal_snapshots_hash_the_same_regardless_of_key_order():
+    assert snapshots.snapshot_hash({"a": 1, "b": [1, 2]}) == snapshots.snapshot_hash({"b": [1, 2], "a": 1})
+    assert snapshots.snapshot_hash({"a": 1}) != snapshots.snapshot_hash({"a": 2})
+
+
+async def test_rescans_share_one_stored_snapshot(monkeypatch):
+    stored = []
+
+    async def execute_query(builder):
+        stored.append(builder)
+
+    def upsert(rows, **kwargs):
+        return rows
+
+    monkeypatch.setattr(snapshots, "execute_query", execute_query)
+    monkeypatch.setattr(snapshots, "get_supabase_client", lambda: SimpleNamespace(
+        table=lambda name: SimpleNamespace(upsert=upsert)
+    ))
+    monkeypatch.setattr(snapshots, "known_snapshots", snapshots.LRUCache(maxsize=10))
+
+    records = [recorder.build_scan_record("u1", code, PRODUCT) for code in ("1", "2")]
+    referenced = await snapshots.reference_snapshots(records)
+
+    assert len(stored) == 1 and len(stored[0]) == 1
+    assert referenced[0]["snapshot_hash"] == referenced[1]["snapshot_hash"] == stored[0][0]["hash"]
+    assert all("result_snapshot" not in record for record in referenced)
+
+    # Snapshots this process already wrote are not sent again
+    await snapshots.reference_snapshots([recorder.build_scan_record("u1", "3", PRODUCT)])
+    assert len(stored) == 1
+
+
+def test_history_rows_resolve_inline_and_shared_snapshots():
+    assert snapshots.resolve_snapshot({"result_snapshot": {"name": "a"}, "scan_snapshots": None}) == {"name": "a"}
+    assert snapshots.resolve_snapshot({"result_snapshot": None, "scan_snapshots": {"snapshot": {"name": "b"}}}) == {"name": "b"}
+    assert snapshots.resolve_snapshot({"result_snapshot": None, "scan_snapshots": None}) is None
@@ -0,0 +1,97 @@
+"""Tests for product search paging and caching"""
+
+from types import SimpleNamespace
+import pytest
+from app.api.v1 import allergy_warnings
+from app.api.v1.endpoints import search as search_endpoint
+from app.core.config import settings
+from app.entities.allergen.matcher import AllergenMatcher
+from app.features.search import service as search
+from app.features.search.service import SearchService, decode_search_cursor, encode_search_cursor
+
+ROWS = [
+    {"id": f"00000000-0000-0000-0000-00000000000{i}", "barcode": f"30176204220{i:02d}",
+     "name": f"Chocolate bar {i}", "brand": "Acme", "category": "snacks",
+     "images": [f"https://img/{i}.jpg"], "health_score": 12, "allergen_mask": 1,
+     "rank": 0.5 - i / 10}
+    for i in range(3)
+]
+
+
+@pytest.fixture
+def rpc_calls(monkeypatch):
+    """Serve search_products() from ROWS and record each database call"""
+    monkeypatch.setattr(settings, "REDIS_ENABLED", False)
+    monkeypatch.setattr(search, "search_cache", search.TwoTierCache("search-test", 10, 60, 60))
+    calls = []
+
+    async def execute_query(params):
+        calls.append(params)
+        return SimpleNamespace(data=ROWS[:params["p_limit"]])
+
+    monkeypatch.setattr(search, "execute_query", execute_query)
+    return calls
+
+
+def make_service() -> SearchService:
+    service = SearchService.__new__(SearchService)
+    service.supabase = SimpleNamespace(rpc=lambda name, params: params)
+    return service
+
+
+def test_cursor_round_trip():
+    cursor = encode_search_cursor(0.0607927, ROWS[0]["id"])
+    assert decode_search_cursor(cursor) == (0.0607927, ROWS[0]["id"])
+    with pytest.raises(ValueError):
+        decode_search_cursor("not-a-cursor")
+
+
+async def test_search_pages_by_rank_and_id(rpc_calls):
+    results, next_cursor = await make_service().search_products("  Chocolate   BAR ", limit=2)
+
+    assert [result.name for result in results] == ["Chocolate bar 0", "Chocolate bar 1"]
+    assert results[0].image == "https://img/0.jpg"
+    assert rpc_calls[0]["p_query"] == "chocolate bar"
+    assert rpc_calls[0]["p_limit"] == 3
+    assert decode_search_cursor(next_cursor) == (ROWS[1]["rank"], ROWS[1]["id"])
+
+    _, last_cursor = await make_service().search_products("chocolate bar", limit=5, cursor=next_cursor)
+    assert rpc_calls[1]["p_after_rank"] == ROWS[1]["rank"]
+    assert rpc_calls[1]["p_after_id"] == ROWS[1]["id"]
+    assert last_cursor is None
+
+
+async def test_repeated_search_is_served_from_cache(rpc_calls):
+    service = make_service()
+    await service.search_products("chocolate", brand="Acme")
+    await service.search_products("CHOCOLATE", brand="Acme")
+    await service.search_products("chocolate", brand="Other")
+
+    assert len(rpc_calls) == 2
+
+
+async def test_safe_for_me_drops_results_matching_uncategorized_allergies(rpc_calls, monkeypatch):
+    kiwi = {**ROWS[1], "allergen_mask": 0, "ingredients_raw": "Sugar, kiwi, cocoa butter"}
+
+    async def execute_query(params):
+        return SimpleNamespace(data=[ROWS[0], kiwi, ROWS[2]])
+
+    async def get_user_allergies(authorization):
+        return ["Kiwi"]
+
+    async def get_allergen_matcher():
+        return AllergenMatcher.from_defaults([])
+
+    monkeypatch.setattr(search, "execute_query", execute_query)
+    monkeypatch.setattr(search_endpoint, "get_user_allergies", get_user_allergies)
+    monkeypatch.setattr(search_endpoint, "SearchService", make_service)
+    monkeypatch.setattr(allergy_warnings, "get_allergen_matcher", get_allergen_matcher)
+
+    response = await search_endpoint.search_products(
+        q="chocolate", brand=None, category=None, safe_for_me=True, limit=2, cursor=None,
+        authorization="Bearer t"
+    )
+
+    # Kiwi has no allergen bit, so only the ingredient text can exclude it
+    assert [result.name for result in response.data.results] == ["Chocolate bar 0"]
+    assert response.data.has_more
@@ -0,0 +1,37 @@
+import asyncio
+from app.shared.singleflight import SingleFlight
+
+
+async def test_concurrent_calls_share_one_execution():
+    """Verify concurrent callers for one key run the work once"""
+    flight = SingleFlight()
+    executions = 0
+
+    async def fetch():
+        nonlocal executions
+        executions += 1
+        await asyncio.sleep(0.01)
+        return "product"
+
+    results = await asyncio.gather(*[flight.do("123", fetch) for _ in range(5)])
+
+    assert results == ["product"] * 5
+    assert executions == 1
+    assert flight.stats() == {"in_flight": 0, "calls": 1, "coalesced": 4}
+
+
+async def test_waiters_survive_leader_cancellation():
+    """Verify cancelling the first caller does not cancel the shared call"""
+    flight = SingleFlight()
+
+    async def fetch():
+        await asyncio.sleep(0.01)
+        return "product"
+
+    leader = asyncio.ensure_future(flight.do("123", fetch))
+    await asyncio.sleep(0)
+    waiter = asyncio.ensure_future(flight.do("123", fetch))
+    await asyncio.sleep(0)
+    leader.cancel()
+
+    assert await waiter == "product"